@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Measure how batch classification scales with the number of worker processes.
+
+The bundled labeled commits are replicated to the requested number of messages and classified
+with an increasing number of workers, the resulting scaling curve is printed as a table.
+"""
+
+import os
+import time
+from typing import List
+from typing import Optional
+
+import click
+
+from thoth.glyph import classify_messages
+from thoth.glyph import warm_up
+
+_LABELED_COMMITS = os.path.join(os.path.dirname(__file__), "..", "thoth", "glyph", "data", "commits-labeled.txt")
+
+
+def _load_messages(count: int) -> List[str]:
+    """Load the given number of messages, replicate the bundled dataset if needed."""
+    with open(_LABELED_COMMITS) as labeled_file:
+        next(labeled_file)  # Header.
+        dataset = [line.split(" ", maxsplit=1)[1].strip() for line in labeled_file if " " in line]
+
+    return [dataset[i % len(dataset)] for i in range(count)]
+
+
+@click.command()
+@click.option("--model-path", type=str, help="Path to a custom model file to be used by the classifier")
+@click.option("--messages", "count", type=int, default=200_000, show_default=True, help="Number of messages")
+@click.option("--max-jobs", type=int, default=os.cpu_count(), show_default=True, help="Maximum number of workers")
+@click.option("--repeat", type=int, default=3, show_default=True, help="Take the best time out of N runs")
+def main(model_path: Optional[str], count: int, max_jobs: int, repeat: int) -> None:
+    """Print the scaling curve of classify_messages(workers=N)."""
+    messages = _load_messages(count)
+    warm_up(model_path=model_path)
+
+    levels = [1]
+    while levels[-1] < max_jobs:
+        levels.append(min(levels[-1] * 2, max_jobs))
+
+    baseline = None
+    click.echo(f"{'jobs':>6} {'seconds':>10} {'messages/s':>12} {'speedup':>8}")
+    for jobs in levels:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            classify_messages(messages, model_path=model_path, workers=jobs)
+            best = min(best, time.perf_counter() - start)
+
+        baseline = baseline or best
+        click.echo(f"{jobs:>6} {best:>10.3f} {count / best:>12.0f} {baseline / best:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Benchmark the public entry points on synthetic repositories and compare results with a baseline.
+
+Each benchmark case runs in a freshly forked process so that its peak RSS is not affected by other
+cases. Results are printed as a table and can be stored as a JSON baseline, comparing with a baseline
+exits with a non-zero status if throughput of any case dropped more than the allowed tolerance.
+"""
+
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from itertools import islice
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import click
+
+from synthetic_repo import COMMIT_INTERVAL
+from synthetic_repo import RepositoryLayout
+from synthetic_repo import START_TIME
+from synthetic_repo import ensure_repository
+
+_CASES = ["classify_message", "classify_messages", "classify_by_date", "classify_by_tag", "generate_log"]
+_DEFAULT_SCALES = (1_000, 10_000)
+_SINGLE_MESSAGES = 1_000
+
+
+def _best_of(repeat: int, func: Callable[[], Any]) -> Tuple[float, Any]:
+    """Run func repeatedly, return the best time and the last result."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+
+def _run_case(case: str, path: str, layout: RepositoryLayout, model_path: Optional[str], repeat: int) -> Dict[str, Any]:
+    """Run a single benchmark case, called in a forked process."""
+    from thoth import glyph
+    from thoth.glyph import lib
+    from thoth.glyph.instrumentation import Instrumentation
+    from thoth.glyph.instrumentation import set_instrumentation
+
+    source = glyph.open_source(path)
+    glyph.warm_up(model_path=model_path)
+    instrumentation = Instrumentation()
+    set_instrumentation(instrumentation)
+
+    if case == "classify_message":
+        messages = [message for _, message in islice(lib._walk_by_date(source, 0, sys.maxsize), _SINGLE_MESSAGES)]
+        seconds, _ = _best_of(repeat, lambda: [glyph.classify_message(m, model_path=model_path) for m in messages])
+        count = len(messages)
+    elif case in ("classify_messages", "generate_log"):
+        messages = [message for _, message in lib._walk_by_date(source, 0, sys.maxsize)]
+        if case == "classify_messages":
+            seconds, _ = _best_of(
+                repeat, lambda: glyph.classify_messages(messages, model_path=model_path, as_frame=False)
+            )
+        else:
+            seconds, _ = _best_of(
+                repeat, lambda: glyph.generate_log(messages, glyph.Format.DEFAULT, model_path=model_path)
+            )
+        count = len(messages)
+    elif case == "classify_by_date":
+        # Classify the second half of the history so that the walk has to stop early.
+        middle = START_TIME + layout.commits * COMMIT_INTERVAL // 2
+        start = datetime.date.fromtimestamp(middle).isoformat()
+        seconds, result = _best_of(
+            repeat, lambda: glyph.classify_by_date(path, start, model_path=model_path, as_frame=False)
+        )
+        count = len(result)
+    elif case == "classify_by_tag":
+        start_tag, end_tag = "v1", f"v{layout.commits // layout.tag_every}"
+        seconds, result = _best_of(
+            repeat, lambda: glyph.classify_by_tag(path, start_tag, end_tag, model_path=model_path, as_frame=False)
+        )
+        count = len(result)
+    else:
+        raise ValueError(f"Unknown benchmark case {case!r}")
+
+    return {
+        "messages": count,
+        "seconds": seconds,
+        "messages_per_second": count / seconds if seconds else 0.0,
+        # Linux reports the maximum resident set size in kilobytes.
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        # Average time spent in pipeline stages per run.
+        "stages": {name: stage["seconds"] / repeat for name, stage in instrumentation.to_dict().items()},
+    }
+
+
+def _environment() -> Dict[str, Any]:
+    """Describe the environment benchmarks were run in."""
+    from thoth.glyph import __version__
+
+    return {
+        "glyph": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Compare results with a baseline, return names of cases with throughput regressions."""
+    regressions = []
+    click.echo(f"\n{'case':<32} {'baseline msg/s':>15} {'current msg/s':>15} {'ratio':>7}")
+    for name, result in results.items():
+        previous = baseline["results"].get(name)
+        if previous is None or not previous["messages_per_second"]:
+            continue
+
+        ratio = result["messages_per_second"] / previous["messages_per_second"]
+        flag = ""
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        click.echo(
+            f"{name:<32} {previous['messages_per_second']:>15.0f} {result['messages_per_second']:>15.0f} "
+            f"{ratio:>7.2f}{flag}"
+        )
+
+    return regressions
+
+
+@click.command()
+@click.option(
+    "--scale",
+    "scales",
+    type=int,
+    multiple=True,
+    default=_DEFAULT_SCALES,
+    show_default=True,
+    help="Number of commits in a synthetic repository, can be given multiple times (up to 1M commits)",
+)
+@click.option(
+    "--case",
+    "cases",
+    type=click.Choice(_CASES),
+    multiple=True,
+    default=_CASES,
+    show_default=True,
+    help="Benchmark cases to run",
+)
+@click.option(
+    "--repos-dir",
+    type=str,
+    default=os.path.join(tempfile.gettempdir(), "glyph-benchmark-repos"),
+    show_default=True,
+    help="Directory with generated repositories, they are reused across runs",
+)
+@click.option("--model-path", type=str, help="Path to a custom model file to be used by the classifier")
+@click.option("--repeat", type=int, default=3, show_default=True, help="Take the best time out of N runs")
+@click.option("--output", type=str, help="Write results to the given JSON file")
+@click.option("--save-baseline", type=str, help="Store results as a baseline in the given JSON file")
+@click.option("--baseline", type=str, help="Compare results with the baseline stored in the given JSON file")
+@click.option("--tolerance", type=float, default=0.1, show_default=True, help="Allowed relative drop of throughput")
+def main(
+    scales: Tuple[int, ...],
+    cases: Tuple[str, ...],
+    repos_dir: str,
+    model_path: Optional[str],
+    repeat: int,
+    output: Optional[str],
+    save_baseline: Optional[str],
+    baseline: Optional[str],
+    tolerance: float,
+) -> None:
+    """Run the benchmark suite."""
+    results: Dict[str, Any] = {}
+    context = multiprocessing.get_context("fork")
+
+    click.echo(f"{'case':<32} {'messages':>9} {'seconds':>9} {'msg/s':>10} {'RSS MB':>8}  stages")
+    for scale in scales:
+        layout = RepositoryLayout(scale)
+        path = ensure_repository(repos_dir, layout)
+
+        for case in cases:
+            with context.Pool(1) as pool:
+                result = pool.apply(_run_case, (case, path, layout, model_path, repeat))
+
+            name = f"{case}@{scale}"
+            results[name] = result
+            stages = " ".join(f"{stage}={seconds:.3f}s" for stage, seconds in result["stages"].items())
+            click.echo(
+                f"{name:<32} {result['messages']:>9} {result['seconds']:>9.3f} "
+                f"{result['messages_per_second']:>10.0f} {result['peak_rss_mb']:>8.1f}  {stages}"
+            )
+
+    report = {"environment": _environment(), "results": results}
+    for path in (output, save_baseline):
+        if path is not None:
+            with open(path, "w") as report_file:
+                json.dump(report, report_file, indent=2)
+
+    if baseline is not None:
+        with open(baseline) as baseline_file:
+            regressions = _compare(results, json.load(baseline_file), tolerance)
+
+        if regressions:
+            click.echo(f"\nThroughput regressed in {len(regressions)} cases: {', '.join(regressions)}", err=True)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Generate synthetic Git repositories for benchmarks, offline and reproducibly.
+
+Commit messages are sampled from the bundled labeled commits, the history contains merged feature
+branches, commits of a dependency update bot and tags. The same seed always gives the same history.
+"""
+
+import os
+import random
+import shutil
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+import click
+import pygit2
+
+_LABELED_COMMITS = os.path.join(os.path.dirname(__file__), "..", "thoth", "glyph", "data", "commits-labeled.txt")
+
+# Commit time of the root commit (2015-01-01) and the time between subsequent commits.
+START_TIME = 1420070400
+COMMIT_INTERVAL = 600
+
+# Objects are packed after this number of commits, millions of loose objects would take gigabytes on disk.
+_PACK_EVERY = 50_000
+
+_BOT = pygit2.Signature("khebhut[bot]", "khebhut@thoth-station.ninja", START_TIME, 0)
+_AUTHORS = [("Fridolin Pokorny", "fridolin@redhat.com"), ("Tushar Sharma", "tussharm@redhat.com")] + [
+    (f"Developer {i}", f"developer{i}@example.com") for i in range(8)
+]
+_PACKAGES = ["click", "pandas", "pygit2", "fasttext", "thoth-common", "requests", "numpy", "toml"]
+
+
+class RepositoryLayout(NamedTuple):
+    """Shape of a synthetic repository."""
+
+    commits: int
+    tag_every: int = 100
+    merge_every: int = 20
+    branch_length: int = 3
+    bot_every: int = 5
+    seed: int = 42
+
+
+def load_dataset() -> List[str]:
+    """Load messages of the bundled labeled commits."""
+    with open(_LABELED_COMMITS) as labeled_file:
+        next(labeled_file)  # Header.
+        return [line.split(" ", maxsplit=1)[1].strip() for line in labeled_file if " " in line]
+
+
+def _pack(repo: pygit2.Repository, oids: List[pygit2.Oid]) -> None:
+    """Pack the given objects and drop all the loose objects, they are expected to be in packs by now."""
+    repo.pack(pack_delegate=lambda builder: [builder.add(oid) for oid in oids])
+
+    objects_dir = os.path.join(repo.path, "objects")
+    for entry in os.listdir(objects_dir):
+        if len(entry) == 2:
+            shutil.rmtree(os.path.join(objects_dir, entry))
+
+
+def generate_repository(path: str, layout: RepositoryLayout) -> str:
+    """Generate a repository with the given layout in path, return oid of the tip commit.
+
+    Every merge_every-th mainline commit merges a branch of branch_length commits, every bot_every-th
+    commit is an automatic dependency update and every tag_every-th commit is tagged as v<N>.
+    """
+    rng = random.Random(layout.seed)
+    dataset = load_dataset()
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    repo = pygit2.init_repository(path, initial_head="master")
+    tree = repo.TreeBuilder().write()
+
+    created = 0
+    pending: List[pygit2.Oid] = [tree]
+    tip: Optional[pygit2.Oid] = None
+
+    def commit(message: str, parents: List[pygit2.Oid], bot: bool = False) -> pygit2.Oid:
+        nonlocal created
+        timestamp = START_TIME + created * COMMIT_INTERVAL
+        if bot:
+            signature = pygit2.Signature(_BOT.name, _BOT.email, timestamp, 0)
+        else:
+            signature = pygit2.Signature(*rng.choice(_AUTHORS), timestamp, 0)
+
+        oid = repo.create_commit(None, signature, signature, message, tree, parents)
+        created += 1
+        pending.append(oid)
+        if layout.tag_every and created % layout.tag_every == 0:
+            repo.references.create(f"refs/tags/v{created // layout.tag_every}", oid)
+        if len(pending) >= _PACK_EVERY:
+            _pack(repo, pending)
+            pending.clear()
+
+        return oid
+
+    while created < layout.commits:
+        parents = [tip] if tip is not None else []
+        if layout.bot_every and created % layout.bot_every == layout.bot_every - 1:
+            package = rng.choice(_PACKAGES)
+            major = rng.randrange(10)
+            minor = rng.randrange(20)
+            message = f"Automatic Update of dependency {package} from {major}.{minor}.0 to {major}.{minor + 1}.0"
+            tip = commit(message, parents, bot=True)
+        elif (
+            tip is not None
+            and layout.merge_every
+            and created % layout.merge_every == 0
+            and created + layout.branch_length + 1 <= layout.commits
+        ):
+            branch_tip = tip
+            for _ in range(layout.branch_length):
+                branch_tip = commit(f"{rng.choice(dataset)} (#{created})", [branch_tip])
+            tip = commit(f"Merge pull request #{created} from developer/feature-{created}", [tip, branch_tip])
+        else:
+            tip = commit(f"{rng.choice(dataset)} (#{created})", parents)
+
+    assert tip is not None, "At least one commit has to be generated"
+    repo.references.create("refs/heads/master", tip, force=True)
+    if pending:
+        _pack(repo, pending)
+
+    return str(tip)
+
+
+def ensure_repository(repos_dir: str, layout: RepositoryLayout) -> str:
+    """Get path to a repository with the given layout, generate it only if it was not generated before."""
+    name = "-".join(f"{field}{value}" for field, value in layout._asdict().items())
+    path = os.path.join(repos_dir, name)
+    marker = os.path.join(path, ".git", "glyph-benchmark-tip")
+
+    if not os.path.exists(marker):
+        tip = generate_repository(path, layout)
+        with open(marker, "w") as marker_file:
+            marker_file.write(tip)
+
+    return path
+
+
+@click.command()
+@click.argument("path", type=str)
+@click.option("--commits", type=int, default=10_000, show_default=True, help="Number of commits to generate")
+@click.option("--tag-every", type=int, default=100, show_default=True, help="Tag every N-th commit, 0 for no tags")
+@click.option("--merge-every", type=int, default=20, show_default=True, help="Merge a branch every N commits")
+@click.option("--bot-every", type=int, default=5, show_default=True, help="Every N-th commit is made by a bot")
+@click.option("--seed", type=int, default=42, show_default=True, help="Seed of the random generator")
+def main(path: str, commits: int, tag_every: int, merge_every: int, bot_every: int, seed: int) -> None:
+    """Generate a synthetic repository in PATH."""
+    layout = RepositoryLayout(commits, tag_every=tag_every, merge_every=merge_every, bot_every=bot_every, seed=seed)
+    click.echo(generate_repository(path, layout))
+
+
+if __name__ == "__main__":
+    main()
@@ -104,6 +104,7 @@ setup(
     package_data={"thoth.glyph": ["data/*", "py.typed"]},
     entry_points={"console_scripts": ["thoth-glyph=thoth.glyph.cli:cli"]},
     install_requires=get_install_requires(),
+    extras_require={"fasttext": ["fasttext"], "pandas": ["pandas"], "parquet": ["pyarrow"]},
     cmdclass={"test": Test},
     long_description_content_type="text/x-rst",
 )
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of the asyncio API."""
+
+import asyncio
+import threading
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Tuple
+
+import pytest
+
+from thoth.glyph import MLModel
+from thoth.glyph import PhraseRules
+from thoth.glyph import aio
+from thoth.glyph.aio import AsyncClassifier
+from thoth.glyph.sources import SourceCommit
+
+
+class _RecordingRules(PhraseRules):
+    """Rules recording threads they were applied in."""
+
+    def __init__(self) -> None:
+        """Initialize rules matching dependency updates."""
+        super().__init__({"Automatic Updates": ["Automatic Update of dependency"]})
+        self.threads: List[threading.Thread] = []
+
+    def split(self, messages: List[str]) -> Tuple[Dict[str, List[str]], List[str]]:
+        """Split messages, record the current thread."""
+        self.threads.append(threading.current_thread())
+        return super().split(messages)
+
+
+class _BlockingSource:
+    """A commit source whose walk blocks after the first commit until it is released."""
+
+    def __init__(self) -> None:
+        """Initialize the source of 100 commits."""
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.walked = 0
+
+    def commits_by_date(self, *_: object) -> Iterator[SourceCommit]:
+        """Walk commits, block before the second one."""
+        for index in range(100):
+            if index == 1:
+                self.started.set()
+                self.release.wait(5)
+            self.walked += 1
+            yield SourceCommit(f"{index:040x}", f"Fix bug {index}", "Developer", index)
+
+
+def _cancel_walk(monkeypatch, cancel) -> _BlockingSource:
+    """Start a walk of the blocking source, stop it by the given coroutine function, return the source."""
+    source = _BlockingSource()
+    monkeypatch.setattr(aio, "open_source", lambda path, source_type: source)
+
+    async def run() -> None:
+        async with AsyncClassifier() as classifier:
+            await cancel(classifier, source)
+            source.release.set()
+
+    asyncio.run(run())
+    return source
+
+
+def test_classify_by_date_cancelled(monkeypatch) -> None:
+    """Test a cancelled caller stops its walk at the next commit."""
+
+    async def cancel(classifier: AsyncClassifier, source: _BlockingSource) -> None:
+        task = asyncio.ensure_future(classifier.classify_by_date("repository"))
+        await asyncio.get_running_loop().run_in_executor(None, source.started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    assert _cancel_walk(monkeypatch, cancel).walked == 2
+
+
+def test_classify_by_date_timeout(monkeypatch) -> None:
+    """Test a walk which does not finish in time raises a timeout and stops at the next commit."""
+
+    async def cancel(classifier: AsyncClassifier, source: _BlockingSource) -> None:
+        with pytest.raises(asyncio.TimeoutError):
+            await classifier.classify_by_date("repository", timeout=0.05)
+
+    assert _cancel_walk(monkeypatch, cancel).walked == 2
+
+
+def test_classify_message_timeout(monkeypatch) -> None:
+    """Test messages of a caller which timed out while its batch was queued are not predicted."""
+    predicting = threading.Event()
+    release = threading.Event()
+    batches: List[List[str]] = []
+
+    def predict_labels(messages: List[str], *_: object) -> List[str]:
+        batches.append(messages)
+        if len(batches) == 1:
+            predicting.set()
+            release.wait(5)
+        return ["feature"] * len(messages)
+
+    monkeypatch.setattr(aio, "predict_labels", predict_labels)
+
+    async def run() -> None:
+        async with AsyncClassifier(max_latency=0) as classifier:
+            first = asyncio.ensure_future(classifier.classify_message("Add first feature"))
+            await asyncio.get_running_loop().run_in_executor(None, predicting.wait, 5)
+            with pytest.raises(asyncio.TimeoutError):
+                await classifier.classify_message("Add second feature", timeout=0.05)
+            release.set()
+            assert await first == "feature"
+            assert await classifier.classify_message("Add third feature") == "feature"
+
+    asyncio.run(run())
+    assert batches == [["add first feature"], ["add third feature"]]
+
+
+def test_generate_log_off_loop(model_path) -> None:
+    """Test rules are applied outside of the event loop thread and messages are classified."""
+    rules = _RecordingRules()
+
+    async def run() -> List[str]:
+        async with AsyncClassifier(MLModel.FASTTEXT, model_path) as classifier:
+            result = await classifier.classify_messages(["Fix crash\non empty input"])
+            assert result.messages == ["Fix crashon empty input"]
+            return await classifier.generate_log(["Fix crash", "Automatic Update of dependency click"], rules=rules)
+
+    changelog = asyncio.run(run())
+    assert any("Automatic Update of dependency click" in entry for entry in changelog)
+    assert rules.threads and threading.main_thread() not in rules.threads
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of the persistent classification cache."""
+
+import os
+import sqlite3
+import time
+
+import pytest
+
+from thoth.glyph.cache import ClassificationCache
+from thoth.glyph.cache import LabelCache
+from thoth.glyph.cli import _label_cache
+
+
+def test_round_trip(tmp_path) -> None:
+    """Test labels are kept per model across cache instances."""
+    with ClassificationCache(str(tmp_path)) as cache:
+        cache.put_many([("a" * 40, "features"), ("b" * 40, "corrective")], "model1")
+        cache.put_many([("a" * 40, "perfective")], "model2")
+
+    with ClassificationCache(str(tmp_path)) as cache:
+        assert cache.get_many(["a" * 40, "b" * 40, "c" * 40], "model1") == {
+            "a" * 40: "features",
+            "b" * 40: "corrective",
+        }
+        assert cache.get_many(["a" * 40, "b" * 40], "model2") == {"a" * 40: "perfective"}
+        assert cache.stats()["models"] == {"model1": 2, "model2": 1}
+
+
+def test_many_oids(tmp_path) -> None:
+    """Test lookups of more commits than fit into a single query."""
+    labels = [(f"{index:040x}", "features") for index in range(1200)]
+    with ClassificationCache(str(tmp_path)) as cache:
+        cache.put_many(labels, "model")
+        assert cache.get_many((oid for oid, _ in labels), "model") == dict(labels)
+
+
+def test_prune_max_age(tmp_path) -> None:
+    """Test entries older than the given age are evicted."""
+    with ClassificationCache(str(tmp_path)) as cache:
+        cache.put_many([("a" * 40, "features")], "model")
+        time.sleep(0.05)
+        cache.put_many([("b" * 40, "features")], "model")
+        assert cache.prune(max_age=0.025) == 1
+        assert cache.get_many(["a" * 40, "b" * 40], "model") == {"b" * 40: "features"}
+
+
+def test_prune_max_entries(tmp_path) -> None:
+    """Test the least recently used entries are evicted above the given number of entries."""
+    with ClassificationCache(str(tmp_path)) as cache:
+        cache.put_many([("a" * 40, "features"), ("b" * 40, "features"), ("c" * 40, "features")], "model")
+        time.sleep(0.01)
+        cache.get_many(["a" * 40], "model")
+        assert cache.prune(max_entries=1) == 2
+        assert cache.get_many(["a" * 40, "b" * 40, "c" * 40], "model") == {"a" * 40: "features"}
+
+
+def test_prune_max_size(tmp_path) -> None:
+    """Test the least recently used entries are evicted until the database fits the given size."""
+    with ClassificationCache(str(tmp_path)) as cache:
+        cache.put_many(((f"{index:040x}", "features") for index in range(20000)), "model")
+        size = os.path.getsize(cache.path)
+        removed = cache.prune(max_size=size // 4)
+        assert 0 < removed < 20000
+        assert os.path.getsize(cache.path) <= size // 4
+        assert cache.prune(max_size=size) == 0
+
+
+def test_abstract_cache() -> None:
+    """Test incomplete cache backends cannot be created."""
+
+    class _Incomplete(LabelCache):
+        def get_many(self, oids, model_id):
+            return {}
+
+    with pytest.raises(TypeError):
+        _Incomplete()
+
+
+def test_label_cache_closed(tmp_path) -> None:
+    """Test caches opened for a command are closed once it is done."""
+    with _label_cache(True, str(tmp_path)) as cache:
+        assert isinstance(cache, ClassificationCache)
+        cache.put_many([("a" * 40, "features")], "model")
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        cache.get_many(["a" * 40], "model")
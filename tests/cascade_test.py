@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of the cascade resolving self-describing messages by rules before the model."""
+
+from typing import List
+from typing import Optional
+
+import pytest
+
+from thoth.glyph.cascade import match_label
+from thoth.glyph.cascade import split_by_rules
+from thoth.glyph.models import CascadeModel
+from thoth.glyph.models import FasttextModel
+
+
+@pytest.mark.parametrize(
+    "message,label",
+    [
+        ("feat: add a command", "features"),
+        ("fix(parser)!: crash on empty input", "corrective"),
+        ("Refactor: simplify the walker", "perfective"),
+        ("docs(readme): describe the cache", "nonfunctional"),
+        ("  [bugfix] handle missing tags", "corrective"),
+        ("[DEPS] bump click", "nonfunctional"),
+        ("✨ Add watch mode", "features"),
+        (":bug: Fix the parser", "corrective"),
+        ("⚡️ Speed up walks", "perfective"),
+        ("test: cover the cache", None),
+        ("wip: something", None),
+        ("[wip] something", None),
+        ("Fix crash on empty input", None),
+        ("Fix: missing space after colon:no", "corrective"),
+        ("fix:no space after colon", None),
+        ("Add feature ✨", None),
+    ],
+)
+def test_match_label(message: str, label: Optional[str]) -> None:
+    """Test labels declared by Conventional Commits types, tags and gitmoji prefixes, other messages are left."""
+    assert match_label(message) == label
+
+
+def test_split_by_rules() -> None:
+    """Test labels resolved by rules are keyed by position, positions of the rest are kept in order."""
+    resolved, rest = split_by_rules(["Fix crash", "feat: add", "Update docs", "🐛 Fix leak"])
+    assert resolved == {1: "features", 3: "corrective"}
+    assert rest == [0, 2]
+
+
+def test_predict_labels(monkeypatch, instrumentation) -> None:
+    """Test only messages not resolved by rules reach the model, labels are merged in the original order."""
+    predicted: List[List[str]] = []
+
+    def predict_labels(messages: List[str], model_path: Optional[str] = None, workers: int = 1) -> List[str]:
+        predicted.append(messages)
+        return ["perfective"] * len(messages)
+
+    monkeypatch.setattr(FasttextModel, "predict_labels", staticmethod(predict_labels))
+    messages = ["feat: add watch mode", "Improve walks", "[bugfix] fix cache", "Update readme", ":memo: Add docs"]
+    labels = CascadeModel.predict_labels(messages)
+
+    assert labels == ["features", "perfective", "corrective", "perfective", "nonfunctional"]
+    assert predicted == [["Improve walks", "Update readme"]]
+    assert instrumentation.to_dict()["rules_fast_path"]["count"] == 3
+
+
+def test_predict_labels_all_resolved(monkeypatch, instrumentation) -> None:
+    """Test the model is not used at all if rules resolve every message."""
+    monkeypatch.setattr(FasttextModel, "predict_labels", pytest.fail)
+    assert CascadeModel.predict_labels(["fix: crash", "chore: release"]) == ["corrective", "nonfunctional"]
+    assert instrumentation.to_dict()["rules_fast_path"] == {
+        "calls": 1,
+        "seconds": pytest.approx(0, abs=1),
+        "count": 2,
+        "bytes": 0,
+    }
+
+
+def test_classify_message(monkeypatch) -> None:
+    """Test a single message is resolved by rules before the model, the rest is classified by the model."""
+    monkeypatch.setattr(FasttextModel, "classify_message", staticmethod(lambda message, model_path=None: "features"))
+    assert CascadeModel.classify_message("perf: cache labels") == "perfective"
+    assert CascadeModel.classify_message("Add watch mode") == "features"
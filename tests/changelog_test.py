@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of incrementally generated changelogs."""
+
+import json
+from typing import List
+
+import pytest
+
+pygit2 = pytest.importorskip("pygit2")
+
+from thoth.glyph import MLModel  # noqa: E402
+from thoth.glyph import PhraseRules  # noqa: E402
+from thoth.glyph.lib import ChangelogState  # noqa: E402
+from thoth.glyph.lib import _resume_point  # noqa: E402
+from thoth.glyph.lib import generate_changelog  # noqa: E402
+
+
+def _state(watermark: str, model: str = "model", config: str = "config") -> ChangelogState:
+    """Create a changelog state with no groups."""
+    return ChangelogState(watermark, model, config, {})
+
+
+def _entries(state_file: str) -> List[str]:
+    """Get all the messages stored in a changelog state."""
+    with open(state_file) as f:
+        return [message for group in json.load(f)["groups"].values() for message in group]
+
+
+def test_resume_from_ancestor(repo, commit) -> None:
+    """Test a run continues from the watermark if it is an ancestor of HEAD."""
+    watermark = commit("Add feature")
+    head = pygit2.Oid(hex=commit("Fix bug"))
+    assert _resume_point(repo, head, _state(watermark), "model", "config") == pygit2.Oid(hex=watermark)
+    assert _resume_point(repo, head, _state(str(head)), "model", "config") == head
+
+
+def test_resume_rewritten_history(repo, commit) -> None:
+    """Test the changelog is regenerated if the watermark is no longer reachable from HEAD."""
+    root = commit("Initial commit")
+    rewritten = commit("Add feature")
+    head = pygit2.Oid(hex=commit("Add feature, amended", parents=[root]))
+    assert _resume_point(repo, head, _state(rewritten), "model", "config") is None
+    assert _resume_point(repo, head, _state("0" * 40), "model", "config") is None
+    assert _resume_point(repo, head, _state("not an oid"), "model", "config") is None
+
+
+def test_resume_configuration_changed(repo, commit) -> None:
+    """Test the changelog is regenerated if the model or the configuration changed."""
+    watermark = commit("Add feature")
+    head = pygit2.Oid(hex=commit("Fix bug"))
+    assert _resume_point(repo, head, _state(watermark), "other model", "config") is None
+    assert _resume_point(repo, head, _state(watermark), "model", "other config") is None
+
+
+def test_generate_changelog_incremental(repo, commit, model_path, tmp_path) -> None:
+    """Test new commits are merged into the stored changelog, a configuration change regenerates it."""
+    state_file = str(tmp_path / "state.json")
+    commit("Add feature one")
+    commit("Automatic Update of dependency click")
+    generate_changelog(repo.workdir, state_file, model=MLModel.FASTTEXT, model_path=model_path)
+    assert sorted(_entries(state_file)) == ["Add feature one", "Automatic Update of dependency click"]
+
+    commit("Fix bug two")
+    generate_changelog(repo.workdir, state_file, model=MLModel.FASTTEXT, model_path=model_path)
+    assert sorted(_entries(state_file)) == ["Add feature one", "Automatic Update of dependency click", "Fix bug two"]
+
+    # Different rules give a different grouping, the stored groups cannot be reused.
+    rules = PhraseRules({"Bug Fixes": ["fix bug"]})
+    generate_changelog(repo.workdir, state_file, model=MLModel.FASTTEXT, model_path=model_path, rules=rules)
+    with open(state_file) as f:
+        groups = json.load(f)["groups"]
+    assert groups["Bug Fixes"] == ["Fix bug two"]
+    assert "Automatic Updates" not in groups
+
+
+def test_generate_changelog_start_tag(repo, commit, model_path, tmp_path) -> None:
+    """Test a changed start tag, or a tag pointing to another commit, regenerates the changelog."""
+    state_file = str(tmp_path / "state.json")
+    first = commit("Add feature one")
+    second = commit("Add feature two")
+    commit("Fix bug three")
+    generate_changelog(repo.workdir, state_file, model=MLModel.FASTTEXT, model_path=model_path)
+    assert len(_entries(state_file)) == 3
+
+    repo.references.create("refs/tags/v1.0.0", pygit2.Oid(hex=first))
+    generate_changelog(repo.workdir, state_file, model=MLModel.FASTTEXT, model_path=model_path, start_tag="v1.0.0")
+    assert sorted(_entries(state_file)) == ["Add feature two", "Fix bug three"]
+
+    repo.references.create("refs/tags/v1.0.0", pygit2.Oid(hex=second), force=True)
+    generate_changelog(repo.workdir, state_file, model=MLModel.FASTTEXT, model_path=model_path, start_tag="v1.0.0")
+    assert _entries(state_file) == ["Fix bug three"]
@@ -16,3 +16,55 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 """Tests related to glyph."""
+
+import os
+import subprocess
+import sys
+from typing import Dict
+
+import pytest
+
+_PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Dependencies which are expensive to import and should not be needed unless a classification is done.
+_HEAVY_MODULES = ("pandas", "pygit2", "fasttext", "thoth.common")
+# Cumulative time in microseconds the import of thoth.glyph package can take.
+_IMPORT_TIME_BUDGET = 100_000
+
+
+def _import_times(*args: str) -> Dict[str, int]:
+    """Run Python with import time reporting, return cumulative import times of all imported modules."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [_PROJECT_DIR, os.getenv("PYTHONPATH")])))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args], cwd=_PROJECT_DIR, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+    import_times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, module = line[len("import time:") :].split("|")
+        import_times[module.strip()] = int(cumulative)
+
+    return import_times
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ("-c", "import thoth.glyph"),
+        ("-m", "thoth.glyph.cli", "--version"),
+        ("-m", "thoth.glyph.cli", "--help"),
+    ],
+)
+def test_no_heavy_imports(args) -> None:
+    """Test heavy dependencies are not imported on package import and CLI startup."""
+    import_times = _import_times(*args)
+    assert "thoth.glyph" in import_times
+    assert not [module for module in _HEAVY_MODULES if module in import_times]
+
+
+def test_import_time_budget() -> None:
+    """Test importing the package fits into the import time budget."""
+    import_times = _import_times("-c", "import thoth.glyph")
+    assert import_times["thoth.glyph"] < _IMPORT_TIME_BUDGET
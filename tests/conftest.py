@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Fixtures shared by tests of glyph."""
+
+import os
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import pytest
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "thoth", "glyph", "data")
+_TRAIN_PATH = os.path.join(_DATA_DIR, "commits.train")
+
+# Commit time of the first commit created by the commit fixture (2020-01-01) and the time between commits.
+START_TIME = 1577836800
+COMMIT_INTERVAL = 3600
+
+
+@pytest.fixture(scope="session")
+def model_path(tmp_path_factory) -> str:
+    """Train a small fasttext model on the bundled training data, it stands for the model not shipped in the tree."""
+    fasttext = pytest.importorskip("fasttext")
+    model = fasttext.train_supervised(_TRAIN_PATH, dim=8, epoch=1, bucket=20000, thread=1, verbose=0)
+    path = str(tmp_path_factory.mktemp("model") / "model.bin")
+    model.save_model(path)
+    return path
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """Create an empty repository."""
+    pygit2 = pytest.importorskip("pygit2")
+    return pygit2.init_repository(str(tmp_path / "repo"), initial_head="master")
+
+
+@pytest.fixture
+def commit(repo) -> Callable[..., str]:
+    """Get a function creating commits in the repository, commits are one hour apart and HEAD follows them.
+
+    Files are given as a mapping of paths to their content, they replace files of the first parent.
+    """
+    import pygit2
+
+    created = [0]
+
+    def create(
+        message: str,
+        parents: Optional[List[str]] = None,
+        files: Optional[Dict[str, str]] = None,
+        author: str = "Developer",
+    ) -> str:
+        parents = parents if parents is not None else ([str(repo.head.target)] if not repo.head_is_unborn else [])
+        index = pygit2.Index()
+        if parents:
+            index.read_tree(repo.get(parents[0]).tree)
+        for path, content in (files or {}).items():
+            index.add(pygit2.IndexEntry(path, repo.create_blob(content.encode()), pygit2.GIT_FILEMODE_BLOB))
+        tree = index.write_tree(repo)
+
+        signature = pygit2.Signature(author, "developer@example.com", START_TIME + created[0] * COMMIT_INTERVAL, 0)
+        created[0] += 1
+        oid = repo.create_commit(None, signature, signature, message, tree, parents)
+        repo.references.create("refs/heads/master", oid, force=True)
+        return str(oid)
+
+    return create
+
+
+@pytest.fixture
+def instrumentation():
+    """Install process-wide instrumentation for the test, disable it afterwards."""
+    from thoth.glyph.instrumentation import Instrumentation
+    from thoth.glyph.instrumentation import set_instrumentation
+
+    instrumentation = Instrumentation()
+    set_instrumentation(instrumentation)
+    yield instrumentation
+    set_instrumentation(None)
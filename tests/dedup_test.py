@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of predicting distinct messages once."""
+
+from typing import List
+
+import pytest
+
+from thoth.glyph.dedup import normalize
+from thoth.glyph.dedup import predict_distinct
+
+
+@pytest.mark.parametrize(
+    "message,expected",
+    [
+        ("  fix\t bug \x0b\x0c\r\x00 now ", "fix bug now"),
+        ("fix\u00a0bug", "fix\u00a0bug"),
+        ("fix\u2028bug", "fix\u2028bug"),
+        ("fix\u3000bug", "fix\u3000bug"),
+    ],
+)
+def test_normalize(message: str, expected: str) -> None:
+    """Test only characters fastText splits words on are collapsed, other Unicode whitespace is kept."""
+    assert normalize(message) == expected
+
+
+def test_predict_distinct() -> None:
+    """Test each distinct message is predicted once and labels are scattered back."""
+    calls: List[List[str]] = []
+
+    def predict(messages: List[str]) -> List[str]:
+        calls.append(messages)
+        return [message.split(" ")[0] for message in messages]
+
+    messages = ["fix  bug", "fix bug", "fix\u00a0bug", "add feature"]
+    assert predict_distinct(predict, messages) == ["fix", "fix", "fix\u00a0bug", "add"]
+    assert calls == [["fix  bug", "fix\u00a0bug", "add feature"]]
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of measuring stages of the classification pipeline."""
+
+import json
+from typing import List
+from typing import Tuple
+
+import pytest
+
+from thoth.glyph.instrumentation import Instrumentation
+from thoth.glyph.instrumentation import get_instrumentation
+from thoth.glyph.instrumentation import set_instrumentation
+from thoth.glyph.instrumentation import stage
+
+
+def test_stage_disabled() -> None:
+    """Test stages are not recorded unless instrumentation is installed."""
+    assert get_instrumentation() is None
+    with stage("predict") as predict:
+        predict.measure(["message"])
+        predict.count = 1
+    assert get_instrumentation() is None
+
+
+def test_stage(instrumentation) -> None:
+    """Test runs of stages are aggregated with numbers and sizes of items and passed to the callback."""
+    recorded: List[Tuple[str, int, int]] = []
+    instrumentation.callback = lambda name, seconds, count, nbytes: recorded.append((name, count, nbytes))
+
+    for messages in (["fix bug", "add feature"], ["zpráva"]):
+        with stage("predict") as predict:
+            predict.measure(messages)
+    with stage("walk") as walk:
+        walk.count, walk.bytes = 3, 42
+
+    assert recorded == [("predict", 2, 18), ("predict", 1, 6), ("walk", 3, 42)]
+    measurements = instrumentation.to_dict()
+    assert {name: (stats["calls"], stats["count"], stats["bytes"]) for name, stats in measurements.items()} == {
+        "predict": (2, 3, 24),
+        "walk": (1, 3, 42),
+    }
+    assert all(stats["seconds"] >= 0 for stats in measurements.values())
+
+    instrumentation.reset()
+    assert instrumentation.to_dict() == {}
+
+
+def test_stage_exception(instrumentation) -> None:
+    """Test a stage which raised is recorded as well."""
+    with pytest.raises(ValueError):
+        with stage("load_model"):
+            raise ValueError
+    assert instrumentation.to_dict()["load_model"]["calls"] == 1
+
+
+def test_to_prometheus() -> None:
+    """Test measurements are formatted in the Prometheus text exposition format."""
+    instrumentation = Instrumentation(buckets=(1.0, 0.1))
+    instrumentation.record("walk", 0.05, 10, 100)
+    instrumentation.record("walk", 0.5, 5, 50)
+    instrumentation.record("predict", 2.0, 15, 150)
+
+    assert instrumentation.to_prometheus().splitlines() == [
+        "# HELP glyph_stage_duration_seconds Time spent in pipeline stages.",
+        "# TYPE glyph_stage_duration_seconds histogram",
+        'glyph_stage_duration_seconds_bucket{stage="predict",le="0.1"} 0',
+        'glyph_stage_duration_seconds_bucket{stage="predict",le="1.0"} 0',
+        'glyph_stage_duration_seconds_bucket{stage="predict",le="+Inf"} 1',
+        'glyph_stage_duration_seconds_sum{stage="predict"} 2.0',
+        'glyph_stage_duration_seconds_count{stage="predict"} 1',
+        'glyph_stage_duration_seconds_bucket{stage="walk",le="0.1"} 1',
+        'glyph_stage_duration_seconds_bucket{stage="walk",le="1.0"} 2',
+        'glyph_stage_duration_seconds_bucket{stage="walk",le="+Inf"} 2',
+        'glyph_stage_duration_seconds_sum{stage="walk"} 0.55',
+        'glyph_stage_duration_seconds_count{stage="walk"} 2',
+        "# HELP glyph_stage_items_total Number of items processed in pipeline stages.",
+        "# TYPE glyph_stage_items_total counter",
+        'glyph_stage_items_total{stage="predict"} 15',
+        'glyph_stage_items_total{stage="walk"} 15',
+        "# HELP glyph_stage_bytes_total Size of messages processed in pipeline stages.",
+        "# TYPE glyph_stage_bytes_total counter",
+        'glyph_stage_bytes_total{stage="predict"} 150',
+        'glyph_stage_bytes_total{stage="walk"} 150',
+    ]
+
+
+def test_cli_profile(repo, commit, model_path, tmp_path) -> None:
+    """Test --profile writes measurements of the stages a command ran through."""
+    pytest.importorskip("pygit2")
+    from click.testing import CliRunner
+
+    from thoth.glyph.cli import cli
+
+    commit("Add feature")
+    commit("Fix bug")
+    profile = str(tmp_path / "profile.json")
+    args = [
+        "--path",
+        repo.workdir,
+        "--model",
+        "fasttext",
+        "--model-path",
+        model_path,
+        "--output",
+        str(tmp_path / "log"),
+    ]
+    try:
+        result = CliRunner().invoke(cli, ["--profile", profile, "generate-log", *args])
+    finally:
+        set_instrumentation(None)
+
+    assert result.exit_code == 0, result.output
+    with open(profile) as profile_file:
+        measurements = json.load(profile_file)
+    assert measurements["predict"]["count"] == 2
+    assert all(set(stats) == {"calls", "seconds", "count", "bytes"} for stats in measurements.values())
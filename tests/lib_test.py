@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of the library functions classifying repositories."""
+
+import os
+from typing import Iterator
+from typing import List
+
+import pytest
+
+pygit2 = pytest.importorskip("pygit2")
+
+from thoth.glyph import MLModel  # noqa: E402
+from thoth.glyph import parallel  # noqa: E402
+from thoth.glyph import lib  # noqa: E402
+from thoth.glyph.lib import RepositorySpec  # noqa: E402
+from thoth.glyph.lib import classify_by_date  # noqa: E402
+from thoth.glyph.lib import classify_by_tag  # noqa: E402
+from thoth.glyph.lib import classify_repositories  # noqa: E402
+from thoth.glyph.lib import iter_classify_by_date  # noqa: E402
+from thoth.glyph.lib import iter_classify_by_tag  # noqa: E402
+from thoth.glyph.lib import iter_generate_log_by_tag  # noqa: E402
+
+
+def _linear_repository(path: str, messages: List[str]) -> str:
+    """Create a repository with a linear history of commits with the given messages, return its path."""
+    repo = pygit2.init_repository(path, initial_head="master")
+    tree = repo.TreeBuilder().write()
+    parents: List[pygit2.Oid] = []
+    for index, message in enumerate(messages):
+        signature = pygit2.Signature("Developer", "developer@example.com", 1577836800 + index * 60, 0)
+        parents = [repo.create_commit(None, signature, signature, message, tree, parents)]
+    repo.references.create("refs/heads/master", parents[0])
+    return path
+
+
+class _PoolSpy:
+    """Record sizes of batches of shards sent to a pool of worker processes."""
+
+    def __init__(self, pool, shards: List[int]) -> None:
+        """Initialize the spy of the given pool."""
+        self.pool = pool
+        self.shards = shards
+
+    def map(self, func, items, chunksize):
+        """Map func on items in the pool, record the number of items."""
+        self.shards.append(len(items))
+        return self.pool.map(func, items, chunksize=chunksize)
+
+
+class _CountingSource:
+    """Count commits walked in a commit source."""
+
+    def __init__(self, source) -> None:
+        """Initialize the wrapper of the given source."""
+        self.source = source
+        self.walked = 0
+
+    def _count(self, commits) -> Iterator:
+        """Count commits as they are walked."""
+        for commit in commits:
+            self.walked += 1
+            yield commit
+
+    def commits_by_date(self, *args) -> Iterator:
+        """Walk commits by date."""
+        return self._count(self.source.commits_by_date(*args))
+
+    def commits_by_tag(self, *args) -> Iterator:
+        """Walk commits between tags."""
+        return self._count(self.source.commits_by_tag(*args))
+
+
+@pytest.fixture
+def tagged_history(repo, commit) -> str:
+    """Create a repository with 100 commits, the first one is tagged v1.0.0, return its path."""
+    repo.references.create("refs/tags/v1.0.0", pygit2.Oid(hex=commit("Initial commit")))
+    for index in range(99):
+        commit(f"Fix bug {index}\n\nThe bug was in module {index % 7}." if index % 3 else f"Add feature {index}")
+    return repo.workdir
+
+
+@pytest.mark.parametrize(
+    "iter_classify,args,total",
+    [(iter_classify_by_date, (), 100), (iter_classify_by_tag, ("v1.0.0",), 99)],
+)
+def test_iter_classify_lazy(tagged_history, model_path, monkeypatch, iter_classify, args, total: int) -> None:
+    """Test the first chunk is classified before the history is walked to the end."""
+    source = _CountingSource(lib.open_source(tagged_history))
+    monkeypatch.setattr(lib, "open_source", lambda path, source_type: source)
+
+    classified = iter_classify(tagged_history, *args, model=MLModel.FASTTEXT, model_path=model_path, chunk_size=10)
+    assert source.walked == 0
+    assert next(classified).message == "fix bug 98the bug was in module 0."
+    assert source.walked == 10
+    assert len(list(classified)) == total - 1
+    assert source.walked == total
+
+
+@pytest.mark.parametrize(
+    "iter_classify,classify,args",
+    [(iter_classify_by_date, classify_by_date, ()), (iter_classify_by_tag, classify_by_tag, ("v1.0.0",))],
+)
+def test_iter_classify_equal(tagged_history, model_path, iter_classify, classify, args) -> None:
+    """Test commits classified chunk by chunk are the same as commits classified at once."""
+    expected = classify(tagged_history, *args, model=MLModel.FASTTEXT, model_path=model_path, as_frame=False)
+    classified = list(iter_classify(tagged_history, *args, model=MLModel.FASTTEXT, model_path=model_path, chunk_size=7))
+    assert [(commit.message, commit.label) for commit in classified] == list(expected)
+
+
+def test_classify_repositories_parallel(model_path, tmp_path, monkeypatch) -> None:
+    """Test walks in threads combined with worker processes give the same labels as a single process."""
+    specs = [
+        RepositorySpec(
+            _linear_repository(
+                os.path.join(tmp_path, f"repo{repo_index}"),
+                [f"fix bug {index} in module {repo_index}" for index in range(1500)],
+            )
+        )
+        for repo_index in range(2)
+    ]
+
+    shards: List[int] = []
+    get_pool = parallel._get_pool
+    monkeypatch.setattr(parallel, "_get_pool", lambda workers: _PoolSpy(get_pool(workers), shards))
+    try:
+        sharded = classify_repositories(specs, MLModel.FASTTEXT, model_path, jobs=2, workers=2, as_frame=False)
+    finally:
+        parallel.stop_workers()
+    single = classify_repositories(specs, MLModel.FASTTEXT, model_path, jobs=1, workers=1, as_frame=False)
+
+    # Messages of both repositories are predicted in one batch split into a shard per worker.
+    assert shards == [2]
+    assert [len(result) for result in sharded] == [1500, 1500]
+    assert [result.labels_predicted for result in sharded] == [result.labels_predicted for result in single]
+
+
+def test_iter_generate_log_by_tag(repo, commit, model_path) -> None:
+    """Test changelog of commits between tags is generated from their subject lines."""
+    repo.references.create("refs/tags/v1.0.0", pygit2.Oid(hex=commit("Initial commit")))
+    commit("Automatic Update of dependency click\n\nBody of the message.")
+    commit("")
+    entries = list(iter_generate_log_by_tag(repo.workdir, "v1.0.0", model=MLModel.FASTTEXT, model_path=model_path))
+    assert "".join(entries).count("Automatic Update of dependency click") == 1
+    assert "Body of the message" not in "".join(entries)
+    assert "Initial commit" not in "".join(entries)
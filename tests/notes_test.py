@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of labels kept in git notes."""
+
+import shutil
+import subprocess
+
+import pytest
+
+pygit2 = pytest.importorskip("pygit2")
+
+from thoth.glyph.cache import ClassificationCache  # noqa: E402
+from thoth.glyph.notes import DEFAULT_NOTES_REF  # noqa: E402
+from thoth.glyph.notes import GitNotesCache  # noqa: E402
+
+_OID = "ab" + "1" * 38
+_OTHER_OID = "ab" + "2" * 38
+
+
+def _notes_tree(repo):
+    """Get the tree of the notes commit."""
+    return repo.references.get(DEFAULT_NOTES_REF).peel(pygit2.Commit).tree
+
+
+def test_round_trip(repo) -> None:
+    """Test labels of multiple models are kept in one note per commit."""
+    with GitNotesCache(repo.workdir) as cache:
+        assert cache.get_many([_OID], "model1") == {}
+        cache.put_many([(_OID, "features"), (_OTHER_OID, "corrective")], "model1")
+        cache.put_many([(_OID, "perfective")], "model2")
+
+    cache = GitNotesCache(repo.workdir)
+    assert cache.get_many([_OID, _OTHER_OID], "model1") == {_OID: "features", _OTHER_OID: "corrective"}
+    assert cache.get_many([_OID, _OTHER_OID], "model2") == {_OID: "perfective"}
+    assert sorted(entry.name for entry in _notes_tree(repo)) == [_OID, _OTHER_OID]
+
+
+def test_fanout(repo) -> None:
+    """Test notes are found in fanout directories and new notes are added to them."""
+    note = repo.create_blob(b'{"label": "features", "model": "model"}\n')
+    fanout = repo.TreeBuilder()
+    fanout.insert(_OID[2:], note, pygit2.GIT_FILEMODE_BLOB)
+    root = repo.TreeBuilder()
+    root.insert(_OID[:2], fanout.write(), pygit2.GIT_FILEMODE_TREE)
+    signature = pygit2.Signature("Developer", "developer@example.com")
+    repo.create_commit(DEFAULT_NOTES_REF, signature, signature, "Notes", root.write(), [])
+
+    cache = GitNotesCache(repo.workdir)
+    assert cache.get_many([_OID], "model") == {_OID: "features"}
+
+    cache.put_many([(_OTHER_OID, "corrective")], "model")
+    tree = _notes_tree(repo)
+    assert [entry.name for entry in tree] == [_OID[:2]]
+    assert sorted(entry.name for entry in repo.get(tree[_OID[:2]].id)) == [_OID[2:], _OTHER_OID[2:]]
+    assert cache.get_many([_OID, _OTHER_OID], "model") == {_OID: "features", _OTHER_OID: "corrective"}
+
+
+def test_fallback(repo, tmp_path) -> None:
+    """Test labels found only in the fallback cache are added to notes."""
+    with ClassificationCache(str(tmp_path / "cache")) as fallback:
+        fallback.put_many([(_OID, "features")], "model")
+        cache = GitNotesCache(repo.workdir, fallback=fallback)
+        assert cache.get_many([_OID, _OTHER_OID], "model") == {_OID: "features"}
+
+    assert GitNotesCache(repo.workdir).get_many([_OID], "model") == {_OID: "features"}
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_git_notes(repo, commit) -> None:
+    """Test notes are readable by git notes."""
+    oid = commit("Add feature")
+    GitNotesCache(repo.workdir).put_many([(oid, "features")], "model")
+
+    result = subprocess.run(
+        ["git", "notes", "--ref", DEFAULT_NOTES_REF, "show", oid],
+        cwd=repo.workdir,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout == '{"label": "features", "model": "model"}\n'
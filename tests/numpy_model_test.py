@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of the NumPy evaluation of fasttext models."""
+
+import os
+import sys
+from typing import List
+
+import pytest
+
+fasttext = pytest.importorskip("fasttext")
+
+from thoth.glyph import models  # noqa: E402
+from thoth.glyph.numpy_model import NumpyClassifier  # noqa: E402
+from thoth.glyph.numpy_model import export_model  # noqa: E402
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "thoth", "glyph", "data")
+_TRAIN_PATH = os.path.join(_DATA_DIR, "commits.train")
+
+
+def _messages() -> List[str]:
+    """Get messages of the bundled labeled commits, both as they are and lowercased."""
+    messages = []
+    with open(os.path.join(_DATA_DIR, "commits-labeled.txt"), encoding="utf-8") as labeled_file:
+        for line in labeled_file:
+            messages.append(line.rstrip("\n").partition(" ")[2])
+
+    return messages + [message.lower() for message in messages] + ["", "__label__features", "naïve ünicode ✨"]
+
+
+@pytest.fixture(scope="module")
+def model_paths(tmp_path_factory):
+    """Train small models on the bundled training data, a dense one and a pruned quantized one."""
+    directory = tmp_path_factory.mktemp("models")
+    model = fasttext.train_supervised(
+        _TRAIN_PATH, dim=16, epoch=3, wordNgrams=2, minn=2, maxn=4, bucket=20000, thread=1, verbose=0
+    )
+    dense_path = str(directory / "dense.bin")
+    model.save_model(dense_path)
+
+    model.quantize(input=_TRAIN_PATH, cutoff=2000, retrain=True, qnorm=True, dsub=2, thread=1, verbose=0)
+    quantized_path = str(directory / "quantized.bin")
+    model.save_model(quantized_path)
+
+    return {"dense": dense_path, "quantized": quantized_path}
+
+
+@pytest.mark.parametrize("kind", ["dense", "quantized"])
+@pytest.mark.parametrize("exported", [False, True], ids=["bin", "exported"])
+def test_parity_with_fasttext(model_paths, tmp_path, kind: str, exported: bool) -> None:
+    """Test the NumPy backend predicts the same labels as fasttext."""
+    messages = _messages()
+    expected, _ = fasttext.load_model(model_paths[kind]).predict(messages)
+
+    path = model_paths[kind]
+    if exported:
+        path = str(tmp_path / "model.npm")
+        export_model(model_paths[kind], path)
+
+    assert NumpyClassifier.load(path).predict(messages) == [labels[0] for labels in expected]
+
+
+def test_newline_rejected(model_paths) -> None:
+    """Test lines with a newline are rejected like fasttext does."""
+    with pytest.raises(ValueError):
+        NumpyClassifier.load(model_paths["dense"]).predict(["first line\nsecond line"])
+
+
+def test_without_fasttext(model_paths, monkeypatch) -> None:
+    """Test models are evaluated by NumPy without the fasttext package, the fasttext model suggests the extra."""
+    expected = fasttext.load_model(model_paths["dense"]).predict(["fix crash on empty input"])[0][0][0]
+    monkeypatch.setitem(sys.modules, "fasttext", None)
+    assert NumpyClassifier.load(model_paths["dense"]).predict(["fix crash on empty input"]) == [expected]
+    with pytest.raises(ImportError, match=r"thoth-glyph\[fasttext\]"):
+        models._load_fasttext_model(model_paths["dense"])
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of sharding predictions across worker processes."""
+
+import os
+import threading
+from typing import List
+
+import pytest
+
+from thoth.glyph import parallel
+from thoth.glyph.parallel import map_shards
+from thoth.glyph.parallel import start_workers
+from thoth.glyph.parallel import stop_workers
+
+
+@pytest.fixture(autouse=True)
+def _stop_workers():
+    """Stop worker processes started by a test."""
+    yield
+    stop_workers()
+
+
+def _identity(items: List[str]) -> List[str]:
+    """Return the items processed."""
+    return items
+
+
+def _pids(items: List[str]) -> List[str]:
+    """Map items to the id of the process they were processed in."""
+    return [str(os.getpid())] * len(items)
+
+
+def test_map_shards() -> None:
+    """Test shards are processed in worker processes and merged in the original order."""
+    items = [str(index) for index in range(40)]
+    assert map_shards(_identity, items, 4, min_shard_size=10) == items
+    pids = map_shards(_pids, items, 4, min_shard_size=10)
+    assert str(os.getpid()) not in pids
+
+
+def test_map_shards_small() -> None:
+    """Test items are processed in the current process if there are not enough of them for more workers."""
+    assert set(map_shards(_pids, [str(index) for index in range(19)], 4, min_shard_size=10)) == {str(os.getpid())}
+    assert parallel._POOL is None
+
+
+def test_map_shards_threads() -> None:
+    """Test worker processes are used while other threads are running, workers are not forked from this process."""
+    stop = threading.Event()
+    thread = threading.Thread(target=stop.wait)
+    thread.start()
+    try:
+        pids = map_shards(_pids, [str(index) for index in range(40)], 4, min_shard_size=10)
+        assert str(os.getpid()) not in pids
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_start_workers_reused() -> None:
+    """Test the pool started up front is reused and grown when more workers are requested."""
+    start_workers(1)
+    assert parallel._POOL is None
+
+    start_workers(2)
+    pool = parallel._POOL
+    map_shards(_identity, [str(index) for index in range(20)], 2, min_shard_size=10)
+    assert parallel._POOL is pool
+
+    map_shards(_identity, [str(index) for index in range(40)], 4, min_shard_size=10)
+    assert parallel._POOL is not pool
+    assert parallel._POOL_SIZE == 4
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of trimming messages before they are classified."""
+
+import pytest
+
+from thoth.glyph.preprocess import MessagePreprocessor
+from thoth.glyph.preprocess import prepare_message
+from thoth.glyph.preprocess import set_preprocessor
+
+_SUBJECT = "Fix crash on empty input"
+
+
+@pytest.mark.parametrize(
+    "body,expected",
+    [
+        ("Signed-off-by: Dev <dev@example.com>\nCo-authored-by: Other <o@example.com>\nChange-Id: I123", ""),
+        ("Handle empty lists.\n\nFixes: #42", "Handle empty lists. Fixes: #42"),
+        (
+            "Handle it.\ndiff --git a/lib.py b/lib.py\nindex 1..2\n--- a/lib.py\n+++ b/lib.py\n@@ -1 +1 @@\n-a\n+b",
+            "Handle it.",
+        ),
+        ("> Could you check this?\n> Thanks\nDone.", "Done."),
+        ("Seen in:\n```\nError: boom\n  details\n```\nnow fixed", "Seen in: now fixed"),
+        ('Traceback (most recent call last):\n  File "lib.py", line 1\nValueError: empty\nHandled.', "Handled."),
+        ("Was failing:\n    at org.Foo.bar(Foo.java:10)\nCaused by: java.lang.NullPointerException", "Was failing:"),
+        ("2020-01-01 12:00:01 ERROR failed\n[   12.345] kernel oops\nNow it works.", "Now it works."),
+    ],
+)
+def test_patterns(body: str, expected: str) -> None:
+    """Test parts of bodies carrying no intent are removed, the subject is kept."""
+    assert MessagePreprocessor(max_tokens=None)(f"{_SUBJECT}\n\n{body}") == f"{_SUBJECT} {expected}".strip()
+
+
+def test_disabled_patterns() -> None:
+    """Test disabled patterns are kept and custom patterns are removed."""
+    message = f"{_SUBJECT}\n\nSigned-off-by: Dev <dev@example.com>\nJIRA: ABC-1"
+    preprocessor = MessagePreprocessor(strip_trailers=False, max_tokens=None, patterns=[r"^jira:.*$"])
+    assert preprocessor(message) == f"{_SUBJECT} Signed-off-by: Dev <dev@example.com>"
+
+
+def test_token_budget() -> None:
+    """Test the number of words is capped, subject words come first."""
+    message = f"{_SUBJECT}\n\nThe input was not checked."
+    assert MessagePreprocessor(max_tokens=3)(message) == "Fix crash on"
+    assert MessagePreprocessor(max_tokens=7)(message) == f"{_SUBJECT} The input"
+    assert MessagePreprocessor(subject_only=True)(message) == _SUBJECT
+
+
+def test_identity() -> None:
+    """Test preprocessors trimming messages differently have different identities."""
+    identities = {
+        MessagePreprocessor().identity,
+        MessagePreprocessor(max_tokens=10).identity,
+        MessagePreprocessor(strip_logs=False).identity,
+        MessagePreprocessor(subject_only=True).identity,
+    }
+    assert len(identities) == 4
+    assert MessagePreprocessor().identity == MessagePreprocessor().identity
+
+
+def test_invalid_token_budget() -> None:
+    """Test a token budget has to be positive."""
+    with pytest.raises(ValueError):
+        MessagePreprocessor(max_tokens=0)
+
+
+def test_prepare_message() -> None:
+    """Test only newlines are removed unless a preprocessor is installed."""
+    message = f"{_SUBJECT}\n\nSigned-off-by: Dev <dev@example.com>"
+    assert prepare_message(message) == f"{_SUBJECT}Signed-off-by: Dev <dev@example.com>"
+
+    set_preprocessor(MessagePreprocessor())
+    try:
+        assert prepare_message(message) == _SUBJECT
+    finally:
+        set_preprocessor(None)
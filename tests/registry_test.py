@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of the process-wide model registry."""
+
+import threading
+import time
+from typing import List
+
+import pytest
+
+from thoth.glyph import MLModel
+from thoth.glyph.exceptions import ModelNotFoundException
+from thoth.glyph.registry import ModelRegistry
+
+
+class _Loader:
+    """Load models as their paths, record paths loaded."""
+
+    def __init__(self, delay: float = 0) -> None:
+        """Initialize the loader, loading takes delay seconds."""
+        self.delay = delay
+        self.loaded: List[str] = []
+
+    def __call__(self, model_path: str) -> object:
+        """Load the model."""
+        time.sleep(self.delay)
+        self.loaded.append(model_path)
+        return object()
+
+
+def _model_file(tmp_path, name: str, size: int = 100) -> str:
+    """Create a model file of the given size."""
+    path = tmp_path / name
+    path.write_bytes(b"x" * size)
+    return str(path)
+
+
+def _registry(tmp_path, loader: _Loader, max_memory=None) -> ModelRegistry:
+    """Create a registry loading fasttext models by the loader."""
+    registry = ModelRegistry(max_memory)
+    registry.register(MLModel.FASTTEXT, loader, _model_file(tmp_path, "default.bin"))
+    return registry
+
+
+def test_get_loads_once(tmp_path) -> None:
+    """Test a model is loaded on first use and shared afterwards."""
+    loader = _Loader()
+    registry = _registry(tmp_path, loader)
+    model_path = _model_file(tmp_path, "model.bin", 42)
+
+    assert not registry.is_loaded(MLModel.FASTTEXT, model_path)
+    model = registry.get(MLModel.FASTTEXT, model_path)
+    assert registry.get(MLModel.FASTTEXT, model_path) is model
+    assert registry.get(MLModel.FASTTEXT) is not model
+    assert loader.loaded == [model_path, str(tmp_path / "default.bin")]
+    assert registry.is_loaded(MLModel.FASTTEXT, model_path)
+    assert registry.memory_usage() == 142
+    assert [(stats["path"], stats["size"], stats["hits"]) for stats in registry.stats()] == [
+        (model_path, 42, 2),
+        (str(tmp_path / "default.bin"), 100, 1),
+    ]
+
+
+def test_get_concurrent(tmp_path) -> None:
+    """Test concurrent callers wait for one load of the model."""
+    loader = _Loader(delay=0.1)
+    registry = _registry(tmp_path, loader)
+    models: List[object] = []
+    threads = [threading.Thread(target=lambda: models.append(registry.get(MLModel.FASTTEXT))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(loader.loaded) == 1
+    assert len(models) == 4 and all(model is models[0] for model in models)
+
+
+def test_get_not_found(tmp_path) -> None:
+    """Test missing model files and models with no loader are reported."""
+    registry = _registry(tmp_path, _Loader())
+    with pytest.raises(ModelNotFoundException):
+        registry.get(MLModel.FASTTEXT, str(tmp_path / "missing.bin"))
+    with pytest.raises(ModelNotFoundException):
+        registry.get(MLModel.NUMPY)
+
+
+def test_eviction(tmp_path) -> None:
+    """Test the least recently used models are evicted once models exceed the memory budget."""
+    loader = _Loader()
+    registry = _registry(tmp_path, loader, max_memory=250)
+    first, second, third = (_model_file(tmp_path, name) for name in ("first.bin", "second.bin", "third.bin"))
+
+    model = registry.get(MLModel.FASTTEXT, first)
+    registry.get(MLModel.FASTTEXT, second)
+    assert registry.get(MLModel.FASTTEXT, first) is model
+    registry.get(MLModel.FASTTEXT, third)
+
+    assert not registry.is_loaded(MLModel.FASTTEXT, second)
+    assert [stats["path"] for stats in registry.stats()] == [first, third]
+    assert registry.memory_usage() == 200
+
+    # An evicted model is loaded again on next use.
+    registry.get(MLModel.FASTTEXT, second)
+    assert loader.loaded == [first, second, third, second]
+    assert [stats["path"] for stats in registry.stats()] == [third, second]
+
+
+def test_eviction_model_over_budget(tmp_path) -> None:
+    """Test a model larger than the budget is kept alone, lowering the budget evicts models."""
+    registry = _registry(tmp_path, _Loader())
+    small, large = _model_file(tmp_path, "small.bin", 10), _model_file(tmp_path, "large.bin", 1000)
+    registry.get(MLModel.FASTTEXT, small)
+    registry.get(MLModel.FASTTEXT, large)
+    assert registry.memory_usage() == 1010
+
+    registry.set_max_memory(100)
+    assert [stats["path"] for stats in registry.stats()] == [large]
+    registry.get(MLModel.FASTTEXT, small)
+    assert [stats["path"] for stats in registry.stats()] == [small]
+
+
+def test_unload(tmp_path) -> None:
+    """Test models are unloaded by path, by model type or all at once."""
+    registry = _registry(tmp_path, _Loader())
+    model_path = _model_file(tmp_path, "model.bin")
+    registry.warm_up(MLModel.FASTTEXT, model_path)
+    registry.warm_up(MLModel.FASTTEXT)
+
+    assert registry.unload(MLModel.FASTTEXT, model_path) == 1
+    assert registry.unload(MLModel.FASTTEXT, model_path) == 0
+    assert registry.unload(MLModel.NUMPY) == 0
+    assert registry.unload() == 1
+    assert registry.memory_usage() == 0
+
+
+def test_identity(tmp_path) -> None:
+    """Test identity of a model follows its content."""
+    registry = _registry(tmp_path, _Loader())
+    model_path = _model_file(tmp_path, "model.bin")
+    identity = registry.identity(MLModel.FASTTEXT, model_path)
+    assert identity.startswith("fasttext:")
+    assert registry.identity(MLModel.FASTTEXT, _model_file(tmp_path, "copy.bin")) == identity
+
+    with open(model_path, "ab") as model_file:
+        model_file.write(b"y")
+    assert registry.identity(MLModel.FASTTEXT, model_path) != identity
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of assigning commits to the first release containing them."""
+
+from typing import Tuple
+
+import pytest
+
+pygit2 = pytest.importorskip("pygit2")
+
+from thoth.glyph import MLModel  # noqa: E402
+from thoth.glyph.lib import _UNRELEASED  # noqa: E402
+from thoth.glyph.lib import _assign_releases  # noqa: E402
+from thoth.glyph.lib import classify_releases  # noqa: E402
+from thoth.glyph.sources import SourceCommit  # noqa: E402
+
+
+def _commit(oid: str, *parent_ids: str) -> SourceCommit:
+    """Create a commit with the given parents, its message is its oid."""
+    return SourceCommit(oid, oid, "Developer", 0, tuple(parent_ids))
+
+
+def test_assign_releases() -> None:
+    """Test commits of merged branches go to the first release containing the merge, the rest is unreleased."""
+    # a <- b (v1) <- c <- e (v2, v2-alias) <- f, the branch a <- d is merged in e.
+    walked = [_commit("f", "e"), _commit("e", "c", "d"), _commit("d", "a"), _commit("c", "b"), _commit("b", "a")]
+    walked.append(_commit("a"))
+    releases, assigned = _assign_releases(walked, {"v1": "b", "v2-alias": "e", "v2": "e"})
+
+    assert releases == ["v1", "v2", "v2-alias"]
+    assert [(release, commit.oid) for release, commit in assigned] == [
+        (_UNRELEASED, "f"),
+        (1, "e"),
+        (1, "d"),
+        (1, "c"),
+        (0, "b"),
+        (0, "a"),
+    ]
+
+
+def test_assign_releases_older_branch() -> None:
+    """Test a commit reachable from several releases goes to the oldest one even if walked through a newer one."""
+    # a <- b (v1) <- c (v2), d is a child of a merged into both b and c.
+    walked = [_commit("c", "b", "d"), _commit("b", "a", "d"), _commit("d", "a"), _commit("a")]
+    releases, assigned = _assign_releases(walked, {"v1": "b", "v2": "c"})
+
+    assert releases == ["v1", "v2"]
+    assert [(release, commit.oid) for release, commit in assigned] == [(1, "c"), (0, "b"), (0, "d"), (0, "a")]
+
+
+def _entries(log) -> Tuple[str, ...]:
+    """Get messages in changelog entries of a release."""
+    return tuple(sorted(line[2:] for entry in log.entries for line in entry.splitlines() if line.startswith("* ")))
+
+
+def test_classify_releases(repo, commit, model_path) -> None:
+    """Test changelogs of all the releases are generated, the newest release first."""
+    repo.references.create("refs/tags/v1", pygit2.Oid(hex=commit("Initial commit")))
+    commit("Fix bug")
+    repo.references.create("refs/tags/v2", pygit2.Oid(hex=commit("Add feature")))
+    commit("Update docs")
+
+    logs = classify_releases(repo.workdir, model=MLModel.FASTTEXT, model_path=model_path)
+
+    assert [log.tag for log in logs] == [None, "v2", "v1"]
+    assert [_entries(log) for log in logs] == [("Update docs",), ("Add feature", "Fix bug"), ("Initial commit",)]
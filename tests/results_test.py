@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of the compact classification result."""
+
+from array import array
+
+import pytest
+
+from thoth.glyph import MLModel
+from thoth.glyph import classify_messages
+from thoth.glyph.results import LABELS
+from thoth.glyph.results import ClassificationResult
+
+
+def _result() -> ClassificationResult:
+    """Create a result of three messages, one of them with a label the bundled model does not predict."""
+    return ClassificationResult.from_labels(
+        ["Add feature", "Fix bug, again", "Update docs"], ["features", "corrective", "documentation"]
+    )
+
+
+def test_from_labels() -> None:
+    """Test labels are interned as codes, unknown labels are appended to the known ones."""
+    result = _result()
+    assert result.codes == array("B", [0, 1, len(LABELS)])
+    assert result.labels == (*LABELS, "documentation")
+    assert result.labels_predicted == ["features", "corrective", "documentation"]
+    assert list(result) == [
+        ("Add feature", "features"),
+        ("Fix bug, again", "corrective"),
+        ("Update docs", "documentation"),
+    ]
+    assert len(result) == 3 and not result.empty
+    assert result.counts() == {"features": 1, "corrective": 1, "documentation": 1}
+    assert repr(result) == "<ClassificationResult of 3 messages>"
+
+
+def test_mismatched_lengths() -> None:
+    """Test every message has to have a label."""
+    with pytest.raises(ValueError):
+        ClassificationResult(["Add feature"], array("B"))
+
+
+def test_empty() -> None:
+    """Test an empty result."""
+    result = ClassificationResult()
+    assert result.empty and len(result) == 0
+    assert result.labels_predicted == [] and result.counts() == {}
+    assert str(result) == "Empty ClassificationResult"
+
+
+def test_str() -> None:
+    """Test the result is formatted as a table with messages not truncated."""
+    assert str(_result()).splitlines() == [
+        "   labels_predicted  message",
+        "0  features          Add feature",
+        "1  corrective        Fix bug, again",
+        "2  documentation     Update docs",
+    ]
+
+
+@pytest.mark.parametrize("result", [_result(), ClassificationResult()])
+def test_to_frame(result: ClassificationResult, tmp_path) -> None:
+    """Test the result converts to the DataFrame classify_messages used to return and is written the same way."""
+    pd = pytest.importorskip("pandas")
+    frame = result.to_frame()
+    expected = (
+        pd.DataFrame({"message": result.messages, "labels_predicted": result.labels_predicted})
+        if result.messages
+        else pd.DataFrame()
+    )
+    pd.testing.assert_frame_equal(frame, expected)
+
+    result.to_csv(str(tmp_path / "result.csv"))
+    frame.to_csv(str(tmp_path / "frame.csv"))
+    assert (tmp_path / "result.csv").read_text() == (tmp_path / "frame.csv").read_text()
+
+
+def test_classify_messages_as_frame(model_path) -> None:
+    """Test classify_messages returns a DataFrame by default and the same classification in the compact form."""
+    pytest.importorskip("pandas")
+    messages = ["Fix crash\non empty input", "Add feature flags"]
+    frame = classify_messages(messages, MLModel.FASTTEXT, model_path)
+    result = classify_messages(messages, MLModel.FASTTEXT, model_path, as_frame=False)
+    assert isinstance(result, ClassificationResult)
+    assert list(frame.columns) == ["message", "labels_predicted"]
+    assert list(frame["message"]) == result.messages == ["Fix crashon empty input", "Add feature flags"]
+    assert list(frame["labels_predicted"]) == result.labels_predicted
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of changelog phrase rules."""
+
+import json
+
+import pytest
+
+from thoth.glyph.rules import PhraseRules
+
+
+def test_match() -> None:
+    """Test phrases are matched case-insensitively anywhere, the longest phrase at the first position wins."""
+    rules = PhraseRules({"Updates": ["update"], "Dependencies": "update of dependency", "Docs": ["readme"]})
+    assert rules.match("Automatic UPDATE OF DEPENDENCY click") == "Dependencies"
+    assert rules.match("Update readme") == "Updates"
+    assert rules.match("Fix README typo") == "Docs"
+    assert rules.match("Fix bug") is None
+    assert PhraseRules({}).match("Fix bug") is None
+
+
+def test_match_case_folding() -> None:
+    """Test matches which do not lowercase to the phrase are put under the heading of the phrase."""
+    rules = PhraseRules({"Automatic Updates": ["Automatic Update of dependency"]})
+    assert rules.match("AUTOMATİC UPDATE OF DEPENDENCY click") == "Automatic Updates"
+
+
+def test_split() -> None:
+    """Test messages are grouped by heading and the rest is kept in the original order."""
+    rules = PhraseRules({"Updates": ["update"], "Docs": ["readme"]})
+    matched, rest = rules.split(["Fix bug", "Update click", "Add readme", "Add feature", "update numpy"])
+    assert matched == {"Updates": ["Update click", "update numpy"], "Docs": ["Add readme"]}
+    assert rest == ["Fix bug", "Add feature"]
+
+
+def test_from_file(tmp_path) -> None:
+    """Test rules are loaded from a JSON object, other documents and empty phrases are rejected."""
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"Updates": "update", "Docs": ["readme", "docs"]}))
+    assert PhraseRules.from_file(str(path)).rules == {"Updates": ["update"], "Docs": ["readme", "docs"]}
+
+    path.write_text(json.dumps(["update"]))
+    with pytest.raises(ValueError):
+        PhraseRules.from_file(str(path))
+
+    path.write_text(json.dumps({"Updates": [""]}))
+    with pytest.raises(ValueError):
+        PhraseRules.from_file(str(path))
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of status codes returned by the classification server."""
+
+import json
+import socket
+import threading
+import urllib.error
+import urllib.request
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+import pytest
+
+from thoth.glyph.batching import MicroBatcher
+from thoth.glyph.server import _GlyphRequestHandler
+from thoth.glyph.server import _TCPHTTPServer
+from thoth.glyph.server import _remove_socket
+
+
+def _predict(messages: List[str]) -> List[str]:
+    """Label every message as a bug fix."""
+    return ["corrective"] * len(messages)
+
+
+def _fail(messages: List[str]) -> List[str]:
+    """Fail like a model which cannot be loaded."""
+    raise OSError("Model file not found")
+
+
+@pytest.fixture
+def serve():
+    """Get a function serving requests with the given batcher, return the URL of the server."""
+    servers = []
+
+    def start(batcher: MicroBatcher, request_timeout: float = 5.0) -> str:
+        handler = type(
+            "GlyphRequestHandler",
+            (_GlyphRequestHandler,),
+            {"batcher": batcher, "rules": None, "request_timeout": request_timeout},
+        )
+        server = _TCPHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _post(url: str, body: Any) -> Tuple[int, Dict[str, Any]]:
+    """Send a JSON request, return the status code and the JSON response."""
+    request = urllib.request.Request(url, data=json.dumps(body).encode(), method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.load(exc)
+
+
+def test_classify(serve) -> None:
+    """Test messages are classified by the batcher."""
+    batcher = MicroBatcher(_predict)
+    batcher.start()
+    try:
+        url = serve(batcher)
+        assert _post(url + "/classify", {"message": "Fix a bug"}) == (200, {"label": "corrective"})
+        assert _post(url + "/classify-messages", {"messages": ["a", "b"]}) == (
+            200,
+            {"labels": ["corrective", "corrective"]},
+        )
+    finally:
+        batcher.stop()
+
+
+def test_generate_log(serve) -> None:
+    """Test changelogs are generated from messages classified by the batcher, rules are applied first."""
+    batcher = MicroBatcher(_predict)
+    batcher.start()
+    try:
+        url = serve(batcher)
+        status, body = _post(url + "/generate-log", {"messages": ["Fix a bug", "Automatic Update of dependency click"]})
+        assert status == 200
+        assert "Fix a bug" in "".join(body["changelog"])
+        assert batcher.stats()["messages"] == 1
+    finally:
+        batcher.stop()
+
+
+@pytest.mark.parametrize(
+    "path,body",
+    [
+        ("/classify", {}),
+        ("/classify", {"message": "  "}),
+        ("/classify-messages", {"messages": "not a list"}),
+        ("/classify-messages", {"messages": ["Fix a bug", 1]}),
+        ("/generate-log", {"messages": [None]}),
+        ("/generate-log", {"messages": ["Fix a bug"], "format": "unknown"}),
+        ("/classify", [1, 2]),
+    ],
+)
+def test_invalid_request(serve, path: str, body: Any) -> None:
+    """Test invalid requests are rejected with 400."""
+    assert _post(serve(MicroBatcher(_predict)) + path, body)[0] == 400
+
+
+def test_unknown_endpoint(serve) -> None:
+    """Test requests to unknown endpoints are answered with 404."""
+    assert _post(serve(MicroBatcher(_predict)) + "/unknown", {})[0] == 404
+
+
+@pytest.mark.parametrize("path", ["/classify-messages", "/generate-log"])
+def test_queue_full(serve, path: str) -> None:
+    """Test requests are rejected with 503 once the queue is full, changelogs go through the same queue."""
+    batcher = MicroBatcher(_predict, max_queue_size=1)
+    batcher.submit(["queued"])
+    assert _post(serve(batcher) + path, {"messages": ["Fix a bug"]})[0] == 503
+
+
+def test_timeout(serve) -> None:
+    """Test requests not classified in time are answered with 504 and dropped from the queue."""
+    batcher = MicroBatcher(_predict)
+    assert _post(serve(batcher, request_timeout=0.1) + "/classify", {"message": "Fix"})[0] == 504
+
+    batcher.start()
+    batcher.stop()
+    assert batcher.stats()["messages"] == 0
+
+
+def test_unexpected_error(serve) -> None:
+    """Test unexpected errors are answered with 500 instead of leaving the client without a response."""
+    batcher = MicroBatcher(_fail)
+    batcher.start()
+    try:
+        status, body = _post(serve(batcher) + "/classify", {"message": "Fix a bug"})
+        assert status == 500
+        assert "OSError" in body["error"]
+    finally:
+        batcher.stop()
+
+
+def test_remove_socket(tmp_path) -> None:
+    """Test sockets left by a previous server are removed, other files are kept."""
+    path = str(tmp_path / "glyph.sock")
+    _remove_socket(path)
+
+    with socket.socket(socket.AF_UNIX) as server_socket:
+        server_socket.bind(path)
+    _remove_socket(path)
+    assert not (tmp_path / "glyph.sock").exists()
+
+    (tmp_path / "glyph.sock").write_text("data")
+    with pytest.raises(FileExistsError):
+        _remove_socket(path)
+    assert (tmp_path / "glyph.sock").read_text() == "data"
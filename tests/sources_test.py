@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of commit sources reading repositories by pygit2, by git log and from history files."""
+
+import shutil
+import sys
+from typing import Dict
+from typing import Iterable
+from typing import List
+
+import pytest
+
+pygit2 = pytest.importorskip("pygit2")
+
+from thoth.glyph import CommitSourceException  # noqa: E402
+from thoth.glyph import CommitSourceType  # noqa: E402
+from thoth.glyph import RepositoryNotFoundException  # noqa: E402
+from thoth.glyph.sources import CommitSource  # noqa: E402
+from thoth.glyph.sources import GitLogSource  # noqa: E402
+from thoth.glyph.sources import HistoryFileSource  # noqa: E402
+from thoth.glyph.sources import RepositorySource  # noqa: E402
+from thoth.glyph.sources import SourceCommit  # noqa: E402
+from thoth.glyph.sources import export_history  # noqa: E402
+from thoth.glyph.sources import open_source  # noqa: E402
+from thoth.glyph.walker import CommitFilter  # noqa: E402
+
+_HAS_GIT = shutil.which("git") is not None
+
+
+@pytest.fixture
+def history(repo, commit) -> Dict[str, str]:
+    """Create a history with a merged branch and tags, return commits by name.
+
+    root (v1.0.0) - feature - merge (v2.0.0) - update
+        \\                   /
+         docs -------------
+    """
+    commits = {"root": commit("Initial commit", files={"README": "readme"})}
+    commits["feature"] = commit("Add feature\n\nLonger description ✨", files={"src/feature.py": "x"}, author="Alice")
+    commits["docs"] = commit("Add docs", parents=[commits["root"]], files={"docs/index.rst": "docs"}, author="Bob")
+    commits["merge"] = commit(
+        "Merge docs", parents=[commits["feature"], commits["docs"]], files={"docs/index.rst": "docs"}
+    )
+    commits["update"] = commit("Update feature", files={"src/feature.py": "y"})
+
+    repo.references.create("refs/tags/v1.0.0", pygit2.Oid(hex=commits["root"]))
+    repo.references.create("refs/tags/v2.0.0", pygit2.Oid(hex=commits["merge"]))
+    tagger = pygit2.Signature("Developer", "developer@example.com")
+    repo.create_tag("v1.1.0", pygit2.Oid(hex=commits["feature"]), pygit2.GIT_OBJECT_COMMIT, tagger, "Release 1.1.0")
+    return commits
+
+
+def _sources(repo, tmp_path) -> List[CommitSource]:
+    """Get all kinds of sources of the repository, the history file is exported from it."""
+    sources: List[CommitSource] = [RepositorySource(repo.workdir)]
+    if _HAS_GIT:
+        sources.append(GitLogSource(repo.workdir))
+
+    for name in ("history.jsonl", "history.jsonl.gz"):
+        output = str(tmp_path / name)
+        assert export_history(repo.workdir, output) == 5
+        sources.append(HistoryFileSource(output))
+
+    return sources
+
+
+def _names(commits: Iterable[SourceCommit], history: Dict[str, str]) -> List[str]:
+    """Get names of the given commits, check children come before their parents."""
+    oids = [commit.oid for commit in commits]
+    names = {oid: name for name, oid in history.items()}
+    for position, commit_oid in enumerate(oids):
+        assert not set(oids[:position]) & set(_parents(history, names[commit_oid]))
+    return [names[oid] for oid in oids]
+
+
+def _parents(history: Dict[str, str], name: str) -> List[str]:
+    """Get parents of the named commit."""
+    return {
+        "feature": [history["root"]],
+        "docs": [history["root"]],
+        "merge": [history["feature"], history["docs"]],
+        "update": [history["merge"]],
+    }.get(name, [])
+
+
+def test_commits(repo, history, tmp_path) -> None:
+    """Test all sources walk the same commits with the same fields."""
+    for source in _sources(repo, tmp_path):
+        commits = {commit.oid: commit for commit in source.commits_by_date(0, sys.maxsize)}
+        assert set(_names(commits.values(), history)) == set(history)
+
+        feature = commits[history["feature"]]
+        assert feature.message == "Add feature\n\nLonger description ✨"
+        assert feature.author == "Alice <developer@example.com>"
+        assert feature.parent_ids == (history["root"],)
+        assert commits[history["merge"]].parent_ids == (history["feature"], history["docs"])
+
+        times = sorted(commit.commit_time for commit in commits.values())
+        assert set(_names(source.commits_by_date(times[0], times[3]), history)) == {"feature", "docs"}
+
+
+def test_commits_by_tag(repo, history, tmp_path) -> None:
+    """Test commits between tags are walked, the default branch is the end of the range if not given."""
+    for source in _sources(repo, tmp_path):
+        assert set(_names(source.commits_by_tag("v1.0.0"), history)) == {"feature", "docs", "merge", "update"}
+        assert set(_names(source.commits_by_tag("v1.1.0", "v2.0.0"), history)) == {"docs", "merge"}
+
+
+def test_filters(repo, history, tmp_path) -> None:
+    """Test merges, commits of other authors and second parents are skipped by all sources."""
+    for source in _sources(repo, tmp_path):
+        walked = source.commits_by_tag("v1.0.0", commit_filter=CommitFilter(no_merges=True))
+        assert set(_names(walked, history)) == {"feature", "docs", "update"}
+        walked = source.commits_by_tag("v1.0.0", commit_filter=CommitFilter(author="^bob"))
+        assert _names(walked, history) == ["docs"]
+        walked = source.commits_by_tag("v1.0.0", commit_filter=CommitFilter(first_parent=True))
+        assert _names(walked, history) == ["update", "merge", "feature"]
+
+
+@pytest.mark.parametrize("source_type", [CommitSourceType.PYGIT2, CommitSourceType.GIT])
+def test_path_filters(repo, history, source_type: CommitSourceType) -> None:
+    """Test commits not changing the paths are skipped, merges have to differ from all their parents."""
+    if source_type == CommitSourceType.GIT and not _HAS_GIT:
+        pytest.skip("git is not installed")
+
+    source = open_source(repo.workdir, source_type)
+    walked = source.commits_by_tag("v1.0.0", commit_filter=CommitFilter(paths=("docs",)))
+    assert set(_names(walked, history)) == {"docs"}
+    walked = source.commits_by_tag("v1.0.0", commit_filter=CommitFilter(paths=("src/feature.py",)))
+    assert set(_names(walked, history)) == {"feature", "update"}
+    walked = source.commits_by_tag("v1.0.0", commit_filter=CommitFilter(paths=("docs",), first_parent=True))
+    assert _names(walked, history) == ["merge"]
+    assert _names(source.touching_paths(source.commits_by_date(0, sys.maxsize), ("README",)), history) == ["root"]
+
+
+def test_path_filters_history_file(repo, history, tmp_path) -> None:
+    """Test history files refuse path filters, they do not store trees."""
+    export_history(repo.workdir, str(tmp_path / "history.jsonl"))
+    source = open_source(str(tmp_path / "history.jsonl"))
+    with pytest.raises(CommitSourceException):
+        list(source.commits_by_tag("v1.0.0", commit_filter=CommitFilter(paths=("docs",))))
+
+
+def test_references(repo, history, tmp_path) -> None:
+    """Test tags are peeled to commits and revisions are resolved by all sources."""
+    for source in _sources(repo, tmp_path):
+        assert source.tags() == {"v1.0.0": history["root"], "v1.1.0": history["feature"], "v2.0.0": history["merge"]}
+        assert source.resolve("master") == history["update"]
+        assert source.resolve("v1.1.0") == history["feature"]
+        assert source.resolve("HEAD") == history["update"]
+
+
+def test_commits_reachable(repo, history, tmp_path) -> None:
+    """Test commits reachable from tips but not from hidden commits are walked, children before parents."""
+    for source in _sources(repo, tmp_path):
+        reachable = source.commits_reachable([history["update"]], [history["feature"]])
+        assert set(_names(reachable, history)) == {"update", "merge", "docs"}
+        reachable = source.commits_reachable([history["docs"], history["feature"]], [history["root"]])
+        assert set(_names(reachable, history)) == {"docs", "feature"}
+
+
+def test_open_repository(repo, history, tmp_path, monkeypatch) -> None:
+    """Test bare repositories and linked worktrees are opened, parent directories are not searched."""
+    bare = pygit2.clone_repository(repo.workdir, str(tmp_path / "bare.git"), bare=True)
+    assert RepositorySource(bare.path).resolve("master") == history["update"]
+
+    repo.add_worktree("linked", str(tmp_path / "linked"))
+    assert RepositorySource(str(tmp_path / "linked")).resolve("HEAD") == history["update"]
+
+    (tmp_path / "repo" / "sub").mkdir()
+    for source_type in (CommitSourceType.PYGIT2, CommitSourceType.GIT) if _HAS_GIT else (CommitSourceType.PYGIT2,):
+        with pytest.raises(RepositoryNotFoundException):
+            open_source(str(tmp_path / "repo" / "sub"), source_type)
+
+    monkeypatch.setenv("GIT_DIR", repo.path)
+    assert RepositorySource(str(tmp_path)).resolve("master") == history["update"]
+
+
+@pytest.mark.skipif(not _HAS_GIT, reason="git is not installed")
+def test_git_log_failure(repo, history) -> None:
+    """Test errors of git log are reported."""
+    source = GitLogSource(repo.workdir)
+    with pytest.raises(CommitSourceException, match="git log failed"):
+        list(source.commits_by_tag("v1.0.0", "missing"))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of keeping records within a memory budget."""
+
+import random
+
+import pytest
+
+from thoth.glyph import Format
+from thoth.glyph import MLModel
+from thoth.glyph import spill
+from thoth.glyph.lib import generate_log
+from thoth.glyph.lib import iter_generate_log
+from thoth.glyph.spill import SpillStore
+from thoth.glyph.spill import chunks_within
+from thoth.glyph.spill import parse_size
+
+
+@pytest.mark.parametrize(
+    "size,expected",
+    [
+        ("100", 100),
+        ("4K", 4096),
+        ("512M", 512 * 1024**2),
+        ("2GiB", 2 * 1024**3),
+        ("1.5kb", 1536),
+        (" 3 T ", 3 * 1024**4),
+    ],
+)
+def test_parse_size(size: str, expected: int) -> None:
+    """Test sizes with binary unit suffixes are parsed."""
+    assert parse_size(size) == expected
+
+
+@pytest.mark.parametrize("size", ["", "M", "-1", "1X", "1 M B"])
+def test_parse_size_invalid(size: str) -> None:
+    """Test invalid sizes are rejected."""
+    with pytest.raises(ValueError):
+        parse_size(size)
+
+
+def test_chunks_within() -> None:
+    """Test chunks fit the budget and the number of items, an item larger than the budget makes its own chunk."""
+    assert list(chunks_within([1, 2, 3, 10, 1, 1], 5, lambda item: item)) == [[1, 2], [3], [10], [1, 1]]
+    assert list(chunks_within(range(5), 100, lambda item: 1, max_items=2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunks_within([], 5, lambda item: item)) == []
+
+
+@pytest.mark.parametrize("max_memory,spilled", [(1, 200), (10, 200), (1000, 143)])
+def test_spill_store_order(monkeypatch, tmp_path, max_memory: int, spilled: int) -> None:
+    """Test records are read back sorted however they were spilled and merged into runs of higher levels."""
+    monkeypatch.setattr(spill, "_MAX_FAN_IN", 3)
+    rng = random.Random(42)
+    records = [(rng.randrange(5), rng.randrange(2), index, f"zpráva {index} ✨") for index in range(200)]
+
+    with SpillStore(max_memory, str(tmp_path)) as store:
+        for record in records:
+            store.add(record, 7)
+        assert list(store) == sorted(records)
+        assert store.spilled == spilled
+
+
+def test_spill_store_memory_only(tmp_path) -> None:
+    """Test nothing is spilled within the budget."""
+    with SpillStore(1000, str(tmp_path)) as store:
+        for index in reversed(range(10)):
+            store.add((index, "message"), 10)
+        assert list(store) == [(index, "message") for index in range(10)]
+        assert store.spilled == 0
+
+
+def test_iter_generate_log_spilled(model_path, tmp_path) -> None:
+    """Test a changelog merged from spilled runs is the same as the one generated in memory."""
+    messages = [f"Fix bug {index}" for index in range(50)] + ["Automatic Update of dependency click", "Add feature"] * 5
+    expected = generate_log(messages, Format.DEFAULT, MLModel.FASTTEXT, model_path)
+    spilled = iter_generate_log(
+        messages, model=MLModel.FASTTEXT, model_path=model_path, max_memory=2000, spill_dir=str(tmp_path)
+    )
+    assert list(spilled) == expected
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of history walks with filters applied inside the walk."""
+
+from typing import List
+from typing import NamedTuple
+
+import pytest
+
+pygit2 = pytest.importorskip("pygit2")
+
+from thoth.glyph.walker import CommitFilter  # noqa: E402
+from thoth.glyph.walker import compile_paths  # noqa: E402
+from thoth.glyph.walker import limit_time_range  # noqa: E402
+from thoth.glyph.walker import touches_paths  # noqa: E402
+from thoth.glyph.walker import walk_commits  # noqa: E402
+
+
+class _Commit(NamedTuple):
+    """A commit with just the commit time."""
+
+    commit_time: int
+
+
+def _messages(repo, commit_filter: CommitFilter, **kwargs) -> List[str]:
+    """Walk the history from HEAD, return messages of walked commits."""
+    return [commit.message for commit in walk_commits(repo, repo.head.target, commit_filter=commit_filter, **kwargs)]
+
+
+def test_limit_time_range() -> None:
+    """Test commits are limited to the exclusive range, the walk stops after slop commits older than the range."""
+    times = [10, 9, 8, 3, 7, 2, 1, 0, 6]
+    limited = limit_time_range((_Commit(time) for time in times), since=3, until=9, slop=3)
+    assert [commit.commit_time for commit in limited] == [8, 7]
+
+
+def test_filters(repo, commit) -> None:
+    """Test merges and commits of other authors are skipped."""
+    root = commit("Initial commit", author="Alice")
+    branch = commit("Add feature", author="Bob")
+    main = commit("Fix bug", parents=[root], author="Alice")
+    commit("Merge feature", parents=[main, branch], author="Alice")
+
+    assert _messages(repo, CommitFilter(no_merges=True)) == ["Fix bug", "Add feature", "Initial commit"]
+    assert _messages(repo, CommitFilter(author="^bob")) == ["Add feature"]
+    assert _messages(repo, CommitFilter(first_parent=True)) == ["Merge feature", "Fix bug", "Initial commit"]
+
+
+def test_time_range(repo, commit) -> None:
+    """Test only commits in the exclusive time range are walked."""
+    for index in range(6):
+        commit(f"Commit {index}")
+
+    times = [c.commit_time for c in walk_commits(repo, repo.head.target)]
+    messages = _messages(repo, CommitFilter(), since=times[-2], until=times[1])
+    assert messages == ["Commit 3", "Commit 2"]
+
+
+@pytest.mark.parametrize(
+    "paths,expected",
+    [
+        (["docs"], {"docs": {}}),
+        (["thoth/glyph/lib.py", "./thoth/glyph/cli.py"], {"thoth": {"glyph": {"lib.py": {}, "cli.py": {}}}}),
+        (["thoth/glyph/lib.py", "thoth/"], {"thoth": {}}),
+        (["thoth", "thoth/glyph/lib.py"], {"thoth": {}}),
+        (["docs", "."], {}),
+    ],
+)
+def test_compile_paths(paths: List[str], expected) -> None:
+    """Test paths are compiled to a tree of their components, shorter paths cover longer ones."""
+    assert compile_paths(paths) == expected
+
+
+def test_touches_paths(repo, commit) -> None:
+    """Test commits are compared to their parents only at the given paths."""
+    root = repo.get(commit("Initial commit", files={"README": "readme", "src/lib.py": "lib"}))
+    docs = repo.get(commit("Update readme", files={"README": "new readme"}))
+    lib = repo.get(commit("Fix lib", files={"src/lib.py": "fixed lib"}))
+
+    src = compile_paths(["src"])
+    assert touches_paths(root, src)
+    assert not touches_paths(docs, src)
+    assert touches_paths(lib, src)
+    assert touches_paths(lib, compile_paths(["src/lib.py"]))
+    assert not touches_paths(lib, compile_paths(["src/other.py", "README"]))
+
+
+def test_touches_paths_merge(repo, commit) -> None:
+    """Test merges are unchanged if paths are the same as in any parent, unless compared to the first one."""
+    root = commit("Initial commit", files={"README": "readme", "src/lib.py": "lib"})
+    branch = commit("Fix lib", files={"src/lib.py": "fixed lib"})
+    main = commit("Update readme", parents=[root], files={"README": "new readme"})
+    merge = repo.get(commit("Merge", parents=[main, branch], files={"src/lib.py": "fixed lib"}))
+
+    src = compile_paths(["src"])
+    assert not touches_paths(merge, src)
+    assert touches_paths(merge, src, first_parent=True)
+    assert _messages(repo, CommitFilter(paths=("src",))) == ["Fix lib", "Initial commit"]
+    assert _messages(repo, CommitFilter(paths=("src",), first_parent=True)) == ["Merge", "Initial commit"]
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of watching references of a repository for new commits."""
+
+import threading
+from typing import Callable
+from typing import List
+
+import pytest
+
+pygit2 = pytest.importorskip("pygit2")
+
+from thoth.glyph import MLModel  # noqa: E402
+from thoth.glyph import watch  # noqa: E402
+from thoth.glyph.walker import CommitFilter  # noqa: E402
+
+
+class _ScriptedNotifier:
+    """Stand in for inotify, run an action on each wait and report a change until the actions run out."""
+
+    def __init__(self, actions: List[Callable[[], None]]) -> None:
+        """Initialize the notifier with actions changing the repository."""
+        self.actions = actions
+        self.closed = False
+
+    def wait(self, stop: threading.Event) -> bool:
+        """Run the next action, there is no change once all of them were run."""
+        if not self.actions:
+            return False
+        self.actions.pop(0)()
+        return True
+
+    def close(self) -> None:
+        """Record the notifier was closed."""
+        self.closed = True
+
+
+def _watch(repo, monkeypatch, model_path, actions: List[Callable[[], None]], **kwargs) -> List[List]:
+    """Watch the repository while the actions run, return batches of classified commits passed to the callback."""
+    notifier = _ScriptedNotifier(actions)
+    monkeypatch.setattr(watch, "_open_notifier", lambda git_dir, poll_interval, use_inotify: notifier)
+    batches: List[List] = []
+    watch.watch_repository(repo.workdir, batches.append, model=MLModel.FASTTEXT, model_path=model_path, **kwargs)
+    assert notifier.closed
+    return batches
+
+
+def test_watch_repository_new_commits(repo, commit, monkeypatch, model_path) -> None:
+    """Test only commits which became reachable are classified, in the order they were created."""
+    commit("Initial commit")
+    created: List[str] = []
+    actions = [
+        lambda: created.extend([commit("Fix bug in parser"), commit("Add feature flags")]),
+        lambda: None,
+        lambda: created.append(commit("Automatic Update of dependency click")),
+    ]
+
+    batches = _watch(repo, monkeypatch, model_path, actions)
+
+    assert [[classified.oid for classified in batch] for batch in batches] == [created[:2], created[2:]]
+    assert batches[0][0].message == "fix bug in parser"
+    assert batches[0][0].author == "Developer <developer@example.com>"
+    assert all(classified.label for batch in batches for classified in batch)
+
+
+def test_watch_repository_filter(repo, commit, monkeypatch, model_path) -> None:
+    """Test commits of other authors and merge commits are not passed to the callback."""
+    initial = commit("Initial commit")
+
+    def push() -> None:
+        side = commit("Add docs", parents=[initial], author="Bob")
+        commit("Fix typo", author="Alice")
+        commit("Merge branch docs", parents=[str(repo.head.target), side], author="Alice")
+
+    batches = _watch(repo, monkeypatch, model_path, [push], commit_filter=CommitFilter(author="alice", no_merges=True))
+    assert [[classified.message for classified in batch] for batch in batches] == [["fix typo"]]
+
+
+def test_watch_repository_first_parent(repo, commit) -> None:
+    """Test walking first parents is rejected."""
+    commit("Initial commit")
+    with pytest.raises(ValueError):
+        watch.watch_repository(repo.workdir, lambda batch: None, commit_filter=CommitFilter(first_parent=True))
+
+
+def test_polling_notifier_stop() -> None:
+    """Test the polling notifier stops waiting once a stop is requested."""
+    stop = threading.Event()
+    notifier = watch._PollingNotifier(0.01)
+    assert notifier.wait(stop)
+    stop.set()
+    assert not notifier.wait(stop)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Tests of writing classified commits."""
+
+import io
+import json
+import sys
+from typing import Iterator
+from typing import List
+
+import pytest
+
+from thoth.glyph import writers
+from thoth.glyph.constants import OutputFormat
+from thoth.glyph.lib import ClassifiedCommit
+from thoth.glyph.writers import CsvWriter
+from thoth.glyph.writers import JsonLinesWriter
+from thoth.glyph.writers import write_classified
+
+_COMMITS = [
+    ClassifiedCommit("a" * 40, "add feature, finally", "features", "Alice <alice@example.com>", 1577836800),
+    ClassifiedCommit("b" * 40, 'fix "quoted" bug ✨', "corrective", "Bob <bob@example.com>", 1577840400),
+]
+
+
+def _rows(commits: List[ClassifiedCommit]) -> List[dict]:
+    """Get commits as rows written by writers."""
+    return [
+        {
+            "oid": commit.oid,
+            "author": commit.author,
+            "commit_time": "2020-01-01T00:00:00+00:00" if index == 0 else "2020-01-01T01:00:00+00:00",
+            "label": commit.label,
+            "message": commit.message,
+        }
+        for index, commit in enumerate(commits)
+    ]
+
+
+def test_json_lines() -> None:
+    """Test commits are written as JSON objects, one per line, with timestamps in UTC."""
+    stream = io.BytesIO()
+    assert write_classified(_COMMITS, OutputFormat.JSONL, stream) == 2
+    lines = stream.getvalue().decode("utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == _rows(_COMMITS)
+    assert "✨" in lines[1]
+
+
+def test_csv() -> None:
+    """Test commits are written as CSV rows after the header, the stream of the caller is left open."""
+    stream = io.BytesIO()
+    with CsvWriter(stream) as writer:
+        writer.write(_COMMITS[:1])
+        writer.write(_COMMITS[1:])
+    assert writer.written == 2
+    assert not stream.closed
+
+    assert stream.getvalue().decode("utf-8").splitlines() == [
+        "oid,author,commit_time,label,message",
+        f'{"a" * 40},Alice <alice@example.com>,2020-01-01T00:00:00+00:00,features,"add feature, finally"',
+        f'{"b" * 40},Bob <bob@example.com>,2020-01-01T01:00:00+00:00,corrective,"fix ""quoted"" bug ✨"',
+    ]
+    stream.write(b"still writable")
+
+
+def test_write_classified_chunks(monkeypatch, instrumentation) -> None:
+    """Test commits are written in chunks as they are produced."""
+    monkeypatch.setattr(JsonLinesWriter, "chunk_size", 2)
+    produced: List[int] = []
+    written: List[int] = []
+    instrumentation.callback = lambda name, seconds, count, nbytes: written.append(count)
+
+    def commits() -> Iterator[ClassifiedCommit]:
+        for index in range(5):
+            produced.append(len(written))
+            yield _COMMITS[index % 2]
+
+    stream = io.BytesIO()
+    assert write_classified(commits(), OutputFormat.JSONL, stream) == 5
+    assert written == [2, 2, 1]
+    # The third commit is produced once the first chunk was written.
+    assert produced == [0, 0, 1, 1, 2]
+    assert len(stream.getvalue().splitlines()) == 5
+
+
+@pytest.mark.parametrize("output_format", [OutputFormat.PARQUET, OutputFormat.ARROW])
+def test_arrow_formats(output_format: OutputFormat, monkeypatch) -> None:
+    """Test commits are written as Parquet row groups or Arrow record batches, one per chunk."""
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    monkeypatch.setattr(writers.ClassificationWriter, "chunk_size", 1)
+    monkeypatch.setattr(writers.ParquetWriter, "chunk_size", 1)
+    stream = io.BytesIO()
+    assert write_classified(_COMMITS * 2, output_format, stream) == 4
+
+    if output_format == OutputFormat.PARQUET:
+        parquet_file = pq.ParquetFile(io.BytesIO(stream.getvalue()))
+        assert parquet_file.metadata.num_row_groups == 4
+        table = parquet_file.read()
+    else:
+        reader = pa.ipc.open_stream(stream.getvalue())
+        batches = list(reader)
+        assert [batch.num_rows for batch in batches] == [1, 1, 1, 1]
+        table = pa.Table.from_batches(batches)
+
+    assert table.column_names == ["oid", "author", "commit_time", "label", "message"]
+    rows = table.to_pylist()
+    assert [row["message"] for row in rows] == [commit.message for commit in _COMMITS * 2]
+    assert [int(row["commit_time"].timestamp()) for row in rows] == [commit.commit_time for commit in _COMMITS * 2]
+    assert str(rows[0]["commit_time"].tzinfo) == "UTC"
+
+
+def test_arrow_formats_without_pyarrow(monkeypatch) -> None:
+    """Test the extra to install is suggested if pyarrow is missing."""
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    with pytest.raises(ImportError, match=r"thoth-glyph\[parquet\]"):
+        write_classified(_COMMITS, OutputFormat.ARROW, io.BytesIO())
@@ -17,18 +17,57 @@
 
 """Generate CHANGELOG entries out of commit messages using AI/ML techniques."""
 
-from .lib import classify_message
-from .lib import classify_messages
-from .lib import classify_by_date
-from .lib import classify_by_tag
-from .lib import generate_log
+import importlib
+from typing import Any
+from typing import List
+from typing import TYPE_CHECKING
+
+from .constants import CommitSourceType
 from .constants import MLModel
 from .constants import Format
+from .constants import OutputFormat
+from .exceptions import CommitSourceException
 from .exceptions import RepositoryNotFoundException
+from .exceptions import ModelFormatException
 from .exceptions import ModelNotFoundException
 from .exceptions import NoMessageEnteredException
+from .exceptions import QueueFullException
 from .exceptions import ThothGlyphException
 
+if TYPE_CHECKING:
+    from .lib import classify_message
+    from .lib import classify_messages
+    from .lib import classify_by_date
+    from .lib import classify_by_tag
+    from .lib import classify_releases
+    from .lib import classify_repositories
+    from .lib import generate_changelog
+    from .lib import generate_log
+    from .lib import iter_classify_by_date
+    from .lib import iter_classify_by_tag
+    from .lib import iter_generate_log
+    from .lib import iter_generate_log_by_date
+    from .lib import iter_generate_log_by_tag
+    from .lib import ClassifiedCommit
+    from .lib import ReleaseLog
+    from .lib import RepositorySpec
+    from .lib import warm_up
+    from .preprocess import MessagePreprocessor
+    from .cache import ClassificationCache
+    from .cache import LabelCache
+    from .walker import CommitFilter
+    from .notes import GitNotesCache
+    from .registry import ModelRegistry
+    from .registry import get_model_registry
+    from .results import ClassificationResult
+    from .rules import PhraseRules
+    from .sources import CommitSource
+    from .sources import SourceCommit
+    from .sources import export_history
+    from .sources import open_source
+    from .watch import watch_repository
+    from .writers import write_classified
+
 __author__ = "Tushar Sharma <tussharm@redhat.com>"
 __title__ = "glyph"
 __version__ = "0.1.5"
@@ -38,11 +77,96 @@ __all__ = [
     "classify_by_tag",
     "classify_message",
     "classify_messages",
+    "classify_releases",
+    "classify_repositories",
+    "export_history",
+    "generate_changelog",
     "generate_log",
+    "iter_classify_by_date",
+    "iter_classify_by_tag",
+    "iter_generate_log",
+    "iter_generate_log_by_date",
+    "iter_generate_log_by_tag",
+    "get_model_registry",
+    "open_source",
+    "warm_up",
+    "watch_repository",
+    "write_classified",
+    "ClassificationCache",
+    "ClassificationResult",
+    "ClassifiedCommit",
+    "CommitFilter",
+    "CommitSource",
+    "CommitSourceException",
+    "CommitSourceType",
     "Format",
+    "GitNotesCache",
+    "LabelCache",
     "MLModel",
+    "MessagePreprocessor",
+    "ModelFormatException",
     "ModelNotFoundException",
+    "ModelRegistry",
     "NoMessageEnteredException",
+    "OutputFormat",
+    "PhraseRules",
+    "QueueFullException",
+    "ReleaseLog",
     "RepositoryNotFoundException",
+    "RepositorySpec",
+    "SourceCommit",
     "ThothGlyphException",
 ]
+
+# Modules providing the rest of the public API, they import pygit2 and fasttext (and pandas) which are expensive to
+# import. They are imported on first access so that importing the package (and e.g. CLI's --help) stays fast.
+_LAZY_ATTRIBUTES = {
+    "classify_by_date": "lib",
+    "classify_by_tag": "lib",
+    "classify_message": "lib",
+    "classify_messages": "lib",
+    "classify_releases": "lib",
+    "classify_repositories": "lib",
+    "generate_changelog": "lib",
+    "generate_log": "lib",
+    "iter_classify_by_date": "lib",
+    "iter_classify_by_tag": "lib",
+    "iter_generate_log": "lib",
+    "iter_generate_log_by_date": "lib",
+    "iter_generate_log_by_tag": "lib",
+    "warm_up": "lib",
+    "watch_repository": "watch",
+    "ClassifiedCommit": "lib",
+    "ReleaseLog": "lib",
+    "RepositorySpec": "lib",
+    "ClassificationCache": "cache",
+    "LabelCache": "cache",
+    "GitNotesCache": "notes",
+    "CommitFilter": "walker",
+    "MessagePreprocessor": "preprocess",
+    "ModelRegistry": "registry",
+    "get_model_registry": "registry",
+    "ClassificationResult": "results",
+    "PhraseRules": "rules",
+    "CommitSource": "sources",
+    "SourceCommit": "sources",
+    "export_history": "sources",
+    "open_source": "sources",
+    "write_classified": "writers",
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Import the module providing the requested attribute on first access."""
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    """List module attributes including the ones imported lazily."""
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Asyncio counterparts of the library functions which do not block the event loop.
+
+Repository walks run in a thread pool, predictions run in the thread of a MicroBatcher so that messages of
+concurrently awaiting callers are predicted together in one batch by the model shared through the model
+registry. All the coroutines accept a timeout, a cancelled (or timed out) caller stops its walk and its
+messages are dropped from the batch unless the batch is already being predicted:
+
+    async with AsyncClassifier() as classifier:
+        label = await classifier.classify_message("Fix crash on empty input", timeout=1.0)
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from operator import methodcaller
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from .batching import DEFAULT_MAX_BATCH_SIZE
+from .batching import DEFAULT_MAX_LATENCY
+from .batching import DEFAULT_MAX_QUEUE_SIZE
+from .batching import MicroBatcher
+from .constants import CommitSourceType
+from .constants import Format
+from .constants import MLModel
+from .exceptions import NoMessageEnteredException
+from .instrumentation import stage
+from .lib import DEFAULT_WALK_JOBS
+from .lib import DEFAULT_RULES
+from .lib import date_range
+from .lib import format_labeled
+from .lib import predict_labels
+from .preprocess import prepare_message
+from .preprocess import prepare_messages
+from .results import ClassificationResult
+from .rules import PhraseRules
+from .sources import CommitSource
+from .sources import SourceCommit
+from .sources import open_source
+from .walker import CommitFilter
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _WalkCancelled(Exception):
+    """Raised in a walk whose caller was cancelled."""
+
+
+class AsyncClassifier:
+    """Classify messages and repositories from coroutines, concurrent callers share batched predictions.
+
+    The batching thread and the walk thread pool are started on first use and stopped by close (or by
+    leaving the async context manager).
+    """
+
+    def __init__(
+        self,
+        model: Optional[MLModel] = None,
+        model_path: Optional[str] = None,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_latency: float = DEFAULT_MAX_LATENCY,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+        jobs: int = DEFAULT_WALK_JOBS,
+    ) -> None:
+        """Initialize the classifier, jobs is the number of repositories walked at the same time."""
+        self.model = model or MLModel.DEFAULT
+        self.model_path = model_path
+        self.jobs = jobs
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._batcher = MicroBatcher(
+            lambda messages: predict_labels(messages, self.model, self.model_path),
+            max_batch_size=max_batch_size,
+            max_latency=max_latency,
+            max_queue_size=max_queue_size,
+        )
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the thread pool running walks and other blocking calls, start it together with the batcher."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.jobs, thread_name_prefix="glyph-aio")
+                self._batcher.start()
+            return self._executor
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking function in the thread pool."""
+        return await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+
+    async def warm_up(self) -> None:
+        """Load the model ahead of the first classification without blocking the event loop."""
+        from .registry import get_model_registry
+
+        await self._run(get_model_registry().warm_up, self.model, self.model_path)
+
+    async def close(self) -> None:
+        """Stop the batching thread once queued predictions are done and shut the thread pool down."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+
+        if executor is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._batcher.stop)
+            await loop.run_in_executor(None, executor.shutdown)
+
+    async def __aenter__(self) -> "AsyncClassifier":
+        """Use the classifier as an async context manager."""
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        """Close the classifier."""
+        await self.close()
+
+    async def _predict(self, messages: List[str]) -> List[str]:
+        """Predict labels for messages free of newlines within a batch shared with other callers."""
+        self._get_executor()
+        return await asyncio.wrap_future(self._batcher.submit(messages))
+
+    async def classify_message(self, message: str, timeout: Optional[float] = None) -> str:
+        """Classify a single message."""
+        if message is None or message.strip() == "":
+            raise NoMessageEnteredException
+
+        labels = await asyncio.wait_for(self._predict([prepare_message(message.lower())]), timeout)
+        return labels[0]
+
+    async def _classify_messages(self, messages: List[str]) -> ClassificationResult:
+        """Prepare messages in the thread pool and classify them."""
+        prepared: List[str] = await self._run(prepare_messages, messages)
+        return ClassificationResult.from_labels(prepared, await self._predict(prepared))
+
+    async def classify_messages(self, messages: List[str], timeout: Optional[float] = None) -> ClassificationResult:
+        """Classify multiple messages."""
+        return await asyncio.wait_for(self._classify_messages(messages), timeout)
+
+    async def _walk(
+        self, path: str, source: Optional[CommitSourceType], walk: Callable[[CommitSource], Iterator[SourceCommit]]
+    ) -> List[Tuple[str, str]]:
+        """Walk the repository in the thread pool, the walk stops once the caller is cancelled."""
+        cancelled = threading.Event()
+
+        def run() -> List[Tuple[str, str]]:
+            commit_source = open_source(path, source)
+            commits = []
+            with stage("walk") as walk_stage:
+                for commit in walk(commit_source):
+                    if cancelled.is_set():
+                        raise _WalkCancelled
+                    commits.append((commit.oid, prepare_message(commit.message.lower())))
+                walk_stage.count = len(commits)
+            return commits
+
+        try:
+            commits: List[Tuple[str, str]] = await self._run(run)
+            return commits
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def _classify_walk(
+        self, path: str, source: Optional[CommitSourceType], walk: Callable[[CommitSource], Iterator[SourceCommit]]
+    ) -> ClassificationResult:
+        """Walk the repository and classify messages of walked commits."""
+        commits = await self._walk(path, source, walk)
+        messages = [message for _, message in commits]
+        return ClassificationResult.from_labels(messages, await self._predict(messages) if messages else [])
+
+    async def classify_by_date(
+        self,
+        path: str,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        commit_filter: Optional[CommitFilter] = None,
+        timeout: Optional[float] = None,
+        source: Optional[CommitSourceType] = None,
+    ) -> ClassificationResult:
+        """Classify commits of the given repository (or history file) in the given date range."""
+        start_time, end_time = date_range(start, end)
+        walk = methodcaller("commits_by_date", start_time, end_time, commit_filter)
+        return await asyncio.wait_for(self._classify_walk(path, source, walk), timeout)
+
+    async def classify_by_tag(
+        self,
+        path: str,
+        start_tag: str,
+        end_tag: Optional[str] = None,
+        commit_filter: Optional[CommitFilter] = None,
+        timeout: Optional[float] = None,
+        source: Optional[CommitSourceType] = None,
+    ) -> ClassificationResult:
+        """Classify commits of the given repository (or history file) between the given tags."""
+        walk = methodcaller("commits_by_tag", start_tag, end_tag, commit_filter)
+        return await asyncio.wait_for(self._classify_walk(path, source, walk), timeout)
+
+    async def _generate_log(self, messages: List[str], fmt: Format, rules: Optional[PhraseRules]) -> List[str]:
+        """Group messages under changelog headings and format them, rules and formatting run in the thread pool."""
+
+        def split() -> Tuple[Dict[str, List[str]], List[str], List[str]]:
+            with stage("rules") as rules_stage:
+                rules_stage.measure(messages)
+                check_phrase_dict, rest = (rules if rules is not None else DEFAULT_RULES).split(messages)
+            return check_phrase_dict, rest, prepare_messages(rest)
+
+        check_phrase_dict, rest, prepared = await self._run(split)
+        labels = await self._predict(prepared) if prepared else []
+        changelog: List[str] = await self._run(lambda: format_labeled(rest, labels, check_phrase_dict, fmt))
+        return changelog
+
+    async def generate_log(
+        self,
+        messages: List[str],
+        fmt: Format = Format.DEFAULT,
+        rules: Optional[PhraseRules] = None,
+        timeout: Optional[float] = None,
+    ) -> List[str]:
+        """Classify changes based on messages, messages matched by rules are put under the heading of the rule."""
+        if not messages:
+            return []
+
+        return await asyncio.wait_for(self._generate_log(messages, fmt, rules), timeout)
+
+
+_CLASSIFIERS: Dict[Tuple[MLModel, Optional[str]], AsyncClassifier] = {}
+_CLASSIFIERS_LOCK = threading.Lock()
+
+
+def get_classifier(model: Optional[MLModel] = None, model_path: Optional[str] = None) -> AsyncClassifier:
+    """Get the process-wide classifier of the given model used by the module-level coroutines."""
+    key = (model or MLModel.DEFAULT, model_path)
+    with _CLASSIFIERS_LOCK:
+        classifier = _CLASSIFIERS.get(key)
+        if classifier is None:
+            classifier = _CLASSIFIERS[key] = AsyncClassifier(*key)
+        return classifier
+
+
+async def shutdown() -> None:
+    """Close all the process-wide classifiers."""
+    with _CLASSIFIERS_LOCK:
+        classifiers = list(_CLASSIFIERS.values())
+        _CLASSIFIERS.clear()
+
+    for classifier in classifiers:
+        await classifier.close()
+
+
+async def classify_message(
+    message: str, model: Optional[MLModel] = None, model_path: Optional[str] = None, timeout: Optional[float] = None
+) -> str:
+    """Classify a single message."""
+    return await get_classifier(model, model_path).classify_message(message, timeout)
+
+
+async def classify_messages(
+    messages: List[str],
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> ClassificationResult:
+    """Classify multiple messages."""
+    return await get_classifier(model, model_path).classify_messages(messages, timeout)
+
+
+async def classify_by_date(
+    path: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    commit_filter: Optional[CommitFilter] = None,
+    timeout: Optional[float] = None,
+    source: Optional[CommitSourceType] = None,
+) -> ClassificationResult:
+    """Classify commits of the given repository (or history file) in the given date range."""
+    return await get_classifier(model, model_path).classify_by_date(path, start, end, commit_filter, timeout, source)
+
+
+async def classify_by_tag(
+    path: str,
+    start_tag: str,
+    end_tag: Optional[str] = None,
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    commit_filter: Optional[CommitFilter] = None,
+    timeout: Optional[float] = None,
+    source: Optional[CommitSourceType] = None,
+) -> ClassificationResult:
+    """Classify commits of the given repository (or history file) between the given tags."""
+    classifier = get_classifier(model, model_path)
+    return await classifier.classify_by_tag(path, start_tag, end_tag, commit_filter, timeout, source)
+
+
+async def generate_log(
+    messages: List[str],
+    fmt: Format = Format.DEFAULT,
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    rules: Optional[PhraseRules] = None,
+    timeout: Optional[float] = None,
+) -> List[str]:
+    """Classify changes based on messages, messages matched by rules are put under the heading of the rule."""
+    return await get_classifier(model, model_path).generate_log(messages, fmt, rules, timeout)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Coalesce concurrent classification requests into batched predictions."""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from .exceptions import QueueFullException
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH_SIZE = 256
+DEFAULT_MAX_LATENCY = 0.005
+DEFAULT_MAX_QUEUE_SIZE = 10000
+
+_Request = Tuple[List[str], "Future[List[str]]"]
+
+
+class MicroBatcher:
+    """Collect messages submitted by concurrent callers and predict them together in one batch.
+
+    A batch is predicted once it reaches max_batch_size messages or once the oldest queued request has
+    waited max_latency seconds, whichever comes first. At most max_queue_size requests can wait in the
+    queue, submitting more requests raises QueueFullException so that callers can back off.
+    """
+
+    def __init__(
+        self,
+        predict: Callable[[List[str]], List[str]],
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_latency: float = DEFAULT_MAX_LATENCY,
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+    ) -> None:
+        """Initialize the batcher with a function predicting labels for a list of messages."""
+        if max_batch_size < 1:
+            raise ValueError(f"Maximum batch size has to be a positive number, got {max_batch_size}")
+
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue(max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "messages": 0, "batches": 0, "rejected": 0}
+
+    def start(self) -> None:
+        """Start the thread running batched predictions."""
+        if self._thread is not None:
+            return
+
+        self._thread = threading.Thread(target=self._run, name="glyph-batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the batching thread once all the queued requests are processed."""
+        if self._thread is None:
+            return
+
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def submit(self, messages: List[str]) -> "Future[List[str]]":
+        """Queue messages for prediction, the returned future resolves to their labels."""
+        future: "Future[List[str]]" = Future()
+        if not messages:
+            future.set_result([])
+            return future
+
+        try:
+            self._queue.put_nowait((messages, future))
+        except queue.Full as exc:
+            with self._stats_lock:
+                self._stats["rejected"] += 1
+            raise QueueFullException(f"Classification queue is full ({self._queue.maxsize} requests)") from exc
+
+        return future
+
+    def classify(self, messages: List[str], timeout: Optional[float] = None) -> List[str]:
+        """Predict labels for the given messages within a shared batch, block until they are available.
+
+        A request timing out is cancelled, it is dropped from its batch unless the batch is already predicted.
+        """
+        future = self.submit(messages)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Get statistics about processed batches."""
+        with self._stats_lock:
+            stats: Dict[str, Any] = dict(self._stats)
+
+        stats["queued"] = self._queue.qsize()
+        stats["average_batch_size"] = stats["messages"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+    def _collect(self, first: _Request) -> Tuple[List[_Request], bool]:
+        """Collect requests to be predicted in one batch, report whether the batcher was asked to stop."""
+        batch = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_latency
+
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+            if request is None:
+                return batch, True
+
+            batch.append(request)
+            size += len(request[0])
+
+        return batch, False
+
+    def _run(self) -> None:
+        """Predict queued requests in batches until stopped."""
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch, stopping = self._collect(first)
+            batch = [(messages, future) for messages, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            messages = [message for request_messages, _ in batch for message in request_messages]
+            try:
+                labels = self.predict(messages)
+            except Exception as exc:
+                _LOGGER.exception("Failed to predict a batch of %d messages", len(messages))
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+
+            offset = 0
+            for request_messages, future in batch:
+                future.set_result(labels[offset : offset + len(request_messages)])
+                offset += len(request_messages)
+
+            with self._stats_lock:
+                self._stats["requests"] += len(batch)
+                self._stats["messages"] += len(messages)
+                self._stats["batches"] += 1
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""A persistent cache of commit classifications keyed by commit SHA and model identity."""
+
+import abc
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.getenv("THOTH_GLYPH_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "thoth-glyph"))
+_CACHE_FILE_NAME = "classifications.sqlite3"
+# Keep the number of bound parameters in a single query below SQLite's default limit.
+_QUERY_CHUNK_SIZE = 500
+
+
+class LabelCache(abc.ABC):
+    """Base class of stores of labels keyed by commit SHA and model identity, used to skip classified commits."""
+
+    def __enter__(self) -> "LabelCache":
+        """Use the cache as a context manager."""
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        """Close the cache when leaving the context."""
+        self.close()
+
+    def close(self) -> None:
+        """Release resources held by the cache."""
+
+    @abc.abstractmethod
+    def get_many(self, oids: Iterable[str], model_id: str) -> Dict[str, str]:
+        """Get cached labels for the given commits, commits not present in the cache are omitted."""
+
+    @abc.abstractmethod
+    def put_many(self, labels: Iterable[Tuple[str, str]], model_id: str) -> None:
+        """Store labels for the given (commit oid, label) pairs."""
+
+
+class ClassificationCache(LabelCache):
+    """Store labels of already classified commits in an SQLite database.
+
+    A commit message never changes once the commit has its SHA, so a label computed by a model
+    for a commit can be reused for as long as the same model is used.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None) -> None:
+        """Open (and create if needed) the cache stored in the given directory."""
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.path = os.path.join(self.cache_dir, _CACHE_FILE_NAME)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS classifications ("
+                "oid TEXT NOT NULL, model TEXT NOT NULL, label TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL, "
+                "PRIMARY KEY (oid, model)) WITHOUT ROWID"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS classifications_accessed ON classifications (accessed)"
+            )
+
+    def __enter__(self) -> "ClassificationCache":
+        """Use the cache as a context manager."""
+        return self
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def get_many(self, oids: Iterable[str], model_id: str) -> Dict[str, str]:
+        """Get cached labels for the given commits, commits not present in the cache are omitted."""
+        oids = list(oids)
+        result: Dict[str, str] = {}
+        now = time.time()
+
+        with self._lock, self._connection:
+            for i in range(0, len(oids), _QUERY_CHUNK_SIZE):
+                chunk = oids[i : i + _QUERY_CHUNK_SIZE]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._connection.execute(
+                    f"SELECT oid, label FROM classifications WHERE model = ? AND oid IN ({placeholders})",
+                    [model_id, *chunk],
+                ).fetchall()
+                result.update(rows)
+
+            self._connection.executemany(
+                "UPDATE classifications SET accessed = ? WHERE oid = ? AND model = ?",
+                ((now, oid, model_id) for oid in result),
+            )
+
+        _LOGGER.debug("Classification cache hits: %d/%d", len(result), len(oids))
+        return result
+
+    def put_many(self, labels: Iterable[Tuple[str, str]], model_id: str) -> None:
+        """Store labels for the given (commit oid, label) pairs."""
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO classifications (oid, model, label, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                ((oid, model_id, label, now, now) for oid, label in labels),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Get statistics about the cache content."""
+        with self._lock:
+            entries, oldest, newest = self._connection.execute(
+                "SELECT COUNT(*), MIN(created), MAX(created) FROM classifications"
+            ).fetchone()
+            models: List[Tuple[str, int]] = self._connection.execute(
+                "SELECT model, COUNT(*) FROM classifications GROUP BY model ORDER BY model"
+            ).fetchall()
+
+        return {
+            "path": self.path,
+            "size": os.path.getsize(self.path),
+            "entries": entries,
+            "oldest": oldest,
+            "newest": newest,
+            "models": dict(models),
+        }
+
+    def _data_size(self) -> Tuple[int, int]:
+        """Get the number of entries and the number of bytes taken by pages of the database in use."""
+        (entries,) = self._connection.execute("SELECT COUNT(*) FROM classifications").fetchone()
+        (page_size,) = self._connection.execute("PRAGMA page_size").fetchone()
+        (page_count,) = self._connection.execute("PRAGMA page_count").fetchone()
+        (freelist_count,) = self._connection.execute("PRAGMA freelist_count").fetchone()
+        return entries, page_size * (page_count - freelist_count)
+
+    def prune(
+        self, max_age: Optional[float] = None, max_entries: Optional[int] = None, max_size: Optional[int] = None
+    ) -> int:
+        """Evict entries older than max_age seconds and the least recently used entries above max_entries.
+
+        With max_size set, the least recently used entries are also evicted until the database takes at most the
+        given number of bytes, estimated from the database pages in use. Return the number of entries removed.
+        """
+        removed = 0
+        with self._lock, self._connection:
+            if max_age is not None:
+                cursor = self._connection.execute(
+                    "DELETE FROM classifications WHERE created < ?", (time.time() - max_age,)
+                )
+                removed += cursor.rowcount
+
+            if max_entries is not None:
+                removed += self._evict_above(max_entries)
+
+            if max_size is not None:
+                entries, size = self._data_size()
+                if size > max_size and entries:
+                    # Pages are freed only by whole, evict entries in proportion to the size above the limit.
+                    removed += self._evict_above(entries * max_size // size)
+
+        if removed:
+            with self._lock:
+                self._connection.execute("VACUUM")
+
+        _LOGGER.debug("Removed %d entries from the classification cache", removed)
+        return removed
+
+    def _evict_above(self, max_entries: int) -> int:
+        """Evict the least recently used entries above max_entries, return the number of entries removed."""
+        cursor = self._connection.execute(
+            "DELETE FROM classifications WHERE (oid, model) IN ("
+            "SELECT oid, model FROM classifications ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (max_entries,),
+        )
+        return int(cursor.rowcount)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Labels of messages declaring their intent, e.g. using Conventional Commits, gitmoji or tags."""
+
+import re
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# Conventional Commits types and [tag] prefixes, e.g. "fix(parser)!: ..." or "[bugfix] ...". Changes of tests are
+# labeled by what they do to tests (fix, improve) in the training data, "test:" is thus left to the model.
+COMMIT_TYPES = {
+    "feat": "features",
+    "feature": "features",
+    "fix": "corrective",
+    "bugfix": "corrective",
+    "hotfix": "corrective",
+    "bug": "corrective",
+    "perf": "perfective",
+    "refactor": "perfective",
+    "improvement": "perfective",
+    "docs": "nonfunctional",
+    "doc": "nonfunctional",
+    "style": "nonfunctional",
+    "chore": "nonfunctional",
+    "ci": "nonfunctional",
+    "build": "nonfunctional",
+    "deps": "nonfunctional",
+}
+
+# Gitmoji, both as emoji and as the code GitHub renders them from.
+GITMOJI = {
+    "✨": "features",
+    ":sparkles:": "features",
+    "🎉": "features",
+    ":tada:": "features",
+    "🐛": "corrective",
+    ":bug:": "corrective",
+    "🚑": "corrective",
+    ":ambulance:": "corrective",
+    "🩹": "corrective",
+    ":adhesive_bandage:": "corrective",
+    "🔒": "corrective",
+    ":lock:": "corrective",
+    "⚡": "perfective",
+    ":zap:": "perfective",
+    "♻": "perfective",
+    ":recycle:": "perfective",
+    "🎨": "perfective",
+    ":art:": "perfective",
+    "📝": "nonfunctional",
+    ":memo:": "nonfunctional",
+    "💚": "nonfunctional",
+    ":green_heart:": "nonfunctional",
+    "👷": "nonfunctional",
+    ":construction_worker:": "nonfunctional",
+    "🔧": "nonfunctional",
+    ":wrench:": "nonfunctional",
+    "⬆": "nonfunctional",
+    ":arrow_up:": "nonfunctional",
+    "📦": "nonfunctional",
+    ":package:": "nonfunctional",
+}
+
+_PATTERN = re.compile(
+    r"\s*(?:"
+    r"(?P<type>[a-z]+)(?:\([^)\n]*\))?!?:\s"
+    r"|\[(?P<tag>[a-z]+)\]"
+    r"|(?P<gitmoji>" + "|".join(re.escape(g) for g in sorted(GITMOJI, key=len, reverse=True)) + r")"
+    r")",
+    re.IGNORECASE,
+)
+
+
+def match_label(message: str) -> Optional[str]:
+    """Get the label the message declares by its prefix, None if it declares none."""
+    found = _PATTERN.match(message)
+    if found is None:
+        return None
+
+    commit_type = found.group("type") or found.group("tag")
+    if commit_type is not None:
+        return COMMIT_TYPES.get(commit_type.lower())
+
+    return GITMOJI[found.group("gitmoji").lower()]
+
+
+def split_by_rules(messages: List[str]) -> Tuple[Dict[int, str], List[int]]:
+    """Get labels of messages resolved by rules keyed by their position, and positions of the rest."""
+    resolved = {}
+    rest = []
+    for i, message in enumerate(messages):
+        label = match_label(message)
+        if label is None:
+            rest.append(i)
+        else:
+            resolved[i] = label
+
+    return resolved, rest
@@ -17,24 +17,45 @@
 
 """Glyph's CLI Interface."""
 
+import contextlib
+import json
 import logging
+import os
+import sys
+from typing import Any
+from typing import Iterator
 from typing import Optional
+from typing import Tuple
 
 import click
-from thoth.common import init_logging
 
+from thoth import glyph
 from thoth.glyph import __title__
 from thoth.glyph import __version__ as glyph_version
-from thoth.glyph import classify_message
-from thoth.glyph import classify_by_date
-from thoth.glyph import classify_by_tag
+from thoth.glyph import CommitSourceType
 from thoth.glyph import MLModel
+from thoth.glyph import OutputFormat
+from thoth.glyph.batching import DEFAULT_MAX_BATCH_SIZE
+from thoth.glyph.batching import DEFAULT_MAX_LATENCY
+from thoth.glyph.batching import DEFAULT_MAX_QUEUE_SIZE
+from thoth.glyph.cache import LabelCache
+from thoth.glyph.dedup import DEFAULT_MEMO_SIZE
+from thoth.glyph.instrumentation import Instrumentation
+from thoth.glyph.instrumentation import set_instrumentation
+from thoth.glyph.preprocess import DEFAULT_MAX_TOKENS
+from thoth.glyph.preprocess import MessagePreprocessor
+from thoth.glyph.preprocess import set_preprocessor
+from thoth.glyph.server import DEFAULT_HOST
+from thoth.glyph.server import DEFAULT_PORT
+from thoth.glyph.server import serve
+from thoth.glyph.spill import parse_size
+from thoth.glyph.watch import DEFAULT_POLL_INTERVAL
+from thoth.glyph.watch import DEFAULT_WATCH_REFS
 
-init_logging()
 _LOGGER = logging.getLogger(__title__)
 
 
-def _print_version(ctx: click.Context, _, value: str):
+def _print_version(ctx: click.Context, _: click.Parameter, value: bool) -> None:
     """Print glyph version and exit."""
     if not value or ctx.resilient_parsing:
         return
@@ -43,6 +64,45 @@ def _print_version(ctx: click.Context, _, value: str):
     ctx.exit()
 
 
+def _parse_size(_: click.Context, __: click.Parameter, value: Optional[str]) -> Optional[int]:
+    """Parse a memory size option."""
+    try:
+        return parse_size(value) if value is not None else None
+    except ValueError as exc:
+        raise click.BadParameter(str(exc)) from exc
+
+
+@contextlib.contextmanager
+def _label_cache(
+    cache: bool, cache_dir: Optional[str], notes_path: Optional[str] = None
+) -> Iterator[Optional[LabelCache]]:
+    """Open the cache of labels selected by options, git notes of the repository are backed by the local cache."""
+    with glyph.ClassificationCache(cache_dir) if cache else contextlib.nullcontext() as classification_cache:
+        if notes_path is not None:
+            yield glyph.GitNotesCache(notes_path, fallback=classification_cache)
+        else:
+            yield classification_cache
+
+
+def _write_profile(path: str, instrumentation: Instrumentation) -> None:
+    """Write measurements of pipeline stages to the given file."""
+    with open(path, "w") as profile_file:
+        json.dump(instrumentation.to_dict(), profile_file, indent=2)
+
+
+def _write_classified(commits: Iterator[Any], output_format: str, output: Optional[str]) -> None:
+    """Write classified commits to the output file, or to the standard output, as they are classified."""
+    from thoth.glyph.writers import write_classified
+
+    if output is None:
+        write_classified(commits, OutputFormat.by_name(output_format), sys.stdout.buffer)
+        return
+
+    with open(output, "wb") as output_file:
+        written = write_classified(commits, OutputFormat.by_name(output_format), output_file)
+    _LOGGER.info("%d classified commits written to %s", written, output)
+
+
 @click.group()
 @click.pass_context
 @click.option(
@@ -60,11 +120,50 @@ def _print_version(ctx: click.Context, _, value: str):
     expose_value=False,
     help="Print adviser version and exit.",
 )
-def cli(ctx: Optional[click.Context] = None, verbose: bool = False):
+@click.option(
+    "--profile",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write time spent in stages of the classification pipeline to the given JSON file",
+)
+@click.option(
+    "--preprocess",
+    is_flag=True,
+    help="Strip trailers, quoted diffs and replies and pasted logs from messages before they are classified",
+)
+@click.option(
+    "--max-tokens",
+    type=int,
+    default=DEFAULT_MAX_TOKENS,
+    show_default=True,
+    help="Number of words of preprocessed messages passed to the model",
+)
+@click.option("--subject-only", is_flag=True, help="Classify only subjects of messages, implies --preprocess")
+def cli(
+    ctx: Optional[click.Context] = None,
+    verbose: bool = False,
+    profile: Optional[str] = None,
+    preprocess: bool = False,
+    max_tokens: int = DEFAULT_MAX_TOKENS,
+    subject_only: bool = False,
+) -> None:
     """Glyph command line interface."""
+    # Imported here as thoth-common is expensive to import, commands like --version do not need it.
+    from thoth.common import init_logging
+
+    init_logging()
+
     if ctx:
         ctx.auto_envvar_prefix = "GLYPH"
 
+    if profile is not None:
+        instrumentation = Instrumentation()
+        set_instrumentation(instrumentation)
+        if ctx:
+            ctx.call_on_close(lambda: _write_profile(profile, instrumentation))
+
+    if preprocess or subject_only:
+        set_preprocessor(MessagePreprocessor(max_tokens=max_tokens, subject_only=subject_only))
+
     if verbose:
         _LOGGER.setLevel(logging.DEBUG)
 
@@ -86,11 +185,11 @@ def cli(ctx: Optional[click.Context] = None, verbose: bool = False):
     type=click.Choice([e.name.lower() for e in MLModel]),
     help="Type of classifer",
 )
-def classify(message: str, model: str) -> None:
+@click.option("--model-path", type=str, help="Path to a custom model file to be used by the classifier")
+def classify(message: str, model: str, model_path: Optional[str]) -> None:
     """Generate CHANGELOG entries from the current Git project."""
     _LOGGER.info("Classifying commit")
-    model = MLModel.by_name(model)
-    print("Label : " + classify_message(message, model))
+    print("Label : " + glyph.classify_message(message, MLModel.by_name(model), model_path))
 
 
 @cli.command("classify-repo")
@@ -98,21 +197,103 @@ def classify(message: str, model: str) -> None:
 @click.option("--start", type=str, help="Starting date")
 @click.option("--end", type=str, help="End date")
 @click.option("--output", type=str, help="Generated output file")
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice([e.name.lower() for e in OutputFormat]),
+    help="Write commits with their oid, author, time and label in the given format as they are classified",
+)
 @click.option(
     "--model",
     default=MLModel.DEFAULT.name.lower(),
     type=click.Choice([e.name.lower() for e in MLModel]),
     help="Type of classifer",
 )
-def classifybydate(path: str, start: str, end: str, output: str, model: str) -> None:
+@click.option("--model-path", type=str, help="Path to a custom model file to be used by the classifier")
+@click.option("--cache/--no-cache", default=False, help="Reuse labels of commits classified in previous runs")
+@click.option("--cache-dir", type=str, help="Directory with the classification cache")
+@click.option("--notes", is_flag=True, help="Read and write labels as git notes in refs/notes/glyph of the repository")
+@click.option("--first-parent", is_flag=True, help="Follow only the first parent of merge commits")
+@click.option("--no-merges", is_flag=True, help="Skip merge commits")
+@click.option("--author", type=str, help="Classify only commits with author matching the given regular expression")
+@click.option(
+    "--path-filter",
+    "path_filter",
+    multiple=True,
+    help="Include only commits changing the given path relative to the repository root, can be repeated",
+)
+@click.option(
+    "--max-memory",
+    type=str,
+    callback=_parse_size,
+    help="Classify the walk in chunks taking at most the given memory (e.g. 512M) and stream the output,"
+    " as JSON Lines unless --format is given",
+)
+@click.option(
+    "--source",
+    type=click.Choice([e.name.lower() for e in CommitSourceType]),
+    help="Read commits using pygit2, a git log pipe or from a history file (the default if path is a file)",
+)
+@click.option(
+    "--jobs", "-j", type=int, default=1, help="Number of worker processes used for classification, 0 for all CPUs"
+)
+def classifybydate(
+    path: str,
+    start: str,
+    end: str,
+    output: str,
+    output_format: Optional[str],
+    model: str,
+    model_path: Optional[str],
+    cache: bool,
+    cache_dir: Optional[str],
+    notes: bool,
+    first_parent: bool,
+    no_merges: bool,
+    author: Optional[str],
+    path_filter: Tuple[str, ...],
+    max_memory: Optional[int],
+    source: Optional[str],
+    jobs: int,
+) -> None:
     """Classify commits in the given date-range."""
     _LOGGER.info("Classifying commits in the given date-range")
-    model = MLModel.by_name(model)
-    df = classify_by_date(path, start, end, model)
-    if output is None:
-        print(df)
-    else:
-        df.to_csv(output, sep="\t")
+    model_type = MLModel.by_name(model)
+    source_type = CommitSourceType.by_name(source) if source is not None else None
+    commit_filter = glyph.CommitFilter(first_parent=first_parent, no_merges=no_merges, author=author, paths=path_filter)
+    with _label_cache(cache, cache_dir, path if notes else None) as classification_cache:
+        if output_format is not None or max_memory is not None:
+            commits = glyph.iter_classify_by_date(
+                path,
+                start,
+                end,
+                model_type,
+                model_path,
+                classification_cache,
+                commit_filter=commit_filter,
+                workers=jobs,
+                source=source_type,
+                max_memory=max_memory,
+            )
+            _write_classified(commits, output_format or OutputFormat.JSONL.name, output)
+            return
+
+        result = glyph.classify_by_date(
+            path,
+            start,
+            end,
+            model_type,
+            model_path,
+            classification_cache,
+            commit_filter,
+            jobs,
+            as_frame=False,
+            source=source_type,
+        )
+        if output is None:
+            print(result)
+        else:
+            result.to_csv(output, sep="\t")
 
 
 @cli.command("classify-repo-by-tag")
@@ -120,21 +301,633 @@ def classifybydate(path: str, start: str, end: str, output: str, model: str) ->
 @click.option("--start_tag", type=str, required=True, help="Start tag")
 @click.option("--end_tag", type=str, help="End tag")
 @click.option("--output", type=str, help="Generated output file")
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice([e.name.lower() for e in OutputFormat]),
+    help="Write commits with their oid, author, time and label in the given format as they are classified",
+)
 @click.option(
     "--model",
     default=MLModel.DEFAULT.name.lower(),
     type=click.Choice([e.name.lower() for e in MLModel]),
     help="Type of classifer",
 )
-def classifybytag(path: str, start_tag: str, end_tag: str, output: str, model: str) -> None:
+@click.option("--model-path", type=str, help="Path to a custom model file to be used by the classifier")
+@click.option("--cache/--no-cache", default=False, help="Reuse labels of commits classified in previous runs")
+@click.option("--cache-dir", type=str, help="Directory with the classification cache")
+@click.option("--notes", is_flag=True, help="Read and write labels as git notes in refs/notes/glyph of the repository")
+@click.option("--first-parent", is_flag=True, help="Follow only the first parent of merge commits")
+@click.option("--no-merges", is_flag=True, help="Skip merge commits")
+@click.option("--author", type=str, help="Classify only commits with author matching the given regular expression")
+@click.option(
+    "--path-filter",
+    "path_filter",
+    multiple=True,
+    help="Include only commits changing the given path relative to the repository root, can be repeated",
+)
+@click.option(
+    "--max-memory",
+    type=str,
+    callback=_parse_size,
+    help="Classify the walk in chunks taking at most the given memory (e.g. 512M) and stream the output,"
+    " as JSON Lines unless --format is given",
+)
+@click.option(
+    "--source",
+    type=click.Choice([e.name.lower() for e in CommitSourceType]),
+    help="Read commits using pygit2, a git log pipe or from a history file (the default if path is a file)",
+)
+@click.option(
+    "--jobs", "-j", type=int, default=1, help="Number of worker processes used for classification, 0 for all CPUs"
+)
+def classifybytag(
+    path: str,
+    start_tag: str,
+    end_tag: str,
+    output: str,
+    output_format: Optional[str],
+    model: str,
+    model_path: Optional[str],
+    cache: bool,
+    cache_dir: Optional[str],
+    notes: bool,
+    first_parent: bool,
+    no_merges: bool,
+    author: Optional[str],
+    path_filter: Tuple[str, ...],
+    max_memory: Optional[int],
+    source: Optional[str],
+    jobs: int,
+) -> None:
     """Classify commits between the given tags."""
     _LOGGER.info("Classifying commits between given tags")
-    model = MLModel.by_name(model)
-    df = classify_by_tag(path, start_tag, end_tag, model)
+    model_type = MLModel.by_name(model)
+    source_type = CommitSourceType.by_name(source) if source is not None else None
+    commit_filter = glyph.CommitFilter(first_parent=first_parent, no_merges=no_merges, author=author, paths=path_filter)
+    with _label_cache(cache, cache_dir, path if notes else None) as classification_cache:
+        if output_format is not None or max_memory is not None:
+            commits = glyph.iter_classify_by_tag(
+                path,
+                start_tag,
+                end_tag,
+                model_type,
+                model_path,
+                classification_cache,
+                commit_filter=commit_filter,
+                workers=jobs,
+                source=source_type,
+                max_memory=max_memory,
+            )
+            _write_classified(commits, output_format or OutputFormat.JSONL.name, output)
+            return
+
+        result = glyph.classify_by_tag(
+            path,
+            start_tag,
+            end_tag,
+            model_type,
+            model_path,
+            classification_cache,
+            commit_filter,
+            jobs,
+            as_frame=False,
+            source=source_type,
+        )
+        if output is None:
+            print(result)
+        else:
+            result.to_csv(output, sep="\t")
+
+
+@cli.command("classify-repos")
+@click.option(
+    "--manifest",
+    type=click.Path(exists=True, dir_okay=False),
+    required=True,
+    help="JSON file with a list of repositories to classify, each with path, start/end or start_tag/end_tag"
+    " and output keys",
+)
+@click.option("--output-dir", type=str, default=".", show_default=True, help="Directory for outputs not in manifest")
+@click.option(
+    "--model",
+    default=MLModel.DEFAULT.name.lower(),
+    type=click.Choice([e.name.lower() for e in MLModel]),
+    help="Type of classifer",
+)
+@click.option("--model-path", type=str, help="Path to a custom model file to be used by the classifier")
+@click.option("--cache/--no-cache", default=False, help="Reuse labels of commits classified in previous runs")
+@click.option("--cache-dir", type=str, help="Directory with the classification cache")
+@click.option("--first-parent", is_flag=True, help="Follow only the first parent of merge commits")
+@click.option("--no-merges", is_flag=True, help="Skip merge commits")
+@click.option("--author", type=str, help="Classify only commits with author matching the given regular expression")
+@click.option(
+    "--path-filter",
+    "path_filter",
+    multiple=True,
+    help="Include only commits changing the given path relative to the repository root, can be repeated",
+)
+@click.option(
+    "--walk-jobs",
+    type=int,
+    help="Number of repositories walked concurrently",
+)
+@click.option(
+    "--source",
+    type=click.Choice([e.name.lower() for e in CommitSourceType]),
+    help="Read commits using pygit2, a git log pipe or from a history file (the default if path is a file)",
+)
+@click.option(
+    "--jobs", "-j", type=int, default=1, help="Number of worker processes used for classification, 0 for all CPUs"
+)
+def classifyrepos(
+    manifest: str,
+    output_dir: str,
+    model: str,
+    model_path: Optional[str],
+    cache: bool,
+    cache_dir: Optional[str],
+    first_parent: bool,
+    no_merges: bool,
+    author: Optional[str],
+    path_filter: Tuple[str, ...],
+    walk_jobs: Optional[int],
+    source: Optional[str],
+    jobs: int,
+) -> None:
+    """Classify commits of multiple repositories listed in a manifest, write one output per repository."""
+    from thoth.glyph.lib import DEFAULT_WALK_JOBS
+
+    with open(manifest) as manifest_file:
+        entries = json.load(manifest_file)
+
+    specs = []
+    for entry in entries:
+        spec = glyph.RepositorySpec(**entry)
+        if spec.output is None:
+            spec = spec._replace(
+                output=os.path.join(output_dir, os.path.basename(os.path.normpath(spec.path)) + ".tsv")
+            )
+        specs.append(spec)
+
+    _LOGGER.info("Classifying commits of %d repositories", len(specs))
+    with _label_cache(cache, cache_dir) as classification_cache:
+        glyph.classify_repositories(
+            specs,
+            MLModel.by_name(model),
+            model_path,
+            classification_cache,
+            glyph.CommitFilter(first_parent=first_parent, no_merges=no_merges, author=author, paths=path_filter),
+            walk_jobs or DEFAULT_WALK_JOBS,
+            jobs,
+            as_frame=False,
+            source=CommitSourceType.by_name(source) if source is not None else None,
+        )
+
+
+@cli.command("changelog")
+@click.option("--path", "-p", type=str, required=True, help="Path to Git repository")
+@click.option(
+    "--state",
+    "state_file",
+    type=click.Path(dir_okay=False),
+    required=True,
+    help="File keeping the changelog between runs, only commits added since the previous run are classified",
+)
+@click.option("--start-tag", type=str, help="Tag to start the changelog at if it has to be generated from scratch")
+@click.option("--full", is_flag=True, help="Regenerate the changelog from scratch")
+@click.option("--output", type=str, help="Generated output file")
+@click.option(
+    "--model",
+    default=MLModel.DEFAULT.name.lower(),
+    type=click.Choice([e.name.lower() for e in MLModel]),
+    help="Type of classifer",
+)
+@click.option("--model-path", type=str, help="Path to a custom model file to be used by the classifier")
+@click.option(
+    "--rules",
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON file mapping changelog headings to phrases of messages put under them",
+)
+@click.option("--first-parent", is_flag=True, help="Follow only the first parent of merge commits")
+@click.option("--no-merges", is_flag=True, help="Skip merge commits")
+@click.option("--author", type=str, help="Include only commits with author matching the given regular expression")
+@click.option(
+    "--path-filter",
+    "path_filter",
+    multiple=True,
+    help="Include only commits changing the given path relative to the repository root, can be repeated",
+)
+def changelog(
+    path: str,
+    state_file: str,
+    start_tag: Optional[str],
+    full: bool,
+    output: Optional[str],
+    model: str,
+    model_path: Optional[str],
+    rules: Optional[str],
+    first_parent: bool,
+    no_merges: bool,
+    author: Optional[str],
+    path_filter: Tuple[str, ...],
+) -> None:
+    """Generate changelog of commits reachable from HEAD, update it incrementally on subsequent runs."""
+    entries = glyph.generate_changelog(
+        path,
+        state_file,
+        model=MLModel.by_name(model),
+        model_path=model_path,
+        rules=glyph.PhraseRules.from_file(rules) if rules is not None else None,
+        commit_filter=glyph.CommitFilter(
+            first_parent=first_parent, no_merges=no_merges, author=author, paths=path_filter
+        ),
+        start_tag=start_tag,
+        full=full,
+    )
     if output is None:
-        print(df)
+        click.echo("\n".join(entries))
+    else:
+        with open(output, "w") as output_file:
+            output_file.write("\n".join(entries) + "\n")
+
+
+@cli.command("generate-log")
+@click.option("--path", "-p", type=str, required=True, help="Path to Git repository or history file")
+@click.option("--start-tag", type=str, help="Include commits since the given tag")
+@click.option("--end-tag", type=str, help="Include commits up to the given tag, the default branch if not given")
+@click.option("--start", type=str, help="Starting date, used if no start tag is given")
+@click.option("--end", type=str, help="End date, used if no start tag is given")
+@click.option("--output", type=str, help="Generated output file")
+@click.option(
+    "--model",
+    default=MLModel.DEFAULT.name.lower(),
+    type=click.Choice([e.name.lower() for e in MLModel]),
+    help="Type of classifer",
+)
+@click.option("--model-path", type=str, help="Path to a custom model file to be used by the classifier")
+@click.option(
+    "--rules",
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON file mapping changelog headings to phrases of messages put under them",
+)
+@click.option("--first-parent", is_flag=True, help="Follow only the first parent of merge commits")
+@click.option("--no-merges", is_flag=True, help="Skip merge commits")
+@click.option("--author", type=str, help="Include only commits with author matching the given regular expression")
+@click.option(
+    "--path-filter",
+    "path_filter",
+    multiple=True,
+    help="Include only commits changing the given path relative to the repository root, can be repeated",
+)
+@click.option(
+    "--source",
+    type=click.Choice([e.name.lower() for e in CommitSourceType]),
+    help="Read commits using pygit2, a git log pipe or from a history file (the default if path is a file)",
+)
+@click.option(
+    "--max-memory",
+    type=str,
+    callback=_parse_size,
+    default="256M",
+    show_default=True,
+    help="Memory used for classified messages, messages beyond it are spilled to disk and merged",
+)
+@click.option("--spill-dir", type=str, help="Directory for spilled messages, the temporary directory by default")
+def generate_log_command(
+    path: str,
+    start_tag: Optional[str],
+    end_tag: Optional[str],
+    start: Optional[str],
+    end: Optional[str],
+    output: Optional[str],
+    model: str,
+    model_path: Optional[str],
+    rules: Optional[str],
+    first_parent: bool,
+    no_merges: bool,
+    author: Optional[str],
+    path_filter: Tuple[str, ...],
+    source: Optional[str],
+    max_memory: int,
+    spill_dir: Optional[str],
+) -> None:
+    """Generate changelog of commits in a range of tags or dates within a memory budget."""
+    model_type = MLModel.by_name(model)
+    source_type = CommitSourceType.by_name(source) if source is not None else None
+    phrase_rules = glyph.PhraseRules.from_file(rules) if rules is not None else None
+    commit_filter = glyph.CommitFilter(first_parent=first_parent, no_merges=no_merges, author=author, paths=path_filter)
+    if start_tag is not None:
+        entries = glyph.iter_generate_log_by_tag(
+            path,
+            start_tag,
+            end_tag,
+            model=model_type,
+            model_path=model_path,
+            rules=phrase_rules,
+            commit_filter=commit_filter,
+            source=source_type,
+            max_memory=max_memory,
+            spill_dir=spill_dir,
+        )
     else:
-        df.to_csv(output, sep="\t")
+        entries = glyph.iter_generate_log_by_date(
+            path,
+            start,
+            end,
+            model=model_type,
+            model_path=model_path,
+            rules=phrase_rules,
+            commit_filter=commit_filter,
+            source=source_type,
+            max_memory=max_memory,
+            spill_dir=spill_dir,
+        )
+
+    with open(output, "w") if output is not None else contextlib.nullcontext(sys.stdout) as output_file:
+        for entry in entries:
+            output_file.write(entry + "\n")
+
+
+@cli.command("classify-releases")
+@click.option("--path", "-p", type=str, required=True, help="Path to Git repository or history file")
+@click.option(
+    "--branch",
+    type=str,
+    default="HEAD",
+    show_default=True,
+    help="Branch whose commits not contained in any release are listed as unreleased",
+)
+@click.option("--output", type=str, help="Generated output file")
+@click.option(
+    "--model",
+    default=MLModel.DEFAULT.name.lower(),
+    type=click.Choice([e.name.lower() for e in MLModel]),
+    help="Type of classifer",
+)
+@click.option("--model-path", type=str, help="Path to a custom model file to be used by the classifier")
+@click.option(
+    "--rules",
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON file mapping changelog headings to phrases of messages put under them",
+)
+@click.option("--no-merges", is_flag=True, help="Skip merge commits")
+@click.option("--author", type=str, help="Include only commits with author matching the given regular expression")
+@click.option(
+    "--path-filter",
+    "path_filter",
+    multiple=True,
+    help="Include only commits changing the given path relative to the repository root, can be repeated",
+)
+@click.option(
+    "--source",
+    type=click.Choice([e.name.lower() for e in CommitSourceType]),
+    help="Read commits using pygit2, a git log pipe or from a history file (the default if path is a file)",
+)
+@click.option("--cache/--no-cache", default=False, help="Reuse labels of commits classified in previous runs")
+@click.option("--cache-dir", type=str, help="Directory with the classification cache")
+@click.option("--notes", is_flag=True, help="Read and write labels as git notes in refs/notes/glyph of the repository")
+@click.option(
+    "--jobs", "-j", type=int, default=1, help="Number of worker processes used for classification, 0 for all CPUs"
+)
+def classify_releases_command(
+    path: str,
+    branch: str,
+    output: Optional[str],
+    model: str,
+    model_path: Optional[str],
+    rules: Optional[str],
+    no_merges: bool,
+    author: Optional[str],
+    path_filter: Tuple[str, ...],
+    source: Optional[str],
+    cache: bool,
+    cache_dir: Optional[str],
+    notes: bool,
+    jobs: int,
+) -> None:
+    """Generate changelogs of all releases grouped by the first release (tag) containing each commit."""
+    with _label_cache(cache, cache_dir, path if notes else None) as classification_cache:
+        releases = glyph.classify_releases(
+            path,
+            model=MLModel.by_name(model),
+            model_path=model_path,
+            rules=glyph.PhraseRules.from_file(rules) if rules is not None else None,
+            cache=classification_cache,
+            commit_filter=glyph.CommitFilter(no_merges=no_merges, author=author, paths=path_filter),
+            branch=branch,
+            workers=jobs,
+            source=CommitSourceType.by_name(source) if source is not None else None,
+        )
+    with open(output, "w") if output is not None else contextlib.nullcontext(sys.stdout) as output_file:
+        for release in releases:
+            if release.entries:
+                output_file.write(f"## {release.tag or 'Unreleased'}\n")
+                output_file.write("\n".join(release.entries) + "\n\n")
+
+
+@cli.command("watch")
+@click.option("--path", "-p", type=str, required=True, help="Path to Git repository")
+@click.option(
+    "--ref",
+    "refs",
+    type=str,
+    multiple=True,
+    help="Prefix of references to watch, can be given multiple times, branches (refs/heads/) by default",
+)
+@click.option("--output", type=str, help="Append classified commits as JSON Lines to the given file")
+@click.option(
+    "--model",
+    default=MLModel.DEFAULT.name.lower(),
+    type=click.Choice([e.name.lower() for e in MLModel]),
+    help="Type of classifer",
+)
+@click.option("--model-path", type=str, help="Path to a custom model file to be used by the classifier")
+@click.option("--cache/--no-cache", default=False, help="Reuse labels of commits classified in previous runs")
+@click.option("--cache-dir", type=str, help="Directory with the classification cache")
+@click.option("--notes", is_flag=True, help="Read and write labels as git notes in refs/notes/glyph of the repository")
+@click.option("--no-merges", is_flag=True, help="Skip merge commits")
+@click.option("--author", type=str, help="Classify only commits with author matching the given regular expression")
+@click.option(
+    "--path-filter",
+    "path_filter",
+    multiple=True,
+    help="Include only commits changing the given path relative to the repository root, can be repeated",
+)
+@click.option(
+    "--poll-interval",
+    type=float,
+    default=DEFAULT_POLL_INTERVAL,
+    show_default=True,
+    help="Seconds between checks of references if they cannot be watched using inotify",
+)
+@click.option("--inotify/--no-inotify", default=True, help="Watch references using inotify if it is available")
+@click.option(
+    "--jobs", "-j", type=int, default=1, help="Number of worker processes used for classification, 0 for all CPUs"
+)
+def watch_command(
+    path: str,
+    refs: Tuple[str, ...],
+    output: Optional[str],
+    model: str,
+    model_path: Optional[str],
+    cache: bool,
+    cache_dir: Optional[str],
+    notes: bool,
+    no_merges: bool,
+    author: Optional[str],
+    path_filter: Tuple[str, ...],
+    poll_interval: float,
+    inotify: bool,
+    jobs: int,
+) -> None:
+    """Classify commits as they become reachable from moved references, write them as JSON Lines."""
+    from thoth.glyph.watch import watch_repository
+    from thoth.glyph.writers import JsonLinesWriter
+
+    with (
+        open(output, "ab") if output is not None else contextlib.nullcontext(sys.stdout.buffer)
+    ) as output_file, _label_cache(cache, cache_dir, path if notes else None) as classification_cache:
+        try:
+            watch_repository(
+                path,
+                JsonLinesWriter(output_file).write,
+                model=MLModel.by_name(model),
+                model_path=model_path,
+                cache=classification_cache,
+                commit_filter=glyph.CommitFilter(no_merges=no_merges, author=author, paths=path_filter),
+                refs=refs or DEFAULT_WATCH_REFS,
+                poll_interval=poll_interval,
+                use_inotify=inotify,
+                workers=jobs,
+            )
+        except KeyboardInterrupt:
+            _LOGGER.info("Watch stopped")
+
+
+@cli.command("serve")
+@click.option("--host", type=str, default=DEFAULT_HOST, show_default=True, help="Address to listen on")
+@click.option("--port", type=int, default=DEFAULT_PORT, show_default=True, help="Port to listen on")
+@click.option("--socket", "socket_path", type=str, help="Listen on the given Unix socket instead of a TCP port")
+@click.option(
+    "--model",
+    default=MLModel.DEFAULT.name.lower(),
+    type=click.Choice([e.name.lower() for e in MLModel]),
+    help="Type of classifer",
+)
+@click.option("--model-path", type=str, help="Path to a custom model file to be used by the classifier")
+@click.option(
+    "--max-batch-size",
+    type=int,
+    default=DEFAULT_MAX_BATCH_SIZE,
+    show_default=True,
+    help="Maximum number of messages predicted in one batch",
+)
+@click.option(
+    "--max-latency",
+    type=float,
+    default=DEFAULT_MAX_LATENCY * 1000,
+    show_default=True,
+    help="Time in milliseconds to wait for more requests to fill a batch",
+)
+@click.option(
+    "--max-queue-size",
+    type=int,
+    default=DEFAULT_MAX_QUEUE_SIZE,
+    show_default=True,
+    help="Maximum number of queued requests, requests above the limit are rejected",
+)
+@click.option(
+    "--rules",
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON file mapping changelog headings to phrases of messages put under them when generating changelogs",
+)
+@click.option(
+    "--memo-size",
+    type=int,
+    default=DEFAULT_MEMO_SIZE,
+    show_default=True,
+    help="Number of distinct messages whose labels are remembered across requests, 0 to disable",
+)
+def serve_command(
+    host: str,
+    port: int,
+    socket_path: Optional[str],
+    model: str,
+    model_path: Optional[str],
+    max_batch_size: int,
+    max_latency: float,
+    max_queue_size: int,
+    rules: Optional[str],
+    memo_size: int,
+) -> None:
+    """Serve classification requests over HTTP with the model kept in memory."""
+    serve(
+        host=host,
+        port=port,
+        socket_path=socket_path,
+        model=MLModel.by_name(model),
+        model_path=model_path,
+        max_batch_size=max_batch_size,
+        max_latency=max_latency / 1000,
+        max_queue_size=max_queue_size,
+        rules=glyph.PhraseRules.from_file(rules) if rules is not None else None,
+        memo_size=memo_size,
+    )
+
+
+@cli.command("export-model")
+@click.option("--model-path", type=str, help="Path to a custom fasttext model file to be exported")
+@click.option("--output", type=str, required=True, help="Write the exported model to the given file")
+def export_model_command(model_path: Optional[str], output: str) -> None:
+    """Export a fasttext model to a compact file memory-mapped by the numpy model."""
+    from thoth.glyph.numpy_model import export_model
+
+    export_model(glyph.get_model_registry().resolve_path(MLModel.NUMPY, model_path), output)
+    click.echo(f"Model exported to {output}")
+
+
+@cli.command("export-history")
+@click.option("--path", "-p", type=str, required=True, help="Path to Git repository")
+@click.option("--output", type=str, required=True, help="History file to write, gzip compressed if it ends with .gz")
+def export_history_command(path: str, output: str) -> None:
+    """Export commits, branches and tags of a repository to a history file classified without the repository."""
+    exported = glyph.export_history(path, output)
+    click.echo(f"{exported} commits exported to {output}")
+
+
+@cli.group("cache")
+def cache_group() -> None:
+    """Inspect and maintain the classification cache."""
+
+
+@cache_group.command("stats")
+@click.option("--cache-dir", type=str, help="Directory with the classification cache")
+def cache_stats(cache_dir: Optional[str]) -> None:
+    """Print statistics about the classification cache."""
+    with glyph.ClassificationCache(cache_dir) as classification_cache:
+        click.echo(json.dumps(classification_cache.stats(), indent=2))
+
+
+@cache_group.command("prune")
+@click.option("--cache-dir", type=str, help="Directory with the classification cache")
+@click.option("--max-age", type=float, help="Remove entries older than the given number of days")
+@click.option("--max-entries", type=int, help="Keep at most the given number of the most recently used entries")
+@click.option(
+    "--max-size",
+    type=str,
+    callback=_parse_size,
+    help="Evict the least recently used entries until the cache takes at most the given size (e.g. 512M)",
+)
+def cache_prune(
+    cache_dir: Optional[str], max_age: Optional[float], max_entries: Optional[int], max_size: Optional[int]
+) -> None:
+    """Evict old entries from the classification cache."""
+    with glyph.ClassificationCache(cache_dir) as classification_cache:
+        removed = classification_cache.prune(
+            max_age=max_age * 86400 if max_age is not None else None, max_entries=max_entries, max_size=max_size
+        )
+    click.echo(f"Removed {removed} entries")
 
 
 __name__ == "__main__" and cli()
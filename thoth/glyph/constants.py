@@ -18,13 +18,17 @@
 """Enums used in Glyph."""
 
 from enum import Enum
+from typing import Type
+from typing import TypeVar
+
+_E = TypeVar("_E", bound="_ExtendedEnum")
 
 
 class _ExtendedEnum(Enum):
     """A custom enum with extended functionality."""
 
     @classmethod
-    def by_name(cls, name: str) -> Enum:
+    def by_name(cls: Type[_E], name: str) -> _E:
         """Retrieve enum based on its name."""
         try:
             return cls.__members__[name.upper()]
@@ -40,6 +44,8 @@ class MLModel(_ExtendedEnum):
     """Supported ML Classifiers."""
 
     FASTTEXT = 0
+    CASCADE = 1
+    NUMPY = 2
     DEFAULT = FASTTEXT
 
 
@@ -48,3 +54,21 @@ class Format(_ExtendedEnum):
 
     CLUSTER_SIMILAR = 0
     DEFAULT = CLUSTER_SIMILAR
+
+
+class OutputFormat(_ExtendedEnum):
+    """Supported formats of written classification results."""
+
+    JSONL = 0
+    CSV = 1
+    PARQUET = 2
+    ARROW = 3
+
+
+class CommitSourceType(_ExtendedEnum):
+    """Supported sources of commits to be classified."""
+
+    PYGIT2 = 0
+    GIT = 1
+    HISTORY = 2
+    DEFAULT = PYGIT2
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Predict each distinct message only once, optionally remember labels across calls."""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from .instrumentation import stage
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MEMO_SIZE = 100_000
+
+# Characters fastText splits words on, other (e.g. Unicode) whitespace is a part of words.
+_SEPARATORS = re.compile("[ \t\n\v\f\r\x00]+")
+
+
+def normalize(message: str) -> str:
+    """Get the key identifying messages which are predicted the same, word separators are not significant."""
+    return _SEPARATORS.sub(" ", message).strip(" ")
+
+
+class LabelMemo:
+    """A bounded least-recently-used mapping of normalized messages to labels predicted for them."""
+
+    def __init__(self, max_size: int = DEFAULT_MEMO_SIZE) -> None:
+        """Initialize an empty memo keeping at most max_size labels."""
+        if max_size < 1:
+            raise ValueError(f"Memo size has to be a positive number, got {max_size}")
+
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._labels: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def get_many(self, keys: List[str], model_id: str) -> Dict[str, str]:
+        """Get labels remembered for the given keys, keys without a label are left out."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                label = self._labels.get((model_id, key))
+                if label is not None:
+                    self._labels.move_to_end((model_id, key))
+                    found[key] = label
+
+            self._hits += len(found)
+            self._misses += len(keys) - len(found)
+
+        return found
+
+    def put_many(self, labels: Dict[str, str], model_id: str) -> None:
+        """Remember labels for the given keys, the least recently used labels are dropped above the size limit."""
+        with self._lock:
+            for key, label in labels.items():
+                self._labels[(model_id, key)] = label
+                self._labels.move_to_end((model_id, key))
+
+            while len(self._labels) > self.max_size:
+                self._labels.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all the remembered labels and reset statistics."""
+        with self._lock:
+            self._labels.clear()
+            self._hits = self._misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Get the number of remembered labels and the hit rate."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._labels),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+            }
+
+
+_MEMO: Optional[LabelMemo] = None
+
+
+def set_label_memo(memo: Optional[LabelMemo]) -> None:
+    """Install the process-wide label memo, None disables memoization."""
+    global _MEMO
+    _MEMO = memo
+
+
+def get_label_memo() -> Optional[LabelMemo]:
+    """Get the process-wide label memo, None if memoization is disabled."""
+    return _MEMO
+
+
+def predict_distinct(
+    predict: Callable[[List[str]], List[str]],
+    messages: List[str],
+    model_id: Optional[Callable[[], str]] = None,
+) -> List[str]:
+    """Predict labels calling predict with each distinct message once, scatter labels back to all the messages.
+
+    Messages are considered the same if they differ only in runs of characters fastText splits words on. If the
+    process-wide memo is enabled, labels are looked up there first, model_id is called to get the identity of the
+    model the labels belong to.
+    """
+    with stage("deduplicate") as deduplicate:
+        keys = [normalize(message) for message in messages]
+        # The first message with the given key represents all of them.
+        distinct: Dict[str, str] = {}
+        for key, message in zip(keys, messages):
+            distinct.setdefault(key, message)
+        deduplicate.count = len(distinct)
+
+    memo = _MEMO
+    identity = model_id() if memo is not None and model_id is not None else None
+    labels: Dict[str, str] = {}
+    if memo is not None and identity is not None:
+        labels = memo.get_many(list(distinct), identity)
+
+    missing = [key for key in distinct if key not in labels]
+    _LOGGER.debug("Predicting %d distinct messages out of %d (%d remembered)", len(missing), len(messages), len(labels))
+    if missing:
+        predicted = dict(zip(missing, predict([distinct[key] for key in missing])))
+        if memo is not None and identity is not None:
+            memo.put_many(predicted, identity)
+        labels.update(predicted)
+
+    return [labels[key] for key in keys]
@@ -32,3 +32,15 @@ class ModelNotFoundException(ThothGlyphException):
 
 class NoMessageEnteredException(ThothGlyphException):
     """An exception raised when an empty string is requested to be classified.."""
+
+
+class QueueFullException(ThothGlyphException):
+    """An exception raised when a classification request cannot be queued because the queue is full."""
+
+
+class ModelFormatException(ThothGlyphException):
+    """An exception raised when a model file cannot be read or the model is not supported."""
+
+
+class CommitSourceException(ThothGlyphException):
+    """An exception raised when commits cannot be read from a commit source, e.g. when git log fails."""
@@ -17,21 +17,26 @@
 
 """Module containing all supported formatting options for the changelog file."""
 
-from typing import Dict
+from typing import Iterable
+from typing import Iterator
 from typing import List
+from typing import Mapping
 from typing import Optional
+from typing import Tuple
 
 
 class ClusterSimilar:
     """Cluster similar messages into a common groups."""
 
     @staticmethod
-    def generate_log(message_dict: Dict[str, Optional[List[str]]]) -> List[str]:
+    def generate_log(message_dict: Mapping[str, Optional[List[str]]]) -> List[str]:
         """Generate log out of messages stored in a dict."""
-        changelog = []
-        for key in message_dict:
-            if message_dict[key] is not None and len(message_dict[key]) > 0:
-                changelog.append("### " + key)
-                for message in message_dict[key]:
-                    changelog.append("* " + message)
-        return changelog
+        return list(ClusterSimilar.iter_log((key, messages) for key, messages in message_dict.items() if messages))
+
+    @staticmethod
+    def iter_log(groups: Iterable[Tuple[str, Iterable[str]]]) -> Iterator[str]:
+        """Generate log lines out of non-empty (heading, messages) groups as the groups are read."""
+        for key, messages in groups:
+            yield "### " + key
+            for message in messages:
+                yield "* " + message
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Record time spent in stages of the classification pipeline together with the amount of processed data.
+
+Instrumentation is disabled by default, stages are then recorded by a shared no-op object. Enable it by
+installing an Instrumentation instance with set_instrumentation:
+
+    instrumentation = Instrumentation()
+    set_instrumentation(instrumentation)
+    classify_by_date(...)
+    print(instrumentation.to_dict())
+"""
+
+import bisect
+import threading
+import time
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+# Upper bounds of duration histogram buckets in seconds, Prometheus' +Inf bucket is implied.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+# Called with stage name, duration in seconds, number of processed items and their size in bytes.
+StageCallback = Callable[[str, float, int, int], None]
+
+
+class _StageStats:
+    """Aggregated measurements of a single stage."""
+
+    __slots__ = ("calls", "seconds", "count", "bytes", "buckets")
+
+    def __init__(self, buckets: int) -> None:
+        """Initialize empty statistics with the given number of histogram buckets."""
+        self.calls = 0
+        self.seconds = 0.0
+        self.count = 0
+        self.bytes = 0
+        self.buckets = [0] * (buckets + 1)
+
+
+class Stage:
+    """A single run of a stage, used as a context manager measuring its duration."""
+
+    __slots__ = ("_instrumentation", "_name", "_start", "_items", "count", "bytes")
+
+    def __init__(self, instrumentation: "Instrumentation", name: str) -> None:
+        """Initialize the stage run."""
+        self._instrumentation = instrumentation
+        self._name = name
+        self._start = 0.0
+        self._items: Optional[Sequence[str]] = None
+        self.count = 0
+        self.bytes = 0
+
+    def measure(self, items: Sequence[str]) -> None:
+        """Record number and size of the given items once the stage finishes."""
+        self._items = items
+
+    def __enter__(self) -> "Stage":
+        """Start measuring the stage."""
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        """Record the stage duration."""
+        seconds = time.perf_counter() - self._start
+        if self._items is not None:
+            self.count += len(self._items)
+            self.bytes += sum(map(len, self._items))
+            self._items = None
+
+        self._instrumentation.record(self._name, seconds, self.count, self.bytes)
+
+
+class _NoopStage:
+    """A stage run which does not record anything."""
+
+    __slots__ = ("count", "bytes")
+
+    def __init__(self) -> None:
+        """Initialize the stage run."""
+        self.count = 0
+        self.bytes = 0
+
+    def measure(self, items: Sequence[str]) -> None:
+        """Ignore the given items."""
+
+    def __enter__(self) -> "_NoopStage":
+        """Do nothing."""
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        """Do nothing."""
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+class Instrumentation:
+    """Aggregate durations, item counts and sizes of pipeline stages, optionally pass them to a callback."""
+
+    def __init__(self, callback: Optional[StageCallback] = None, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """Initialize instrumentation with an optional callback called on every finished stage."""
+        self.callback = callback
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._stages: Dict[str, _StageStats] = {}
+
+    def stage(self, name: str) -> Stage:
+        """Get a context manager measuring a run of the given stage."""
+        return Stage(self, name)
+
+    def record(self, name: str, seconds: float, count: int = 0, nbytes: int = 0) -> None:
+        """Record a finished run of the given stage."""
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = _StageStats(len(self.buckets))
+
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.count += count
+            stats.bytes += nbytes
+            stats.buckets[bisect.bisect_left(self.buckets, seconds)] += 1
+
+        if self.callback is not None:
+            self.callback(name, seconds, count, nbytes)
+
+    def reset(self) -> None:
+        """Drop all the recorded measurements."""
+        with self._lock:
+            self._stages.clear()
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Get measurements of all the stages, suitable for JSON serialization."""
+        with self._lock:
+            return {
+                name: {"calls": stats.calls, "seconds": stats.seconds, "count": stats.count, "bytes": stats.bytes}
+                for name, stats in self._stages.items()
+            }
+
+    def to_prometheus(self, prefix: str = "glyph") -> str:
+        """Format measurements in the Prometheus text exposition format."""
+        with self._lock:
+            stages: List[Tuple[str, _StageStats]] = sorted(self._stages.items())
+            lines = [
+                f"# HELP {prefix}_stage_duration_seconds Time spent in pipeline stages.",
+                f"# TYPE {prefix}_stage_duration_seconds histogram",
+            ]
+            for name, stats in stages:
+                cumulative = 0
+                for bound, observed in zip(self.buckets + (float("inf"),), stats.buckets):
+                    cumulative += observed
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{prefix}_stage_duration_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_duration_seconds_sum{{stage="{name}"}} {stats.seconds!r}')
+                lines.append(f'{prefix}_stage_duration_seconds_count{{stage="{name}"}} {stats.calls}')
+
+            for metric, attribute, description in (
+                ("items", "count", "Number of items processed in pipeline stages."),
+                ("bytes", "bytes", "Size of messages processed in pipeline stages."),
+            ):
+                lines.append(f"# HELP {prefix}_stage_{metric}_total {description}")
+                lines.append(f"# TYPE {prefix}_stage_{metric}_total counter")
+                lines.extend(
+                    f'{prefix}_stage_{metric}_total{{stage="{name}"}} {getattr(stats, attribute)}'
+                    for name, stats in stages
+                )
+
+        return "\n".join(lines) + "\n"
+
+
+_INSTRUMENTATION: Optional[Instrumentation] = None
+
+
+def set_instrumentation(instrumentation: Optional[Instrumentation]) -> None:
+    """Install the process-wide instrumentation, None disables instrumentation."""
+    global _INSTRUMENTATION
+    _INSTRUMENTATION = instrumentation
+
+
+def get_instrumentation() -> Optional[Instrumentation]:
+    """Get the process-wide instrumentation, None if instrumentation is disabled."""
+    return _INSTRUMENTATION
+
+
+def stage(name: str) -> Any:
+    """Measure a run of the given stage with the process-wide instrumentation, a no-op if it is disabled."""
+    if _INSTRUMENTATION is None:
+        return _NOOP_STAGE
+
+    return _INSTRUMENTATION.stage(name)
@@ -17,12 +17,26 @@
 
 """Helper functions for the library."""
 
+import hashlib
+import json
 import logging
 import os
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from itertools import islice
+from operator import itemgetter
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
 from typing import List
+from typing import NamedTuple
 from typing import Optional
+from typing import Tuple
+from typing import TYPE_CHECKING
+from typing import Union
 
+from pygit2 import Commit
+from pygit2 import Oid
 from pygit2 import Repository
 from pygit2 import GIT_SORT_TOPOLOGICAL
 
@@ -30,23 +44,70 @@ import datetime
 import sys
 import time
 
+from .cache import LabelCache
+from .constants import CommitSourceType
 from .constants import Format
 from .constants import MLModel
 from .exceptions import NoMessageEnteredException
 from .exceptions import ModelNotFoundException
-from .exceptions import RepositoryNotFoundException
 from .formatter import ClusterSimilar
+from .instrumentation import stage
+from .models import CascadeModel
 from .models import FasttextModel
+from .models import NumpyModel
+from .parallel import resolve_workers
+from .parallel import start_workers
+from .preprocess import get_preprocessor
+from .preprocess import prepare_message
+from .preprocess import prepare_messages
+from .registry import get_model_registry
+from .results import ClassificationResult
+from .rules import PhraseRules
+from .sources import CommitSource
+from .sources import SourceCommit
+from .sources import filter_commits
+from .sources import _open_repository
+from .sources import open_source
+from .spill import DEFAULT_MAX_MEMORY
+from .spill import SpillStore
+from .spill import chunks_within
+from .spill import message_size
+from .walker import CommitFilter
+from .walker import walk_commits
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 _LOGGER = logging.getLogger(__name__)
 DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(__file__), "data/model_commits_v2_quant.bin")
 CHECK_PHRASES = {"Automatic Updates": ["Automatic Update of dependency"]}
-
-
-def classify_by_date(
-    path: str, start: Optional[str] = None, end: Optional[str] = None, model: Optional[MLModel] = None
-) -> List[str]:
-    """Classify commits by date."""
+DEFAULT_RULES = PhraseRules(CHECK_PHRASES)
+DEFAULT_CHUNK_SIZE = 1000
+_LABEL_HEADINGS = {
+    "features": "Features",
+    "corrective": "Bug Fixes",
+    "perfective": "Improvements",
+    "nonfunctional": "Non-functional",
+    "unknown": "Other",
+}
+DEFAULT_WALK_JOBS = 8
+# Part of a memory budget given to a chunk of walked messages, classification of a chunk temporarily needs
+# several copies of its messages.
+_CHUNK_SHARE = 8
+
+
+class ClassifiedCommit(NamedTuple):
+    """A commit together with the label assigned to its message."""
+
+    oid: str
+    message: str
+    label: str
+    author: str = ""
+    commit_time: int = 0
+
+
+def date_range(start: Optional[str] = None, end: Optional[str] = None) -> Tuple[int, int]:
+    """Convert the given date range to a range of timestamps."""
     start_time = 0
     end_time = sys.maxsize
 
@@ -58,61 +119,354 @@ def classify_by_date(
             time.mktime((datetime.datetime.strptime(end, "%Y-%m-%d") + datetime.timedelta(days=1)).timetuple())
         )
 
-    repo_path = os.path.join(path, ".git")
-    if os.path.exists(repo_path):
-        repo = Repository(repo_path)
-    else:
-        raise RepositoryNotFoundException
-    orig_messages = []
-    for commit in repo.walk(repo.head.target, GIT_SORT_TOPOLOGICAL):
-        if start_time < commit.commit_time < end_time:
-            orig_messages.append(commit.message.lower())
+    return start_time, end_time
+
+
+def _walk_by_date(
+    source: CommitSource, start_time: int, end_time: int, commit_filter: Optional[CommitFilter] = None
+) -> Iterator[Tuple[str, str]]:
+    """Walk commits in the given time range, yield commit oids with lowercased messages."""
+    for commit in source.commits_by_date(start_time, end_time, commit_filter):
+        yield commit.oid, commit.message.lower()
 
-    return classify_messages(orig_messages, model)
+
+def _walk_by_tag(
+    source: CommitSource, start_tag: str, end_tag: Optional[str] = None, commit_filter: Optional[CommitFilter] = None
+) -> Iterator[Tuple[str, str]]:
+    """Walk commits between the given tags, yield commit oids with lowercased messages."""
+    for commit in source.commits_by_tag(start_tag, end_tag, commit_filter):
+        yield commit.oid, commit.message.lower()
+
+
+def classify_by_date(
+    path: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    cache: Optional[LabelCache] = None,
+    commit_filter: Optional[CommitFilter] = None,
+    workers: int = 1,
+    as_frame: bool = True,
+    source: Optional[CommitSourceType] = None,
+) -> Union["pd.DataFrame", ClassificationResult]:
+    """Classify commits by date, path is a repository or a history file read by the given commit source."""
+    commit_source = open_source(path, source)
+    with stage("walk") as walk:
+        commits = list(_walk_by_date(commit_source, *date_range(start, end), commit_filter))
+        walk.count = len(commits)
+    return _classify_commits(commits, model, model_path, cache, workers, as_frame)
 
 
 def classify_by_tag(
-    path: str, start_tag: str, end_tag: Optional[str] = None, model: Optional[MLModel] = None
-) -> List[str]:
-    """Classify messages for the given repo based on tags."""
-    repo_path = os.path.join(path, ".git")
-    if os.path.exists(repo_path):
-        repo = Repository(repo_path)
+    path: str,
+    start_tag: str,
+    end_tag: Optional[str] = None,
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    cache: Optional[LabelCache] = None,
+    commit_filter: Optional[CommitFilter] = None,
+    workers: int = 1,
+    as_frame: bool = True,
+    source: Optional[CommitSourceType] = None,
+) -> Union["pd.DataFrame", ClassificationResult]:
+    """Classify messages for the given repo based on tags, path is read by the given commit source."""
+    commit_source = open_source(path, source)
+    with stage("walk") as walk:
+        commits = list(_walk_by_tag(commit_source, start_tag, end_tag, commit_filter))
+        walk.count = len(commits)
+    return _classify_commits(commits, model, model_path, cache, workers, as_frame)
+
+
+def iter_classify_by_date(
+    path: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    cache: Optional[LabelCache] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    commit_filter: Optional[CommitFilter] = None,
+    workers: int = 1,
+    source: Optional[CommitSourceType] = None,
+    max_memory: Optional[int] = None,
+) -> Iterator[ClassifiedCommit]:
+    """Classify commits by date, yield classified commits chunk by chunk as the history is walked.
+
+    Chunks are limited so that their classification fits max_memory bytes if it is set.
+    """
+    commits = open_source(path, source).commits_by_date(*date_range(start, end), commit_filter)
+    yield from _iter_classify(commits, model, model_path, cache, chunk_size, workers, max_memory)
+
+
+def iter_classify_by_tag(
+    path: str,
+    start_tag: str,
+    end_tag: Optional[str] = None,
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    cache: Optional[LabelCache] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    commit_filter: Optional[CommitFilter] = None,
+    workers: int = 1,
+    source: Optional[CommitSourceType] = None,
+    max_memory: Optional[int] = None,
+) -> Iterator[ClassifiedCommit]:
+    """Classify commits between the given tags, yield classified commits chunk by chunk as the history is walked.
+
+    Chunks are limited so that their classification fits max_memory bytes if it is set.
+    """
+    commits = open_source(path, source).commits_by_tag(start_tag, end_tag, commit_filter)
+    yield from _iter_classify(commits, model, model_path, cache, chunk_size, workers, max_memory)
+
+
+class RepositorySpec(NamedTuple):
+    """A repository to be classified together with the range of its history, used by classify_repositories.
+
+    Commits between start_tag and end_tag are classified if start_tag is set, commits in the date range
+    given by start and end otherwise.
+    """
+
+    path: str
+    start: Optional[str] = None
+    end: Optional[str] = None
+    start_tag: Optional[str] = None
+    end_tag: Optional[str] = None
+    output: Optional[str] = None
+
+
+def _walk_repository(
+    spec: RepositorySpec, commit_filter: Optional[CommitFilter] = None, source: Optional[CommitSourceType] = None
+) -> List[Tuple[str, str]]:
+    """Walk the history of the repository described by the given spec."""
+    commit_source = open_source(spec.path, source)
+    if spec.start_tag is not None:
+        commits = _walk_by_tag(commit_source, spec.start_tag, spec.end_tag, commit_filter)
     else:
-        raise RepositoryNotFoundException
+        commits = _walk_by_date(commit_source, *date_range(spec.start, spec.end), commit_filter)
+
+    with stage("walk") as walk:
+        walked = [(oid, prepare_message(message)) for oid, message in commits]
+        walk.count = len(walked)
+
+    return walked
+
+
+def classify_repositories(
+    specs: List[RepositorySpec],
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    cache: Optional[LabelCache] = None,
+    commit_filter: Optional[CommitFilter] = None,
+    jobs: int = DEFAULT_WALK_JOBS,
+    workers: int = 1,
+    as_frame: bool = True,
+    source: Optional[CommitSourceType] = None,
+) -> List[Union["pd.DataFrame", ClassificationResult]]:
+    """Classify multiple repositories, return results in the order of the given specs.
+
+    Histories are walked concurrently in a pool of jobs threads, commits of all the repositories are then
+    classified together in one batch by the shared model once the walks are done. Results of specs with
+    output set are also written to the given file.
+    """
+    if model is None:
+        _LOGGER.info("Using default model")
+        model = MLModel.DEFAULT
 
-    start_tag = repo.revparse_single("refs/tags/" + start_tag)
+    start_workers(resolve_workers(workers))
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="glyph-walk") as executor:
+        walked = list(executor.map(lambda spec: _walk_repository(spec, commit_filter, source), specs))
+
+    commits = [commit for repo_commits in walked for commit in repo_commits]
+    _LOGGER.info("Classifying %d commits from %d repositories", len(commits), len(specs))
+    labels = label_commits(commits, model, model_path, cache, workers) if commits else []
+
+    results = [ClassificationResult() for _ in specs]
+    offset = 0
+    for index, repo_commits in enumerate(walked):
+        if repo_commits:
+            results[index] = ClassificationResult.from_labels(
+                [message for _, message in repo_commits], labels[offset : offset + len(repo_commits)]
+            )
+            offset += len(repo_commits)
+        else:
+            _LOGGER.error("No commits found in %r!", specs[index].path)
+
+        output = specs[index].output
+        if output is not None:
+            results[index].to_csv(output, sep="\t")
+
+    if as_frame:
+        return [result.to_frame() for result in results]
+
+    return list(results)
+
+
+def _iter_classify(
+    commits: Iterator[SourceCommit],
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    cache: Optional[LabelCache] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    workers: int = 1,
+    max_memory: Optional[int] = None,
+) -> Iterator[ClassifiedCommit]:
+    """Classify walked commits in chunks of the given size, messages are lowercased.
+
+    With max_memory set, chunks are also limited so that their classification fits the given number of bytes.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"Chunk size has to be a positive number, got {chunk_size}")
 
-    if end_tag is None:
-        end_tag = repo.revparse_single("refs/heads/master")
+    if model is None:
+        _LOGGER.info("Using default model")
+        model = MLModel.DEFAULT
+
+    if max_memory is None:
+        chunks = iter(lambda: list(islice(commits, chunk_size)), [])
     else:
-        end_tag = repo.revparse_single("refs/tags/" + end_tag)
+        chunk_memory = max(max_memory // _CHUNK_SHARE, 1)
+        chunks = chunks_within(commits, chunk_memory, lambda commit: message_size(commit.message), chunk_size)
+
+    classified = 0
+    while True:
+        with stage("walk") as walk:
+            walked = next(chunks, [])
+            walk.count = len(walked)
+        if not walked:
+            break
+
+        chunk = [(commit.oid, prepare_message(commit.message.lower())) for commit in walked]
+        labels = label_commits(chunk, model, model_path, cache, workers)
+        for commit, (oid, message), label in zip(walked, chunk, labels):
+            yield ClassifiedCommit(oid, message, label, commit.author, commit.commit_time)
+
+        classified += len(chunk)
+        _LOGGER.debug("%d commits classified so far", classified)
+
+    _LOGGER.info("%d commits classified", classified)
+
+
+def _classify_commits(
+    commits: List[Tuple[str, str]],
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    cache: Optional[LabelCache] = None,
+    workers: int = 1,
+    as_frame: bool = True,
+) -> Union["pd.DataFrame", ClassificationResult]:
+    """Classify (commit oid, message) pairs, labels of already classified commits are served from the cache."""
+    if cache is None or not commits:
+        return classify_messages([message for _, message in commits], model, model_path, workers, as_frame)
 
-    orig_messages = []
-    walker = repo.walk(end_tag.id, GIT_SORT_TOPOLOGICAL)
-    walker.hide(start_tag.id)
+    if model is None:
+        _LOGGER.info("Using default model")
+        model = MLModel.DEFAULT
+
+    commits = list(zip((oid for oid, _ in commits), prepare_messages(message for _, message in commits)))
+
+    result = ClassificationResult.from_labels(
+        [message for _, message in commits], label_commits(commits, model, model_path, cache, workers)
+    )
+    return result.to_frame() if as_frame else result
 
-    for commit in walker:
-        orig_messages.append(commit.message.lower())
 
-    return classify_messages(orig_messages, model)
+def label_commits(
+    commits: List[Tuple[str, str]],
+    model: MLModel,
+    model_path: Optional[str] = None,
+    cache: Optional[LabelCache] = None,
+    workers: int = 1,
+) -> List[str]:
+    """Get labels for (commit oid, message) pairs, messages are expected to be free of newlines."""
+    if cache is None:
+        return predict_labels([message for _, message in commits], model, model_path, workers)
+
+    # Labels depend on how messages were preprocessed, they are cached separately for each preprocessor.
+    model_id = get_model_registry().identity(model, model_path)
+    preprocessor = get_preprocessor()
+    if preprocessor is not None:
+        model_id = f"{model_id}+{preprocessor.identity}"
+
+    with stage("cache_lookup") as lookup:
+        labels = cache.get_many((oid for oid, _ in commits), model_id)
+        lookup.count = len(commits)
+
+    misses = [(oid, message) for oid, message in commits if oid not in labels]
+    _LOGGER.info("%d commits found in the classification cache", len(commits) - len(misses))
+
+    if misses:
+        predicted = list(
+            zip(
+                (oid for oid, _ in misses),
+                predict_labels([message for _, message in misses], model, model_path, workers),
+            )
+        )
+        with stage("cache_store") as store:
+            cache.put_many(predicted, model_id)
+            store.count = len(predicted)
+        labels.update(predicted)
+
+    return [labels[oid] for oid, _ in commits]
 
 
-def classify_messages(messages: List[str], model: Optional[MLModel] = None) -> pd.DataFrame:
-    """Classify messages."""
+def predict_labels(
+    messages: List[str], model: MLModel, model_path: Optional[str] = None, workers: int = 1
+) -> List[str]:
+    """Predict labels for the given messages using the given model, messages are expected to be free of newlines.
+
+    Messages are predicted as they are, prepare them the way classify_messages does by prepare_messages first.
+    """
+    if model == MLModel.FASTTEXT:
+        return FasttextModel.predict_labels(messages, model_path, workers)
+
+    if model == MLModel.CASCADE:
+        return CascadeModel.predict_labels(messages, model_path, workers)
+
+    if model == MLModel.NUMPY:
+        return NumpyModel.predict_labels(messages, model_path, workers)
+
+    raise ModelNotFoundException(f"Unknown model: {model}")
+
+
+def classify_messages(
+    messages: List[str],
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    workers: int = 1,
+    as_frame: bool = True,
+) -> Union["pd.DataFrame", ClassificationResult]:
+    """Classify messages, use the given number of worker processes (0 for all CPUs) for large batches.
+
+    The result is a pandas.DataFrame, or a compact ClassificationResult not requiring pandas if as_frame is False.
+    """
     if messages is None or len(messages) == 0:
         _LOGGER.error("No commits found!")
-        return pd.DataFrame()
+        result = ClassificationResult()
+        return result.to_frame() if as_frame else result
 
     if model is None:
         _LOGGER.info("Using default model")
         model = MLModel.DEFAULT
 
     if model == MLModel.FASTTEXT:
-        return FasttextModel.classify_messages(messages)
+        return FasttextModel.classify_messages(messages, model_path, workers, as_frame)
+
+    if model == MLModel.CASCADE:
+        return CascadeModel.classify_messages(messages, model_path, workers, as_frame)
+
+    if model == MLModel.NUMPY:
+        return NumpyModel.classify_messages(messages, model_path, workers, as_frame)
+
+    raise ModelNotFoundException(f"Unknown model: {model}")
+
 
+def warm_up(model: Optional[MLModel] = None, model_path: Optional[str] = None) -> None:
+    """Load the given model into the process-wide model registry ahead of the first classification."""
+    get_model_registry().warm_up(model, model_path)
 
-def classify_message(message: str, model: Optional[MLModel] = None) -> str:
+
+def classify_message(message: str, model: Optional[MLModel] = None, model_path: Optional[str] = None) -> str:
     """Classify a single message."""
     if message is None or message.strip() == "":
         raise NoMessageEnteredException
@@ -122,61 +476,446 @@ def classify_message(message: str, model: Optional[MLModel] = None) -> str:
         model = MLModel.DEFAULT
 
     if model == MLModel.FASTTEXT:
-        return FasttextModel.classify_message(message)
+        return FasttextModel.classify_message(message, model_path)
+
+    if model == MLModel.CASCADE:
+        return CascadeModel.classify_message(message, model_path)
+
+    if model == MLModel.NUMPY:
+        return NumpyModel.classify_message(message, model_path)
 
     raise ModelNotFoundException(f"Unknown model: {model}")
 
 
-def generate_log(messages: List[str], fmt: Format, model: Optional[str] = None) -> List[str]:
-    """Classify changes based on messages."""
+def _group_messages(
+    messages: List[str],
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    rules: Optional[PhraseRules] = None,
+) -> Dict[str, List[str]]:
+    """Group messages under changelog headings, messages matched by rules are put under the heading of the rule."""
+    with stage("rules") as rules_stage:
+        rules_stage.measure(messages)
+        check_phrase_dict, messages = (rules if rules is not None else DEFAULT_RULES).split(messages)
+    result = classify_messages(messages, model, model_path, as_frame=False)
+    return _group_labeled(messages, result.labels_predicted, check_phrase_dict)
+
+
+def _group_labeled(
+    messages: List[str], labels: Iterable[str], check_phrase_dict: Dict[str, List[str]]
+) -> Dict[str, List[str]]:
+    """Group labeled messages under changelog headings, add groups of messages matched by rules."""
+    message_dict: Dict[str, List[str]] = {heading: [] for heading in _LABEL_HEADINGS.values()}
+
+    # TODO: This tranlational logic is only needed for this specific Fasttext model
+    for message, label in zip(messages, labels):
+        message_dict[_LABEL_HEADINGS[label]].append(message)
+
+    for key in check_phrase_dict:
+        message_dict[key] = check_phrase_dict[key]
+
+    return message_dict
+
+
+def _format_log(message_dict: Dict[str, List[str]], fmt: Format) -> List[str]:
+    """Format grouped messages as changelog entries."""
+    if fmt == Format.CLUSTER_SIMILAR:
+        with stage("format"):
+            return ClusterSimilar.generate_log(message_dict)
+
+    raise ValueError(f"Unknown changelog format: {fmt}")
+
+
+def format_labeled(
+    messages: List[str], labels: Iterable[str], matched: Dict[str, List[str]], fmt: Format = Format.DEFAULT
+) -> List[str]:
+    """Format changelog entries of labeled messages and of messages matched by rules, grouped by PhraseRules.split."""
+    return _format_log(_group_labeled(messages, labels, matched), fmt)
+
+
+def generate_log(
+    messages: List[str],
+    fmt: Format,
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    rules: Optional[PhraseRules] = None,
+    max_memory: Optional[int] = None,
+) -> List[str]:
+    """Classify changes based on messages, messages matched by rules are put under the heading of the rule.
+
+    With max_memory set, messages are classified in chunks and grouped by an external merge as done by
+    iter_generate_log.
+    """
     if not messages:
         return []
 
-    check_phrase_dict = {}
-    filter_indices = []
+    if max_memory is not None:
+        return list(iter_generate_log(messages, fmt, model, model_path, rules, max_memory))
 
-    for phrase_heading in CHECK_PHRASES:
-        for phrase in CHECK_PHRASES[phrase_heading]:
-            for i in range(len(messages)):
-                if phrase.lower() in messages[i].lower():
-                    filter_indices.append(i)
-                    if phrase_heading in check_phrase_dict:
-                        temp = check_phrase_dict[phrase_heading]
-                        temp.append(messages[i])
-                        check_phrase_dict[phrase_heading] = temp
-                    else:
-                        check_phrase_dict[phrase_heading] = [messages[i]]
+    message_dict = _group_messages(messages, model, model_path, rules)
+    return _format_log(message_dict, fmt)
 
-    messages = [v for i, v in enumerate(messages) if i not in filter_indices]
-    df = classify_messages(messages, model)
 
-    keys = ["features", "corrective", "perfective", "nonfunctional", "unknown"]
-    message_dict = {}
+def iter_generate_log(
+    messages: Iterable[str],
+    fmt: Format = Format.DEFAULT,
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    rules: Optional[PhraseRules] = None,
+    max_memory: int = DEFAULT_MAX_MEMORY,
+    spill_dir: Optional[str] = None,
+) -> Iterator[str]:
+    """Generate changelog entries within a memory budget in bytes, entries are yielded as they are formatted.
 
-    for key in keys:
-        message_dict[key] = []
+    Messages are classified in chunks taking a small part of the budget. Classified messages are kept in a store
+    taking half of it, messages beyond it are spilled to sorted run files in spill_dir. The grouped changelog
+    is then built by merging the runs, producing the same entries as generate_log. The loaded model is not
+    accounted in the budget.
+    """
+    if fmt != Format.CLUSTER_SIMILAR:
+        raise ValueError(f"Unknown changelog format: {fmt}")
 
-    predicted_labels = []
+    if model is None:
+        _LOGGER.info("Using default model")
+        model = MLModel.DEFAULT
 
-    if not df.empty and df["labels_predicted"].shape[0]:
-        predicted_labels = [str(v) for v in df["labels_predicted"].values]
+    rules = rules if rules is not None else DEFAULT_RULES
+    headings = list(_LABEL_HEADINGS.values())
+    headings.extend(heading for heading in rules.rules if heading not in headings)
+    heading_index = {heading: index for index, heading in enumerate(headings)}
+    label_index = {label: heading_index[heading] for label, heading in _LABEL_HEADINGS.items()}
+
+    # Records are (heading index, matched by a rule, sequence number, message), so that merged runs are grouped
+    # by headings in the order of generate_log with messages in their original order.
+    matched_headings = set()
+    sequence = 0
+    with SpillStore(max(max_memory // 2, 1), spill_dir) as store:
+        for chunk in chunks_within(messages, max(max_memory // _CHUNK_SHARE, 1), message_size):
+            with stage("rules") as rules_stage:
+                rules_stage.measure(chunk)
+                check_phrase_dict, rest = rules.split(chunk)
+
+            labels = predict_labels(prepare_messages(rest), model, model_path)
+            for message, label in zip(rest, labels):
+                store.add((label_index[label], 0, sequence, message), message_size(message))
+                sequence += 1
+
+            for heading, group in check_phrase_dict.items():
+                matched_headings.add(heading)
+                for message in group:
+                    store.add((heading_index[heading], 1, sequence, message), message_size(message))
+                    sequence += 1
+
+        _LOGGER.info("%d messages classified, %d of them spilled to disk", sequence, store.spilled)
+
+        # Messages classified under a heading also used by a rule are replaced by the rule, as in generate_log.
+        records = (record for record in store if record[1] or headings[record[0]] not in matched_headings)
+        groups = groupby(records, key=itemgetter(0))
+        yield from ClusterSimilar.iter_log((headings[index], map(itemgetter(3), group)) for index, group in groups)
+
+
+def iter_generate_log_by_date(
+    path: str,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    fmt: Format = Format.DEFAULT,
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    rules: Optional[PhraseRules] = None,
+    commit_filter: Optional[CommitFilter] = None,
+    source: Optional[CommitSourceType] = None,
+    max_memory: int = DEFAULT_MAX_MEMORY,
+    spill_dir: Optional[str] = None,
+) -> Iterator[str]:
+    """Generate changelog of commits in the given date range within a memory budget, as iter_generate_log does."""
+    commits = open_source(path, source).commits_by_date(*date_range(start, end), commit_filter)
+    yield from iter_generate_log(_iter_subjects(commits), fmt, model, model_path, rules, max_memory, spill_dir)
+
+
+def iter_generate_log_by_tag(
+    path: str,
+    start_tag: str,
+    end_tag: Optional[str] = None,
+    fmt: Format = Format.DEFAULT,
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    rules: Optional[PhraseRules] = None,
+    commit_filter: Optional[CommitFilter] = None,
+    source: Optional[CommitSourceType] = None,
+    max_memory: int = DEFAULT_MAX_MEMORY,
+    spill_dir: Optional[str] = None,
+) -> Iterator[str]:
+    """Generate changelog of commits between the given tags within a memory budget, as iter_generate_log does."""
+    commits = open_source(path, source).commits_by_tag(start_tag, end_tag, commit_filter)
+    yield from iter_generate_log(_iter_subjects(commits), fmt, model, model_path, rules, max_memory, spill_dir)
+
+
+class ReleaseLog(NamedTuple):
+    """Changelog entries of commits first released in a tag, the tag is None for commits not released yet."""
+
+    tag: Optional[str]
+    oid: str
+    entries: List[str]
+
+
+_UNRELEASED = sys.maxsize
+
+
+def _subject(message: str) -> str:
+    """Get the subject line of a commit message."""
+    return message.strip().split("\n", maxsplit=1)[0]
+
+
+def _iter_subjects(commits: Iterable[SourceCommit]) -> Iterator[str]:
+    """Get subject lines of the given commits, commits with an empty message are skipped."""
+    for commit in commits:
+        subject = _subject(commit.message)
+        if subject:
+            yield subject
+
+
+def _assign_releases(
+    commits: Iterable[SourceCommit], tags: Dict[str, str]
+) -> Tuple[List[str], List[Tuple[int, SourceCommit]]]:
+    """Assign commits walked children first to the first release containing them in a single pass.
+
+    Return names of tags ordered by ancestry together with (release index, commit) pairs, the release index is
+    _UNRELEASED for commits not contained in any release.
+    """
+    tagged: Dict[str, List[str]] = {}
+    for name, oid in tags.items():
+        tagged.setdefault(oid, []).append(name)
+
+    with stage("walk") as walk:
+        walked = list(commits)
+        walk.count = len(walked)
+
+    # Reversed, the walk visits parents before their children, which orders releases by ancestry.
+    releases: List[str] = []
+    ranks: Dict[str, int] = {}
+    for commit in reversed(walked):
+        names = tagged.get(commit.oid)
+        if names:
+            ranks[commit.oid] = len(releases)
+            releases.extend(sorted(names))
+
+    # A commit is contained in all the releases containing its children, all children are walked before it,
+    # so only the first release containing each parent of the commits walked so far is kept.
+    frontier: Dict[str, int] = {}
+    assigned = []
+    for commit in walked:
+        release = min(frontier.pop(commit.oid, _UNRELEASED), ranks.get(commit.oid, _UNRELEASED))
+        for parent_id in commit.parent_ids:
+            if release < frontier.get(parent_id, _UNRELEASED):
+                frontier[parent_id] = release
+        assigned.append((release, commit))
+
+    return releases, assigned
+
+
+def classify_releases(
+    path: str,
+    fmt: Format = Format.DEFAULT,
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    rules: Optional[PhraseRules] = None,
+    cache: Optional[LabelCache] = None,
+    commit_filter: Optional[CommitFilter] = None,
+    branch: str = "HEAD",
+    workers: int = 1,
+    source: Optional[CommitSourceType] = None,
+) -> List[ReleaseLog]:
+    """Generate changelogs of all the releases in a single pass over the history, the newest release first.
+
+    Tags are ordered by ancestry, each commit is put to the changelog of the first release containing it. Commits
+    of the branch not contained in any release are put to the changelog of unreleased commits, listed first with
+    tag None. Messages of all the releases are classified in one batch.
+    """
+    commit_filter = commit_filter or CommitFilter()
+    if commit_filter.first_parent:
+        raise ValueError("Commits are assigned to releases by reachability, first parent walks are not supported")
 
-    for i in range(len(messages)):
-        message_dict[predicted_labels[i]].append(messages[i])
+    if model is None:
+        _LOGGER.info("Using default model")
+        model = MLModel.DEFAULT
 
-    # TODO: This tranlational logic is only needed for this specific Fasttext model
-    message_dict["Features"] = message_dict.pop("features")
-    message_dict["Bug Fixes"] = message_dict.pop("corrective")
-    message_dict["Improvements"] = message_dict.pop("perfective")
-    message_dict["Non-functional"] = message_dict.pop("nonfunctional")
-    message_dict["Other"] = message_dict.pop("unknown")
+    commit_source = open_source(path, source)
+    tags = commit_source.tags()
+    branch_tip = commit_source.resolve(branch)
+    releases, assigned = _assign_releases(commit_source.commits_reachable({branch_tip, *tags.values()}), tags)
+    _LOGGER.info("%d commits assigned to %d releases", len(assigned), len(releases))
+
+    kept_commits = filter_commits((commit for _, commit in assigned), commit_filter)
+    if commit_filter.paths:
+        kept_commits = commit_source.touching_paths(kept_commits, commit_filter.paths)
+    kept = {commit.oid for commit in kept_commits}
+    release_commits: Dict[int, List[Tuple[str, str]]] = {}
+    for release, commit in assigned:
+        subject = _subject(commit.message)
+        if subject and commit.oid in kept:
+            release_commits.setdefault(release, []).append((commit.oid, subject))
+
+    rules = rules if rules is not None else DEFAULT_RULES
+    matched: Dict[int, Dict[str, List[str]]] = {}
+    rest: Dict[int, List[Tuple[str, str]]] = {}
+    with stage("rules") as rules_stage:
+        for release, commits in release_commits.items():
+            rules_stage.measure([subject for _, subject in commits])
+            check_phrase_dict: Dict[str, List[str]] = {heading: [] for heading in rules.rules}
+            rest[release] = []
+            for oid, subject in commits:
+                heading = rules.match(subject)
+                if heading is None:
+                    rest[release].append((oid, subject))
+                else:
+                    check_phrase_dict[heading].append(subject)
+            matched[release] = {heading: group for heading, group in check_phrase_dict.items() if group}
+
+    to_classify = [(oid, prepare_message(subject)) for commits in rest.values() for oid, subject in commits]
+    labels = iter(label_commits(to_classify, model, model_path, cache, workers) if to_classify else [])
+
+    logs = {}
+    for release, commits in rest.items():
+        logs[release] = format_labeled(
+            [subject for _, subject in commits], islice(labels, len(commits)), matched[release], fmt
+        )
 
-    for key in check_phrase_dict:
-        message_dict[key] = check_phrase_dict[key]
+    result = []
+    if _UNRELEASED in logs:
+        result.append(ReleaseLog(None, branch_tip, logs[_UNRELEASED]))
+    for release in reversed(range(len(releases))):
+        result.append(ReleaseLog(releases[release], tags[releases[release]], logs.get(release, [])))
+
+    return result
+
+
+class ChangelogState(NamedTuple):
+    """State of an incrementally generated changelog, stored between runs of generate_changelog."""
+
+    watermark: str
+    model: str
+    config: str
+    groups: Dict[str, List[str]]
+
+
+_CHANGELOG_STATE_VERSION = 2
 
+
+def _changelog_config_id(rules: PhraseRules, commit_filter: CommitFilter, start: Optional[str]) -> str:
+    """Get identity of the configuration changelog groups were built with: rules, filters, start and preprocessing."""
+    preprocessor = get_preprocessor()
+    config = {
+        "rules": rules.rules,
+        "filter": commit_filter._asdict(),
+        "start": start,
+        "preprocessor": preprocessor.identity if preprocessor is not None else None,
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _load_changelog_state(state_file: str) -> Optional[ChangelogState]:
+    """Load state of a changelog, None if there is no usable state."""
+    try:
+        with open(state_file) as f:
+            content = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    if content.get("version") != _CHANGELOG_STATE_VERSION:
+        _LOGGER.warning("Ignoring changelog state %r of an unsupported version", state_file)
+        return None
+
+    return ChangelogState(content["watermark"], content["model"], content["config"], content["groups"])
+
+
+def _save_changelog_state(state_file: str, state: ChangelogState) -> None:
+    """Store state of a changelog, the previous state is replaced atomically."""
+    tmp_file = state_file + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump({"version": _CHANGELOG_STATE_VERSION, **state._asdict()}, f, indent=2)
+    os.replace(tmp_file, state_file)
+
+
+def _resume_point(repo: Repository, head: Oid, state: ChangelogState, model_id: str, config_id: str) -> Optional[Oid]:
+    """Get the commit an incremental run can continue from, None if the changelog has to be regenerated."""
+    if state.model != model_id:
+        _LOGGER.info("Model changed since the previous run, regenerating the changelog")
+        return None
+
+    if state.config != config_id:
+        _LOGGER.info("Rules, filters or preprocessing changed since the previous run, regenerating the changelog")
+        return None
+
+    try:
+        watermark = Oid(hex=state.watermark)
+    except ValueError:
+        _LOGGER.warning("Invalid watermark %r, regenerating the changelog", state.watermark)
+        return None
+
+    if watermark != head and (repo.get(watermark) is None or not repo.descendant_of(head, watermark)):
+        _LOGGER.warning("Watermark %s is not an ancestor of HEAD, history was rewritten", state.watermark)
+        return None
+
+    return watermark
+
+
+def _merge_groups(new: Dict[str, List[str]], old: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Merge grouped messages, new messages are put in front of the old ones."""
+    return {
+        heading: new.get(heading, []) + old.get(heading, []) for heading in [*new, *(h for h in old if h not in new)]
+    }
+
+
+def generate_changelog(
+    path: str,
+    state_file: str,
+    fmt: Format = Format.DEFAULT,
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    rules: Optional[PhraseRules] = None,
+    commit_filter: Optional[CommitFilter] = None,
+    start_tag: Optional[str] = None,
+    full: bool = False,
+) -> List[str]:
+    """Generate changelog of commits reachable from HEAD, classify only commits added since the previous run.
+
+    The last processed commit, identities of the model and of the configuration (rules, commit filter, the commit
+    start_tag points to and message preprocessing) and the grouped messages are kept in state_file. The whole
+    history (or the history since start_tag) is processed if there is no state, if full is set, if the model or
+    the configuration changed or if the previously processed commit is no longer an ancestor of HEAD (e.g. after
+    a force-push).
+    """
     if model is None:
-        _LOGGER.info("Using default format")
-        model = Format.DEFAULT
+        _LOGGER.info("Using default model")
+        model = MLModel.DEFAULT
 
-    if fmt == Format.CLUSTER_SIMILAR:
-        return ClusterSimilar.generate_log(message_dict)
+    repo = _open_repository(path)
+    head = repo.head.peel(Commit).id
+    model_id = get_model_registry().identity(model, model_path)
+    rules = rules if rules is not None else DEFAULT_RULES
+    commit_filter = commit_filter or CommitFilter()
+    start = repo.revparse_single("refs/tags/" + start_tag).peel(Commit).id if start_tag is not None else None
+    config_id = _changelog_config_id(rules, commit_filter, str(start) if start is not None else None)
+
+    state = None if full else _load_changelog_state(state_file)
+    hide = _resume_point(repo, head, state, model_id, config_id) if state is not None else None
+    if state is not None and hide is not None:
+        groups = state.groups
+    else:
+        groups = {}
+        hide = start
+
+    with stage("walk") as walk:
+        subjects = (
+            _subject(commit.message)
+            for commit in walk_commits(repo, head, hide=hide, commit_filter=commit_filter, sort=GIT_SORT_TOPOLOGICAL)
+        )
+        messages = [subject for subject in subjects if subject]
+        walk.count = len(messages)
+
+    _LOGGER.info("%d new commits to be added to the changelog", len(messages))
+    if messages:
+        groups = _merge_groups(_group_messages(messages, model, model_path, rules), groups)
+
+    _save_changelog_state(state_file, ChangelogState(str(head), model_id, config_id, groups))
+    return _format_log(groups, fmt)
@@ -17,42 +17,185 @@
 
 """Module containing all supported Machine Learning models."""
 
+import functools
 from os import path
+from typing import Any
+from typing import TYPE_CHECKING
 from typing import List
+from typing import Optional
+from typing import Union
 import logging
 
-from fasttext import load_model
-import pandas as pd
+from .cascade import match_label
+from .cascade import split_by_rules
+from .constants import MLModel
+from .dedup import predict_distinct
+from .instrumentation import stage
+from .parallel import map_shards
+from .preprocess import prepare_message
+from .preprocess import prepare_messages
+from .parallel import resolve_workers
+from .registry import get_model_registry
+from .results import ClassificationResult
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 _LOGGER = logging.getLogger(__name__)
 DEFAULT_FASTTEXT_MODEL_PATH = path.join(path.dirname(__file__), "data/model_commits_v2_quant.bin")
 
 
+def _load_fasttext_model(model_path: str) -> Any:
+    """Load a fasttext model from the given path."""
+    try:
+        from fasttext import load_model
+    except ImportError as exc:
+        raise ImportError(
+            "fasttext is required by the fasttext model, install thoth-glyph[fasttext] or use the numpy model"
+        ) from exc
+
+    return load_model(model_path)
+
+
+get_model_registry().register(MLModel.FASTTEXT, _load_fasttext_model, DEFAULT_FASTTEXT_MODEL_PATH)
+
+
+def _predict_fasttext(model_path: Optional[str], messages: List[str]) -> List[str]:
+    """Predict labels by the fasttext model, the model is loaded once in each worker process."""
+    labels, _ = get_model_registry().get(MLModel.FASTTEXT, model_path).predict(messages)
+    return [str(label[0])[9:] for label in labels]
+
+
 class FasttextModel:
     """A model that classifies messages using fasttext."""
 
     @staticmethod
-    def classify_message(message: str) -> str:
+    def classify_message(message: str, model_path: Optional[str] = None) -> str:
         """Classify a single message."""
-        _LOGGER.info("Model Path : " + DEFAULT_FASTTEXT_MODEL_PATH)
-        classifier = load_model(DEFAULT_FASTTEXT_MODEL_PATH)
-        label = classifier.predict(message.lower())
+        classifier = get_model_registry().get(MLModel.FASTTEXT, model_path)
+        with stage("predict") as predict:
+            label = classifier.predict(prepare_message(message.lower()))
+            predict.count, predict.bytes = 1, len(message)
         label_string = str(label[0][0])[9:]
         return label_string
 
     @staticmethod
-    def classify_messages(messages: List[str]) -> pd.DataFrame:
-        """Classify multiple messages."""
-        df = pd.DataFrame(messages, columns=["message"])
-        df = df.replace("\n", "", regex=True)
-        commits = list(df["message"].astype(str))
-        _LOGGER.info("Model Path : " + DEFAULT_FASTTEXT_MODEL_PATH)
-        classifier = load_model(DEFAULT_FASTTEXT_MODEL_PATH)
-        labels = classifier.predict(commits)
-        res = list(zip(*labels))
-        res_list = [x[0] for x in res]
-        lst2 = [item[0] for item in res_list]
-        df["labels_predicted"] = lst2
-        df["labels_predicted"] = df["labels_predicted"].map(lambda x: x[9:])
+    def predict_labels(messages: List[str], model_path: Optional[str] = None, workers: int = 1) -> List[str]:
+        """Predict labels for the given messages, messages are expected to be free of newlines.
+
+        Each distinct message is predicted only once, labels are also looked up in the process-wide label memo
+        if it is enabled.
+        """
+        registry = get_model_registry()
+
+        def predict_all(distinct: List[str]) -> List[str]:
+            with stage("predict") as predict_stage:
+                predict_stage.measure(distinct)
+                return map_shards(functools.partial(_predict_fasttext, model_path), distinct, resolve_workers(workers))
+
+        return predict_distinct(predict_all, messages, lambda: registry.identity(MLModel.FASTTEXT, model_path))
+
+    @staticmethod
+    def classify_messages(
+        messages: List[str], model_path: Optional[str] = None, workers: int = 1, as_frame: bool = True
+    ) -> Union["pd.DataFrame", ClassificationResult]:
+        """Classify multiple messages, return a pandas.DataFrame or a compact ClassificationResult."""
+        messages = prepare_messages(messages)
+        result = ClassificationResult.from_labels(messages, FasttextModel.predict_labels(messages, model_path, workers))
+        _LOGGER.info(str(len(messages)) + " commits classified")
+        return result.to_frame() if as_frame else result
+
+
+def _load_cascade_model(model_path: str) -> Any:
+    """Get the fasttext model messages not resolved by rules fall back to, it is shared with FasttextModel."""
+    return get_model_registry().get(MLModel.FASTTEXT, model_path)
+
+
+get_model_registry().register(MLModel.CASCADE, _load_cascade_model, DEFAULT_FASTTEXT_MODEL_PATH)
+
+
+class CascadeModel:
+    """Resolve messages declaring their intent (Conventional Commits, gitmoji, tags) by rules, the rest by fasttext."""
+
+    @staticmethod
+    def classify_message(message: str, model_path: Optional[str] = None) -> str:
+        """Classify a single message."""
+        label = match_label(message)
+        if label is not None:
+            return label
+
+        return FasttextModel.classify_message(message, model_path)
+
+    @staticmethod
+    def predict_labels(messages: List[str], model_path: Optional[str] = None, workers: int = 1) -> List[str]:
+        """Predict labels for the given messages, messages are expected to be free of newlines."""
+        with stage("rules_fast_path") as rules_stage:
+            resolved, rest = split_by_rules(messages)
+            rules_stage.count = len(resolved)
+
+        _LOGGER.info("%d messages resolved by rules, %d messages left to the model", len(resolved), len(rest))
+        if rest:
+            predicted = FasttextModel.predict_labels([messages[i] for i in rest], model_path, workers)
+            resolved.update(zip(rest, predicted))
+
+        return [resolved[i] for i in range(len(messages))]
+
+    @staticmethod
+    def classify_messages(
+        messages: List[str], model_path: Optional[str] = None, workers: int = 1, as_frame: bool = True
+    ) -> Union["pd.DataFrame", ClassificationResult]:
+        """Classify multiple messages, return a pandas.DataFrame or a compact ClassificationResult."""
+        messages = prepare_messages(messages)
+        result = ClassificationResult.from_labels(messages, CascadeModel.predict_labels(messages, model_path, workers))
+        _LOGGER.info(str(len(messages)) + " commits classified")
+        return result.to_frame() if as_frame else result
+
+
+def _load_numpy_model(model_path: str) -> Any:
+    """Load a fasttext model, or a model exported from it, to be evaluated with NumPy."""
+    from .numpy_model import NumpyClassifier
+
+    return NumpyClassifier.load(model_path)
+
+
+get_model_registry().register(MLModel.NUMPY, _load_numpy_model, DEFAULT_FASTTEXT_MODEL_PATH)
+
+
+def _predict_numpy(model_path: Optional[str], messages: List[str]) -> List[str]:
+    """Predict labels by the NumPy model, the model is loaded once in each worker process."""
+    return [label[9:] for label in get_model_registry().get(MLModel.NUMPY, model_path).predict(messages)]
+
+
+class NumpyModel:
+    """A model that classifies messages with fasttext models evaluated by NumPy, predicting the same labels."""
+
+    @staticmethod
+    def classify_message(message: str, model_path: Optional[str] = None) -> str:
+        """Classify a single message."""
+        classifier = get_model_registry().get(MLModel.NUMPY, model_path)
+        with stage("predict") as predict:
+            label: str = classifier.predict([prepare_message(message.lower())])[0]
+            predict.count, predict.bytes = 1, len(message)
+        return label[9:]
+
+    @staticmethod
+    def predict_labels(messages: List[str], model_path: Optional[str] = None, workers: int = 1) -> List[str]:
+        """Predict labels for the given messages, messages are expected to be free of newlines."""
+        registry = get_model_registry()
+
+        def predict_all(distinct: List[str]) -> List[str]:
+            with stage("predict") as predict_stage:
+                predict_stage.measure(distinct)
+                return map_shards(functools.partial(_predict_numpy, model_path), distinct, resolve_workers(workers))
+
+        return predict_distinct(predict_all, messages, lambda: registry.identity(MLModel.NUMPY, model_path))
+
+    @staticmethod
+    def classify_messages(
+        messages: List[str], model_path: Optional[str] = None, workers: int = 1, as_frame: bool = True
+    ) -> Union["pd.DataFrame", ClassificationResult]:
+        """Classify multiple messages, return a pandas.DataFrame or a compact ClassificationResult."""
+        messages = prepare_messages(messages)
+        result = ClassificationResult.from_labels(messages, NumpyModel.predict_labels(messages, model_path, workers))
         _LOGGER.info(str(len(messages)) + " commits classified")
-        return df
+        return result.to_frame() if as_frame else result
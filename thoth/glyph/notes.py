@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Keep labels of commits in git notes, so that they are shared by pushing and fetching the notes ref."""
+
+import json
+import logging
+import threading
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from pygit2 import Blob
+from pygit2 import Commit
+from pygit2 import GitError
+from pygit2 import GIT_FILEMODE_BLOB
+from pygit2 import GIT_FILEMODE_TREE
+from pygit2 import Oid
+from pygit2 import Signature
+from pygit2 import Tree
+
+from .cache import LabelCache
+from .instrumentation import stage
+from .sources import _open_repository
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_NOTES_REF = "refs/notes/glyph"
+_NOTES_MESSAGE = "Notes added by 'thoth-glyph'\n"
+_SIGNATURE = ("thoth-glyph", "thoth-glyph@localhost")
+# Number of attempts to update the notes ref moved by another writer in the meantime.
+_MAX_ATTEMPTS = 3
+
+
+def _find_note(tree: Tree, oid: str, subtrees: Dict[str, Optional[Tree]]) -> Optional[Oid]:
+    """Find the note blob of the given commit in a notes tree, notes may be spread over fanout directories.
+
+    Fanout directories are looked up once, they are kept in subtrees by their path.
+    """
+    path = ""
+    for split in range(0, len(oid), 2):
+        name = oid[split:]
+        if name in tree:
+            entry = tree[name]
+            return entry.id if isinstance(entry, Blob) else None
+
+        path += oid[split : split + 2]
+        if path not in subtrees:
+            subtree = tree[path[-2:]] if path[-2:] in tree else None
+            subtrees[path] = subtree if isinstance(subtree, Tree) else None
+        found = subtrees[path]
+        if found is None:
+            return None
+        tree = found
+
+    return None
+
+
+def _parse_note(data: bytes) -> Dict[str, str]:
+    """Parse labels by model identity from a note, each line holds a JSON object with a label and a model."""
+    labels = {}
+    for line in data.decode("utf-8", errors="replace").splitlines():
+        try:
+            record = json.loads(line)
+            labels[record["model"]] = record["label"]
+        except (ValueError, TypeError, KeyError):
+            _LOGGER.debug("Skipping malformed line in a note: %r", line)
+
+    return labels
+
+
+def _format_note(labels: Dict[str, str]) -> bytes:
+    """Format labels by model identity as a note, lines are sorted so that notes merged by cat_sort_uniq stay valid."""
+    lines = sorted(json.dumps({"label": label, "model": model}, sort_keys=True) for model, label in labels.items())
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class GitNotesCache(LabelCache):
+    """Store labels of commits as git notes in a dedicated notes ref of the repository.
+
+    Each note holds one JSON object per line with the label assigned to the commit by a model identity. Labels
+    are written in bulk, one notes commit per put_many call. Pushing and fetching the notes ref shares labels
+    between clones of the repository, concurrently written notes can be merged by the cat_sort_uniq strategy of
+    git notes merge. Lookups and stores can be delegated to a fallback cache as well.
+    """
+
+    def __init__(self, path: str, ref: str = DEFAULT_NOTES_REF, fallback: Optional[LabelCache] = None) -> None:
+        """Open notes of the given repository (or a path within it), optionally backed by another cache."""
+        self.repo = _open_repository(path)
+        self.ref = ref
+        self.fallback = fallback
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        """Close the fallback cache."""
+        if self.fallback is not None:
+            self.fallback.close()
+
+    def _notes_commit(self) -> Optional[Commit]:
+        """Get the commit the notes ref points to, None if there are no notes yet."""
+        reference = self.repo.references.get(self.ref)
+        return reference.peel(Commit) if reference is not None else None
+
+    def _read_notes(self, tree: Tree, oids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+        """Read labels by model identity for commits which have a note in the given notes tree."""
+        notes = {}
+        subtrees: Dict[str, Optional[Tree]] = {}
+        for oid in oids:
+            blob_id = _find_note(tree, oid, subtrees)
+            if blob_id is not None:
+                notes[oid] = _parse_note(self.repo[blob_id].read_raw())
+
+        return notes
+
+    def get_many(self, oids: Iterable[str], model_id: str) -> Dict[str, str]:
+        """Get labels of the given commits assigned by the given model, commits without them are omitted."""
+        oids = list(oids)
+        result: Dict[str, str] = {}
+        with self._lock:
+            notes_commit = self._notes_commit()
+            if notes_commit is not None:
+                with stage("notes_read") as read:
+                    for oid, labels in self._read_notes(notes_commit.tree, oids).items():
+                        if model_id in labels:
+                            result[oid] = labels[model_id]
+                    read.count = len(oids)
+
+        _LOGGER.debug("Labels found in git notes: %d/%d", len(result), len(oids))
+        if self.fallback is not None and len(result) < len(oids):
+            # Labels found only in the fallback cache are added to notes, so that they are shared as well.
+            found = self.fallback.get_many((oid for oid in oids if oid not in result), model_id)
+            self._write_notes(list(found.items()), model_id)
+            result.update(found)
+
+        return result
+
+    def _write_tree(self, tree: Optional[Tree], notes: Dict[str, Oid]) -> Oid:
+        """Write a notes tree with the given note blobs added, keeping the fanout of the existing tree."""
+        builder = self.repo.TreeBuilder(tree) if tree is not None else self.repo.TreeBuilder()
+        subtrees: Dict[str, Optional[Tree]] = {}
+        fanout: Dict[str, Dict[str, Oid]] = {}
+        for name, blob_id in notes.items():
+            prefix = name[:2]
+            if tree is not None and prefix not in subtrees:
+                subtree = tree[prefix] if prefix in tree else None
+                subtrees[prefix] = subtree if isinstance(subtree, Tree) else None
+
+            # Notes are added to existing fanout directories unless the tree already has the note at this level.
+            if tree is not None and subtrees.get(prefix) is not None and name not in tree:
+                fanout.setdefault(prefix, {})[name[2:]] = blob_id
+            else:
+                builder.insert(name, blob_id, GIT_FILEMODE_BLOB)
+
+        for prefix, subtree_notes in fanout.items():
+            builder.insert(prefix, self._write_tree(subtrees[prefix], subtree_notes), GIT_FILEMODE_TREE)
+
+        return builder.write()
+
+    def _signature(self) -> Signature:
+        """Get the signature of notes commits, the configured git user if there is one."""
+        try:
+            return self.repo.default_signature
+        except (KeyError, GitError):
+            return Signature(*_SIGNATURE)
+
+    def put_many(self, labels: Iterable[Tuple[str, str]], model_id: str) -> None:
+        """Store labels for the given (commit oid, label) pairs, keeping labels assigned by other models."""
+        labels = list(labels)
+        if self.fallback is not None:
+            self.fallback.put_many(labels, model_id)
+        self._write_notes(labels, model_id)
+
+    def _write_notes(self, labels: List[Tuple[str, str]], model_id: str) -> None:
+        """Write labels to notes in one notes commit."""
+        if not labels:
+            return
+
+        with self._lock, stage("notes_write") as write:
+            write.count = len(labels)
+            for attempt in range(_MAX_ATTEMPTS):
+                notes_commit = self._notes_commit()
+                tree = notes_commit.tree if notes_commit is not None else None
+                notes = self._read_notes(tree, (oid for oid, _ in labels)) if tree is not None else {}
+                blobs = {}
+                for oid, label in labels:
+                    note = notes.setdefault(oid, {})
+                    note[model_id] = label
+                    blobs[oid] = self.repo.create_blob(_format_note(note))
+
+                signature = self._signature()
+                parents: List[Oid] = [notes_commit.id] if notes_commit is not None else []
+                try:
+                    self.repo.create_commit(
+                        self.ref, signature, signature, _NOTES_MESSAGE, self._write_tree(tree, blobs), parents
+                    )
+                    break
+                except GitError:
+                    # The notes ref was updated by someone else since it was read, notes are merged again.
+                    if attempt == _MAX_ATTEMPTS - 1:
+                        raise
+                    _LOGGER.debug("Notes ref %s moved while writing notes, retrying", self.ref)
+
+        _LOGGER.debug("%d labels written to git notes in %s", len(labels), self.ref)
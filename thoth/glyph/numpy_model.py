@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Predict labels of supervised fastText models with NumPy, without the fasttext package.
+
+Weights are read from a fastText .bin file or from a compact file exported by export_model, the exported
+file is memory-mapped so that loading it is instant and its pages are shared by all the processes using it.
+Lines are tokenized the way fastText does (words, subwords and word n-grams hashed into buckets) and hidden
+vectors of a whole batch are accumulated at once. Summation follows the order fastText uses so that float32
+rounding, and thus predicted labels, are identical to the fasttext backend.
+"""
+
+import functools
+import json
+import mmap
+import os
+import re
+import struct
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+
+from .exceptions import ModelFormatException
+
+_FASTTEXT_MAGIC = 793712314
+_FASTTEXT_VERSION = 12
+_EXPORT_MAGIC = b"GLYPHNP1"
+_EXPORT_VERSION = 1
+_EXPORT_ALIGNMENT = 64
+
+# Values of fastText's loss_name and model_name enums.
+_LOSS_HS, _LOSS_NS, _LOSS_SOFTMAX, _LOSS_OVA = 1, 2, 3, 4
+_MODEL_SUPERVISED = 3
+
+_EOS = b"</s>"
+_LABEL_PREFIX = b"__label__"
+# Characters fastText splits lines on, a newline ends the line.
+_SEPARATORS = re.compile(b"[ \n\r\t\v\f\x00]+")
+_NGRAM_MULTIPLIER = 116049371
+
+# Size and range of the table fastText approximates sigmoid with.
+_SIGMOID_TABLE_SIZE = 512
+_MAX_SIGMOID = 8
+
+# Number of lines whose hidden vectors are accumulated together.
+_BATCH_SIZE = 8192
+_TOKEN_CACHE_SIZE = 1 << 16
+
+
+def _fnv1a(data: bytes) -> int:
+    """Hash bytes the way fastText does, bytes are sign-extended before they are mixed in."""
+    h = 2166136261
+    for byte in data:
+        h = ((h ^ (byte | 0xFFFFFF00 if byte & 0x80 else byte)) * 16777619) & 0xFFFFFFFF
+    return h
+
+
+class _DenseMatrix:
+    """A float32 matrix stored row by row."""
+
+    def __init__(self, data: np.ndarray) -> None:
+        """Initialize the matrix."""
+        self.data = data
+
+    def rows(self, ids: np.ndarray) -> np.ndarray:
+        """Get rows with the given indexes."""
+        rows: np.ndarray = self.data[ids]
+        return rows
+
+    def dot(self, hidden: np.ndarray) -> np.ndarray:
+        """Multiply hidden vectors by the matrix transposed, adding products in the order fastText does."""
+        result = np.zeros((hidden.shape[0], self.data.shape[0]), dtype=np.float32)
+        for j in range(self.data.shape[1]):
+            result += hidden[:, j, None] * self.data[:, j]
+        return result
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Get arrays needed to reconstruct the matrix."""
+        return {"data": self.data}
+
+
+class _QuantMatrix:
+    """A product-quantized matrix, each row is a concatenation of centroids optionally scaled by a norm."""
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        centroids: np.ndarray,
+        dsub: int,
+        norm_codes: Optional[np.ndarray] = None,
+        norm_centroids: Optional[np.ndarray] = None,
+    ) -> None:
+        """Initialize the matrix from codes of rows and centroids of the product quantizer."""
+        self.codes = codes
+        self.centroids = centroids
+        self.dsub = dsub
+        self.norm_codes = norm_codes
+        self.norm_centroids = norm_centroids
+
+        nsubq = codes.shape[1]
+        self.dim = centroids.size // 256
+        last_dsub = self.dim - (nsubq - 1) * dsub
+        widths = [dsub] * (nsubq - 1) + [last_dsub]
+        self._tables = [
+            centroids[m * 256 * dsub : m * 256 * dsub + 256 * width].reshape(256, width)
+            for m, width in enumerate(widths)
+        ]
+        self._norms = None if norm_codes is None or norm_centroids is None else norm_centroids[norm_codes]
+
+    def _decode(self, ids: np.ndarray) -> np.ndarray:
+        """Get rows with the given indexes without scaling them by their norms."""
+        codes = self.codes[ids]
+        return np.concatenate([table[codes[:, m]] for m, table in enumerate(self._tables)], axis=1)
+
+    def rows(self, ids: np.ndarray) -> np.ndarray:
+        """Get rows with the given indexes."""
+        rows = self._decode(ids)
+        if self._norms is not None:
+            rows *= self._norms[ids, None]
+        return rows
+
+    def dot(self, hidden: np.ndarray) -> np.ndarray:
+        """Multiply hidden vectors by the matrix transposed, adding products in the order fastText does."""
+        decoded = self._decode(np.arange(self.codes.shape[0]))
+        result = np.zeros((hidden.shape[0], decoded.shape[0]), dtype=np.float32)
+        for j in range(decoded.shape[1]):
+            result += hidden[:, j, None] * decoded[:, j]
+        if self._norms is not None:
+            result *= self._norms
+        return result
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Get arrays needed to reconstruct the matrix."""
+        arrays = {"codes": self.codes, "centroids": self.centroids}
+        if self.norm_codes is not None and self.norm_centroids is not None:
+            arrays.update(norm_codes=self.norm_codes, norm_centroids=self.norm_centroids)
+        return arrays
+
+
+class _Reader:
+    """Read fastText's binary serialization."""
+
+    def __init__(self, buffer: Any) -> None:
+        """Initialize the reader at the beginning of the buffer."""
+        self.buffer = buffer
+        self.offset = 0
+
+    def unpack(self, fmt: str) -> Tuple[Any, ...]:
+        """Read values of the given struct format."""
+        values = struct.unpack_from("<" + fmt, self.buffer, self.offset)
+        self.offset += struct.calcsize("<" + fmt)
+        return values
+
+    def string(self) -> bytes:
+        """Read a NUL-terminated string."""
+        end = self.buffer.find(b"\0", self.offset)
+        if end < 0:
+            raise ModelFormatException("Unexpected end of the model file")
+        value: bytes = self.buffer[self.offset : end]
+        self.offset = end + 1
+        return value
+
+    def array(self, dtype: Any, count: int) -> np.ndarray:
+        """Read an array of the given type, the array is copied out of the buffer."""
+        array: np.ndarray = np.frombuffer(self.buffer, dtype=dtype, count=count, offset=self.offset).copy()
+        self.offset += array.nbytes
+        return array
+
+    def dense_matrix(self) -> _DenseMatrix:
+        """Read a dense matrix."""
+        rows, columns = self.unpack("qq")
+        return _DenseMatrix(self.array("<f4", rows * columns).reshape(rows, columns))
+
+    def _quantizer(self) -> Tuple[np.ndarray, int]:
+        """Read a product quantizer, return its centroids and the dimension of subquantizers."""
+        dim, _, dsub, _ = self.unpack("iiii")
+        return self.array("<f4", dim * 256), dsub
+
+    def quant_matrix(self) -> _QuantMatrix:
+        """Read a product-quantized matrix."""
+        (qnorm,) = self.unpack("?")
+        rows, _, code_size = self.unpack("qqi")
+        codes = self.array(np.uint8, code_size)
+        centroids, dsub = self._quantizer()
+        codes = codes.reshape(rows, -1)
+        if not qnorm:
+            return _QuantMatrix(codes, centroids, dsub)
+
+        norm_codes = self.array(np.uint8, rows)
+        norm_centroids, _ = self._quantizer()
+        return _QuantMatrix(codes, centroids, dsub, norm_codes, norm_centroids)
+
+
+class NumpyClassifier:
+    """A supervised fastText model evaluated with NumPy."""
+
+    def __init__(
+        self,
+        args: Dict[str, int],
+        words: List[bytes],
+        input_matrix: Any,
+        output_matrix: Any,
+        pruneidx: Optional[Dict[int, int]] = None,
+    ) -> None:
+        """Initialize the classifier from model hyperparameters, its dictionary and weights.
+
+        Words are followed by labels in the dictionary, pruneidx maps buckets kept in a pruned model to rows.
+        """
+        if args["loss"] == _LOSS_HS:
+            raise ModelFormatException("Models trained with hierarchical softmax loss are not supported")
+
+        self.args = args
+        self.words = words
+        self.input = input_matrix
+        self.output = output_matrix
+        self.pruneidx = pruneidx
+
+        self.nwords = args["nwords"]
+        self.labels = [label.decode("utf-8", errors="replace") for label in words[self.nwords :]]
+        self._vocabulary = {word: wid for wid, word in enumerate(words)}
+        self._token = functools.lru_cache(maxsize=_TOKEN_CACHE_SIZE)(self._compute_token)
+        # Buckets kept in a pruned model sorted, together with their rows, for vectorized lookups.
+        pruned = sorted((pruneidx or {}).items())
+        self._pruned_buckets = (
+            np.array([bucket for bucket, _ in pruned], dtype=np.int64),
+            np.array([row for _, row in pruned], dtype=np.int64),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyClassifier":
+        """Load a fastText .bin model or a model exported by export_model."""
+        with open(path, "rb") as model_file:
+            magic = model_file.read(len(_EXPORT_MAGIC))
+
+        if magic == _EXPORT_MAGIC:
+            return cls._load_exported(path)
+
+        with open(path, "rb") as model_file, mmap.mmap(model_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            return cls._load_fasttext(_Reader(buffer))
+
+    @classmethod
+    def _load_fasttext(cls, reader: _Reader) -> "NumpyClassifier":
+        """Load a model from fastText's binary serialization."""
+        magic, version = reader.unpack("ii")
+        if magic != _FASTTEXT_MAGIC or version > _FASTTEXT_VERSION:
+            raise ModelFormatException("Not a fastText model file or unsupported version of the format")
+
+        dim, _, _, _, _, word_ngrams, loss, model, bucket, minn, maxn, _ = reader.unpack("12i")
+        reader.unpack("d")
+        if model != _MODEL_SUPERVISED:
+            raise ModelFormatException("Only supervised fastText models can be used for classification")
+        if version == 11:
+            maxn = 0
+
+        size, nwords, _, _, pruneidx_size = reader.unpack("iiiqq")
+        words = []
+        for _ in range(size):
+            words.append(reader.string())
+            reader.unpack("qb")
+        pruneidx = None
+        if pruneidx_size >= 0:
+            pairs = reader.unpack(f"{2 * pruneidx_size}i")
+            pruneidx = dict(zip(pairs[::2], pairs[1::2]))
+
+        (quant_input,) = reader.unpack("?")
+        input_matrix = reader.quant_matrix() if quant_input else reader.dense_matrix()
+        (quant_output,) = reader.unpack("?")
+        output_matrix = reader.quant_matrix() if quant_input and quant_output else reader.dense_matrix()
+
+        args = {
+            "dim": dim,
+            "word_ngrams": word_ngrams,
+            "loss": loss,
+            "bucket": bucket,
+            "minn": minn,
+            "maxn": maxn,
+            "nwords": nwords,
+        }
+        return cls(args, words, input_matrix, output_matrix, pruneidx)
+
+    @classmethod
+    def _load_exported(cls, path: str) -> "NumpyClassifier":
+        """Load a model exported by export_model, arrays are memory-mapped."""
+        with open(path, "rb") as model_file:
+            model_file.seek(len(_EXPORT_MAGIC))
+            (header_size,) = struct.unpack("<Q", model_file.read(8))
+            header = json.loads(model_file.read(header_size))
+
+        if header.get("version") != _EXPORT_VERSION:
+            raise ModelFormatException(f"Unsupported version of the exported model: {header.get('version')}")
+
+        arrays = {
+            name: np.memmap(path, dtype=spec["dtype"], mode="r", offset=spec["offset"], shape=tuple(spec["shape"]))
+            for name, spec in header["arrays"].items()
+        }
+
+        def matrix(prefix: str) -> Any:
+            if f"{prefix}.data" in arrays:
+                return _DenseMatrix(arrays[f"{prefix}.data"])
+            return _QuantMatrix(
+                arrays[f"{prefix}.codes"],
+                arrays[f"{prefix}.centroids"],
+                header[f"{prefix}.dsub"],
+                arrays.get(f"{prefix}.norm_codes"),
+                arrays.get(f"{prefix}.norm_centroids"),
+            )
+
+        words = bytes(arrays["words"]).split(b"\0")
+        pruneidx = None
+        if "pruneidx" in arrays:
+            pruneidx = dict(arrays["pruneidx"].tolist())
+
+        return cls(header["args"], words, matrix("input"), matrix("output"), pruneidx)
+
+    def export(self, path: str) -> None:
+        """Write the model to a file which can be memory-mapped, it keeps only what is needed for predictions."""
+        arrays: Dict[str, np.ndarray] = {"words": np.frombuffer(b"\0".join(self.words), dtype=np.uint8)}
+        header: Dict[str, Any] = {"version": _EXPORT_VERSION, "args": self.args}
+        if self.pruneidx is not None:
+            arrays["pruneidx"] = np.array(sorted(self.pruneidx.items()), dtype="<i4").reshape(-1, 2)
+        for prefix, matrix in (("input", self.input), ("output", self.output)):
+            if isinstance(matrix, _QuantMatrix):
+                header[f"{prefix}.dsub"] = matrix.dsub
+            for name, array in matrix.arrays().items():
+                arrays[f"{prefix}.{name}"] = array
+
+        # Offsets depend on the header size, fix the header size by padding it to the alignment.
+        specs = {}
+        offset = 0
+        for name, array in arrays.items():
+            specs[name] = {"dtype": array.dtype.newbyteorder("<").str, "shape": list(array.shape), "offset": offset}
+            offset += -(-array.nbytes // _EXPORT_ALIGNMENT) * _EXPORT_ALIGNMENT
+        header["arrays"] = specs
+        prefix_size = len(_EXPORT_MAGIC) + 8
+        header_size = -(-(prefix_size + len(json.dumps(header)) + 256) // _EXPORT_ALIGNMENT) * _EXPORT_ALIGNMENT
+        for spec in specs.values():
+            spec["offset"] += header_size
+        encoded = json.dumps(header).encode("utf-8").ljust(header_size - prefix_size)
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as export_file:
+            export_file.write(_EXPORT_MAGIC)
+            export_file.write(struct.pack("<Q", len(encoded)))
+            export_file.write(encoded)
+            for name, array in arrays.items():
+                export_file.seek(specs[name]["offset"])
+                export_file.write(np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<")).tobytes())
+        os.replace(tmp_path, path)
+
+    def _push_hash(self, ids: List[int], bucket_id: int) -> None:
+        """Add the row of the given bucket, buckets dropped from pruned models are skipped."""
+        if self.pruneidx is not None:
+            bucket_id = self.pruneidx.get(bucket_id, -1)
+            if bucket_id < 0:
+                return
+        ids.append(self.nwords + bucket_id)
+
+    def _subwords(self, word: bytes) -> List[int]:
+        """Get rows of character n-grams of the word, n-grams are made of UTF-8 characters."""
+        minn, maxn, bucket = self.args["minn"], self.args["maxn"], self.args["bucket"]
+        ids: List[int] = []
+        for i in range(len(word)):
+            if word[i] & 0xC0 == 0x80:
+                continue
+            j, n = i, 1
+            while j < len(word) and n <= maxn:
+                j += 1
+                while j < len(word) and word[j] & 0xC0 == 0x80:
+                    j += 1
+                if n >= minn and not (n == 1 and (i == 0 or j == len(word))):
+                    self._push_hash(ids, _fnv1a(word[i:j]) % bucket)
+                n += 1
+        return ids
+
+    def _compute_token(self, token: bytes) -> Optional[Tuple[Tuple[int, ...], int]]:
+        """Get rows representing the token and its hash as a signed 32-bit number, None for labels."""
+        wid = self._vocabulary.get(token, -1)
+        if wid >= self.nwords or (wid < 0 and token.startswith(_LABEL_PREFIX)):
+            return None
+
+        if wid < 0:
+            ids = [] if token == _EOS else self._subwords(b"<" + token + b">")
+        elif self.args["maxn"] <= 0 or token == _EOS:
+            ids = [wid]
+        else:
+            ids = [wid] + self._subwords(b"<" + token + b">")
+
+        h = _fnv1a(token)
+        return tuple(ids), h - (1 << 32) if h & 0x80000000 else h
+
+    def _words(self, line: str, rows: List[int], hashes: List[int]) -> Tuple[int, int]:
+        """Add rows of words of the line and their hashes, return the number of rows and hashes added."""
+        if "\n" in line:
+            raise ValueError("predict processes one line at a time (remove '\\n')")
+
+        row_count, hash_count = len(rows), len(hashes)
+        # fastText reads the line terminated by a newline, the newline is represented by the EOS token.
+        for token in _SEPARATORS.split(line.encode("utf-8")) + [_EOS]:
+            if not token:
+                continue
+            entry = self._token(token)
+            if entry is not None:
+                rows.extend(entry[0])
+                hashes.append(entry[1])
+            if token == _EOS:
+                break
+
+        return len(rows) - row_count, len(hashes) - hash_count
+
+    def _word_ngrams(self, hashes: np.ndarray, hash_counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Get rows of word n-grams of all the lines at once, return them in the line order with their line indexes.
+
+        Hashes of n-grams starting at the same word are computed for all the words together, extended by one
+        word in each round.
+        """
+        lines = np.repeat(np.arange(len(hash_counts)), hash_counts)
+        ends = np.repeat(np.cumsum(hash_counts), hash_counts)
+        # Signed 32-bit hashes are sign-extended to 64 bits, arithmetic wraps around like in fastText.
+        words = hashes.astype(np.int64).view(np.uint64)
+        starts = np.arange(len(words))
+        current = words
+        bucket, multiplier = np.uint64(self.args["bucket"] or 1), np.uint64(_NGRAM_MULTIPLIER)
+
+        found_starts, found_sizes, found_rows = [], [], []
+        for size in range(1, self.args["word_ngrams"]):
+            extended = starts + size < ends[starts]
+            starts, current = starts[extended], current[extended]
+            current = current * multiplier + words[starts + size]
+            found_starts.append(starts)
+            found_sizes.append(np.full(len(starts), size))
+            found_rows.append((current % bucket).astype(np.int64))
+
+        if not found_rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        # fastText adds n-grams ordered by their first word and then by their size.
+        ngram_starts, ngram_rows = np.concatenate(found_starts), np.concatenate(found_rows)
+        order = np.lexsort((np.concatenate(found_sizes), ngram_starts))
+        ngram_rows, ngram_lines = ngram_rows[order], lines[ngram_starts[order]]
+        if self.pruneidx is not None:
+            keys, values = self._pruned_buckets
+            index = np.minimum(np.searchsorted(keys, ngram_rows), max(len(keys) - 1, 0))
+            kept = keys[index] == ngram_rows if len(keys) else np.zeros(len(ngram_rows), dtype=bool)
+            ngram_rows, ngram_lines = values[index[kept]], ngram_lines[kept]
+
+        return ngram_rows + self.nwords, ngram_lines
+
+    def _rows(self, lines: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Get rows of the input matrix representing the lines, in the order fastText adds them up.
+
+        Rows of all the lines are returned in one array, together with the offset and the number of rows of
+        each line.
+        """
+        rows: List[int] = []
+        hashes: List[int] = []
+        counts = np.array([self._words(line, rows, hashes) for line in lines], dtype=np.int64).reshape(-1, 2)
+        ngram_rows, ngram_lines = self._word_ngrams(np.array(hashes, dtype=np.int32), counts[:, 1])
+
+        # Rows of each line are made of rows of its words followed by rows of its word n-grams.
+        line_indexes = np.arange(len(lines))
+        keys = np.concatenate((np.repeat(line_indexes * 2, counts[:, 0]), ngram_lines * 2 + 1))
+        flat = np.concatenate((np.array(rows, dtype=np.int64), ngram_rows))[np.argsort(keys, kind="stable")]
+        lengths = counts[:, 0] + np.bincount(ngram_lines, minlength=len(lines))
+        starts = np.zeros(len(lines), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=starts[1:])
+        return flat, starts, lengths
+
+    def _hidden(self, flat: np.ndarray, starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        """Average input rows of lines sorted by their length in the descending order.
+
+        Rows at the same position of all the lines are added at once, which keeps the order in which fastText
+        adds rows of a single line.
+        """
+        # Number of lines having a row at the given position.
+        active = np.searchsorted(-lengths, -np.arange(int(lengths[0]) if len(lengths) else 0), side="left")
+
+        hidden = np.zeros((len(lengths), self.args["dim"]), dtype=np.float32)
+        for position, count in enumerate(active.tolist()):
+            hidden[:count] += self.input.rows(flat[starts[:count] + position])
+
+        scale = np.zeros(len(lengths), dtype=np.float32)
+        np.divide(1.0, lengths, out=scale, where=lengths > 0, casting="unsafe")
+        hidden *= scale[:, None]
+        return hidden
+
+    def _scores(self, hidden: np.ndarray) -> np.ndarray:
+        """Get log-probabilities of labels the way fastText computes them for predictions."""
+        output = self.output.dot(hidden)
+        if self.args["loss"] == _LOSS_SOFTMAX:
+            output = np.exp((output - output.max(axis=1, keepdims=True)).astype(np.float64)).astype(np.float32)
+            total = np.zeros(len(output), dtype=np.float32)
+            for column in output.T:
+                total += column
+            output /= total[:, None]
+        else:
+            table = np.arange(_SIGMOID_TABLE_SIZE + 1, dtype=np.float32) * np.float32(2 * _MAX_SIGMOID)
+            table = table / np.float32(_SIGMOID_TABLE_SIZE) - np.float32(_MAX_SIGMOID)
+            table = (1.0 / (1.0 + np.exp(-table.astype(np.float64)))).astype(np.float32)
+            index = (output + np.float32(_MAX_SIGMOID)) * np.float32(_SIGMOID_TABLE_SIZE)
+            index = index / np.float32(_MAX_SIGMOID) / np.float32(2)
+            index = np.clip(index, 0, _SIGMOID_TABLE_SIZE).astype(np.int64)
+            output = np.where(output < -_MAX_SIGMOID, 0.0, np.where(output > _MAX_SIGMOID, 1.0, table[index]))
+
+        scores: np.ndarray = np.log(output.astype(np.float64) + 1e-5).astype(np.float32)
+        return scores
+
+    def predict_indexes(self, lines: List[str]) -> List[int]:
+        """Predict the most probable label of each line, return indexes of labels."""
+        flat, starts, lengths = self._rows(lines)
+        order = np.argsort(-lengths, kind="stable")
+        predicted = np.zeros(len(lines), dtype=np.int64)
+        for start in range(0, len(order), _BATCH_SIZE):
+            batch = order[start : start + _BATCH_SIZE]
+            scores = self._scores(self._hidden(flat, starts[batch], lengths[batch]))
+            # fastText keeps the last of equally scored labels.
+            predicted[batch] = scores.shape[1] - 1 - np.argmax(scores[:, ::-1], axis=1)
+
+        indexes: List[int] = predicted.tolist()
+        return indexes
+
+    def predict(self, lines: List[str]) -> List[str]:
+        """Predict the most probable label of each line."""
+        return [self.labels[index] for index in self.predict_indexes(lines)]
+
+
+def export_model(model_path: str, output_path: str) -> None:
+    """Export a fastText model to a compact file which is memory-mapped by the NumPy backend."""
+    NumpyClassifier.load(model_path).export(output_path)
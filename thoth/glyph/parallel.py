@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Shard batch predictions across a pool of worker processes."""
+
+import atexit
+import logging
+import multiprocessing
+import multiprocessing.pool
+import os
+import threading
+from typing import Callable
+from typing import List
+from typing import Optional
+
+_LOGGER = logging.getLogger(__name__)
+
+# Do not use worker processes for less than this number of messages per worker, it is not worth it.
+MIN_SHARD_SIZE = 1000
+
+# Workers are started by the fork server (or spawned where it is not available) instead of being forked from
+# this process, a forked child would inherit locks held by other threads (e.g. locks of the model registry, of
+# logging handlers or of the cache) and could deadlock on them.
+_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_POOL_LOCK = threading.Lock()
+_POOL: Optional[multiprocessing.pool.Pool] = None
+_POOL_SIZE = 0
+
+
+def resolve_workers(workers: Optional[int]) -> int:
+    """Get the number of worker processes to use, 0 or None stands for all available CPUs."""
+    if not workers:
+        return os.cpu_count() or 1
+
+    if workers < 0:
+        raise ValueError(f"Number of workers has to be a non-negative number, got {workers}")
+
+    return workers
+
+
+def _get_pool(workers: int) -> multiprocessing.pool.Pool:
+    """Get the process-wide pool with at least the given number of worker processes, start it if needed."""
+    global _POOL, _POOL_SIZE
+
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_SIZE < workers:
+            if _POOL is not None:
+                # Work already submitted to the smaller pool is finished before its workers exit.
+                _POOL.close()
+            _LOGGER.debug("Starting %d worker processes", workers)
+            _POOL = multiprocessing.get_context(_START_METHOD).Pool(workers)
+            _POOL_SIZE = workers
+        return _POOL
+
+
+def start_workers(workers: int) -> None:
+    """Start the pool of worker processes reused by all sharded predictions of this process.
+
+    Entry points call this before they start any threads of their own so that the pool is ready once
+    predictions are made, the pool is otherwise started by the first prediction needing it.
+    """
+    if workers > 1:
+        _get_pool(workers)
+
+
+@atexit.register
+def stop_workers() -> None:
+    """Stop worker processes of the pool, a new pool is started by the next sharded prediction."""
+    global _POOL, _POOL_SIZE
+
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.terminate()
+            _POOL.join()
+        _POOL, _POOL_SIZE = None, 0
+
+
+def map_shards(
+    func: Callable[[List[str]], List[str]], items: List[str], workers: int, min_shard_size: int = MIN_SHARD_SIZE
+) -> List[str]:
+    """Apply func on contiguous shards of items in worker processes and merge the results in the original order.
+
+    The func is sent to workers of the process-wide pool, it has to be picklable (e.g. a module level function
+    or a functools.partial of one). Workers keep what func loads (e.g. models of the model registry) for later
+    shards. If there are not enough items, func is called in the current process.
+    """
+    workers = min(workers, len(items) // min_shard_size)
+    if workers <= 1:
+        return func(items)
+
+    shard_size = -(-len(items) // workers)
+    shards = [items[start : start + shard_size] for start in range(0, len(items), shard_size)]
+    _LOGGER.debug("Processing %d items in %d worker processes", len(items), len(shards))
+    results = _get_pool(workers).map(func, shards, chunksize=1)
+    return [result for shard in results for result in shard]
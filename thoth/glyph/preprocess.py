@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Trim commit messages before they are passed to a model, dropping parts of bodies which carry no intent."""
+
+import hashlib
+import logging
+import re
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+from .instrumentation import stage
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_TOKENS = 64
+
+# Trailers attributing or tracking the change (Signed-off-by, Co-authored-by, Change-Id, ...), Fixes or Closes
+# trailers are kept as they tell what the change is about.
+TRAILER_PATTERN = r"^[ \t]*(?:[a-z][\w-]*-by|change-id|cc|git-svn-id)[ \t]*:.*$"
+# Diffs pasted into messages, from a diff header over all the following diff lines.
+DIFF_PATTERN = r"^(?:diff --git |--- a/|\+\+\+ b/|@@ -\d).*(?:\n(?:[-+ @\\]|diff |index ).*)*$"
+# Quoted replies of mailing list patches.
+QUOTE_PATTERN = r"^[ \t]*>.*$"
+# Pasted logs: fenced blocks, Python tracebacks, Java stack frames and lines starting with a timestamp.
+LOG_PATTERN = "|".join(
+    (
+        r"^```[^\n]*\n(?:.*\n)*?[ \t]*```[ \t]*$",
+        r"^traceback \(most recent call last\):.*(?:\n[ \t]+.*)*(?:\n[\w.]+(?::.*)?)?$",
+        r"^[ \t]+at [\w$.<>]+\(.*\)[ \t]*$|^[ \t]*caused by: [\w.$]+.*$",
+        r"^[ \t]*\[?(?:\d{4}-\d\d-\d\d[ t]\d\d:\d\d|\s*\d+\.\d+\]).*$",
+    )
+)
+
+
+class MessagePreprocessor:
+    """Trim commit messages using compiled patterns and cap their number of tokens.
+
+    Patterns are applied to the body, the subject line is always kept. Words of the result are joined by single
+    spaces, so that the result is free of newlines.
+    """
+
+    def __init__(
+        self,
+        strip_trailers: bool = True,
+        strip_diffs: bool = True,
+        strip_quotes: bool = True,
+        strip_logs: bool = True,
+        max_tokens: Optional[int] = DEFAULT_MAX_TOKENS,
+        subject_only: bool = False,
+        patterns: Sequence[str] = (),
+    ) -> None:
+        """Initialize the preprocessor, patterns are additional regular expressions removed from bodies."""
+        if max_tokens is not None and max_tokens < 1:
+            raise ValueError(f"Token budget has to be a positive number, got {max_tokens}")
+
+        self.max_tokens = max_tokens
+        self.subject_only = subject_only
+        selected = [
+            pattern
+            for pattern, enabled in (
+                (TRAILER_PATTERN, strip_trailers),
+                (DIFF_PATTERN, strip_diffs),
+                (QUOTE_PATTERN, strip_quotes),
+                (LOG_PATTERN, strip_logs),
+            )
+            if enabled
+        ]
+        selected.extend(patterns)
+        self._pattern = (
+            re.compile("|".join(f"(?:{pattern})" for pattern in selected), re.IGNORECASE | re.MULTILINE)
+            if selected
+            else None
+        )
+        digest = hashlib.sha256("\0".join(selected).encode()).hexdigest()[:16]
+        self.identity = f"preprocess:{digest}:{max_tokens or 0}:{int(subject_only)}"
+
+    def __call__(self, message: str) -> str:
+        """Trim the given message."""
+        subject, _, body = message.strip().partition("\n")
+        if self.subject_only:
+            body = ""
+        elif body and self._pattern is not None:
+            body = self._pattern.sub("", body)
+
+        if self.max_tokens is None:
+            return " ".join(subject.split() + body.split())
+
+        tokens = subject.split(maxsplit=self.max_tokens)[: self.max_tokens]
+        left = self.max_tokens - len(tokens)
+        if body and left > 0:
+            tokens.extend(body.split(maxsplit=left)[:left])
+        return " ".join(tokens)
+
+
+_PREPROCESSOR: Optional[MessagePreprocessor] = None
+
+
+def set_preprocessor(preprocessor: Optional[MessagePreprocessor]) -> None:
+    """Install the process-wide preprocessor, None disables preprocessing."""
+    global _PREPROCESSOR
+    _PREPROCESSOR = preprocessor
+
+
+def get_preprocessor() -> Optional[MessagePreprocessor]:
+    """Get the process-wide preprocessor, None if preprocessing is disabled."""
+    return _PREPROCESSOR
+
+
+def prepare_message(message: str) -> str:
+    """Prepare a message to be passed to a model, only newlines are removed if preprocessing is disabled."""
+    if _PREPROCESSOR is None:
+        return message.replace("\n", "")
+
+    return _PREPROCESSOR(message)
+
+
+def prepare_messages(messages: Iterable[str]) -> List[str]:
+    """Prepare messages to be passed to a model."""
+    with stage("preprocess") as preprocess:
+        prepared = [prepare_message(str(message)) for message in messages]
+        preprocess.measure(prepared)
+
+    return prepared
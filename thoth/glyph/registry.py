@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""A process-wide registry of loaded classification models."""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from .constants import MLModel
+from .exceptions import ModelNotFoundException
+from .instrumentation import stage
+
+_LOGGER = logging.getLogger(__name__)
+
+_ModelKey = Tuple[MLModel, str]
+
+
+class _LoadedModel:
+    """A model instance kept in the registry together with its bookkeeping."""
+
+    __slots__ = ("instance", "size", "load_time", "hits")
+
+    def __init__(self, instance: Any, size: int, load_time: float) -> None:
+        """Initialize the entry."""
+        self.instance = instance
+        self.size = size
+        self.load_time = load_time
+        self.hits = 0
+
+
+class ModelRegistry:
+    """Keep loaded models in memory so they are shared by all classifications in the process.
+
+    Models are keyed by the model type and the path they were loaded from. They are loaded lazily
+    on first use (or explicitly via warm_up) and stay resident until unloaded. If max_memory is set, the least
+    recently used models are evicted once loaded models exceed it, sizes of models are approximated by sizes
+    of their files.
+    """
+
+    def __init__(self, max_memory: Optional[int] = None) -> None:
+        """Initialize an empty registry, max_memory is the number of bytes loaded models can take."""
+        self._lock = threading.Lock()
+        self._loaders: Dict[MLModel, Tuple[Callable[[str], Any], str]] = {}
+        # Ordered from the least recently used model.
+        self._models: "OrderedDict[_ModelKey, _LoadedModel]" = OrderedDict()
+        self._max_memory = max_memory
+        self._key_locks: Dict[_ModelKey, threading.Lock] = {}
+        self._identities: Dict[Tuple[MLModel, str, int, int], str] = {}
+
+    def register(self, model: MLModel, loader: Callable[[str], Any], default_path: str) -> None:
+        """Register a loader and the default model path for the given model type."""
+        with self._lock:
+            self._loaders[model] = (loader, default_path)
+
+    def resolve_path(self, model: MLModel, model_path: Optional[str] = None) -> str:
+        """Get the path from which the given model is loaded."""
+        if model_path is not None:
+            return os.path.abspath(model_path)
+
+        try:
+            return self._loaders[model][1]
+        except KeyError as exc:
+            raise ModelNotFoundException(f"Unknown model: {model}") from exc
+
+    def get(self, model: MLModel, model_path: Optional[str] = None) -> Any:
+        """Get a loaded model, load it if it is not present in the registry yet."""
+        key = (model, self.resolve_path(model, model_path))
+
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                entry.hits += 1
+                return entry.instance
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # Load outside of the registry-wide lock so that loading one model does not block others.
+        with key_lock:
+            with self._lock:
+                entry = self._models.get(key)
+                if entry is not None:
+                    self._models.move_to_end(key)
+                    entry.hits += 1
+                    return entry.instance
+
+            entry = self._load(key)
+
+            with self._lock:
+                self._models[key] = entry
+                self._evict()
+                entry.hits += 1
+                return entry.instance
+
+    def _evict(self) -> None:
+        """Evict the least recently used models until loaded models fit max_memory, the lock has to be held.
+
+        The most recently used model is kept even if it does not fit on its own.
+        """
+        if self._max_memory is None:
+            return
+
+        memory = sum(entry.size for entry in self._models.values())
+        while memory > self._max_memory and len(self._models) > 1:
+            (model, model_path), entry = self._models.popitem(last=False)
+            memory -= entry.size
+            _LOGGER.info("Model %s loaded from %r evicted to fit the memory budget", model.name, model_path)
+
+    def set_max_memory(self, max_memory: Optional[int]) -> None:
+        """Set the number of bytes loaded models can take, evict models exceeding it, None for no limit."""
+        with self._lock:
+            self._max_memory = max_memory
+            self._evict()
+
+    def _load(self, key: _ModelKey) -> _LoadedModel:
+        """Load the model identified by the given key."""
+        model, model_path = key
+        try:
+            loader = self._loaders[model][0]
+        except KeyError as exc:
+            raise ModelNotFoundException(f"Unknown model: {model}") from exc
+
+        if not os.path.isfile(model_path):
+            raise ModelNotFoundException(f"Model file {model_path!r} not found")
+
+        _LOGGER.info("Model Path : %s", model_path)
+        start = time.monotonic()
+        with stage("load_model") as load:
+            instance = loader(model_path)
+            load.count, load.bytes = 1, os.path.getsize(model_path)
+        load_time = time.monotonic() - start
+        _LOGGER.debug("Model %s loaded in %.3f seconds", model.name, load_time)
+        return _LoadedModel(instance, os.path.getsize(model_path), load_time)
+
+    def identity(self, model: MLModel, model_path: Optional[str] = None) -> str:
+        """Get a string identifying the model content, suitable for keying persisted classifications."""
+        model_path = self.resolve_path(model, model_path)
+        try:
+            stat = os.stat(model_path)
+        except FileNotFoundError as exc:
+            raise ModelNotFoundException(f"Model file {model_path!r} not found") from exc
+
+        key = (model, model_path, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            identity = self._identities.get(key)
+
+        if identity is None:
+            digest = hashlib.sha256()
+            with open(model_path, "rb") as model_file:
+                for block in iter(lambda: model_file.read(1 << 20), b""):
+                    digest.update(block)
+            identity = f"{model.name.lower()}:{digest.hexdigest()[:16]}"
+            with self._lock:
+                self._identities[key] = identity
+
+        return identity
+
+    def warm_up(self, model: Optional[MLModel] = None, model_path: Optional[str] = None) -> None:
+        """Load the given model eagerly so that the first classification does not pay the load time."""
+        self.get(model or MLModel.DEFAULT, model_path)
+
+    def unload(self, model: Optional[MLModel] = None, model_path: Optional[str] = None) -> int:
+        """Drop loaded models from the registry, return the number of models unloaded.
+
+        If no model is given, all the models are unloaded. If no path is given, all the instances of the
+        given model type are unloaded.
+        """
+        with self._lock:
+            if model is None:
+                keys = list(self._models)
+            elif model_path is None:
+                keys = [key for key in self._models if key[0] == model]
+            else:
+                keys = [(model, self.resolve_path(model, model_path))]
+
+            unloaded = 0
+            for key in keys:
+                if self._models.pop(key, None) is not None:
+                    unloaded += 1
+
+        return unloaded
+
+    def is_loaded(self, model: MLModel, model_path: Optional[str] = None) -> bool:
+        """Check if the given model is already loaded."""
+        key = (model, self.resolve_path(model, model_path))
+        with self._lock:
+            return key in self._models
+
+    def memory_usage(self) -> int:
+        """Get the approximate number of bytes held by the loaded models."""
+        with self._lock:
+            return sum(entry.size for entry in self._models.values())
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Get statistics about the loaded models."""
+        with self._lock:
+            return [
+                {
+                    "model": model.name.lower(),
+                    "path": model_path,
+                    "size": entry.size,
+                    "load_time": entry.load_time,
+                    "hits": entry.hits,
+                }
+                for (model, model_path), entry in self._models.items()
+            ]
+
+
+_REGISTRY = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get the process-wide model registry."""
+    return _REGISTRY
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""A compact, pandas-free representation of classification results."""
+
+import csv
+from array import array
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+# Labels predicted by the bundled model, their position is the code stored in results.
+LABELS = ("features", "corrective", "perfective", "nonfunctional", "unknown")
+
+
+class ClassificationResult:
+    """Classified messages kept as parallel arrays of messages and interned label codes.
+
+    Labels are stored as one byte codes pointing to the labels tuple instead of one string object per
+    message. The result can be converted to a pandas.DataFrame with the same columns classify_messages
+    returns (message, labels_predicted) if pandas is installed.
+    """
+
+    __slots__ = ("messages", "codes", "labels")
+
+    def __init__(
+        self,
+        messages: Optional[List[str]] = None,
+        codes: Optional["array[int]"] = None,
+        labels: Tuple[str, ...] = LABELS,
+    ) -> None:
+        """Initialize the result from messages and codes of labels assigned to them."""
+        self.messages = messages if messages is not None else []
+        self.codes = codes if codes is not None else array("B")
+        self.labels = labels
+
+        if len(self.messages) != len(self.codes):
+            raise ValueError(f"Got {len(self.messages)} messages but {len(self.codes)} labels")
+
+    @classmethod
+    def from_labels(cls, messages: List[str], labels: Iterable[str]) -> "ClassificationResult":
+        """Create the result out of messages and their labels."""
+        known = list(LABELS)
+        index = {label: code for code, label in enumerate(known)}
+        codes = array("B")
+        for label in labels:
+            code = index.get(label)
+            if code is None:
+                code = index[label] = len(known)
+                known.append(label)
+            codes.append(code)
+
+        return cls(messages, codes, tuple(known))
+
+    @property
+    def empty(self) -> bool:
+        """Check if there are no classified messages."""
+        return not self.messages
+
+    @property
+    def labels_predicted(self) -> List[str]:
+        """Get the predicted label for each message."""
+        labels = self.labels
+        return [labels[code] for code in self.codes]
+
+    def __len__(self) -> int:
+        """Get the number of classified messages."""
+        return len(self.messages)
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        """Iterate over (message, label) pairs."""
+        labels = self.labels
+        for message, code in zip(self.messages, self.codes):
+            yield message, labels[code]
+
+    def counts(self) -> Dict[str, int]:
+        """Get the number of messages per label."""
+        counts = [0] * len(self.labels)
+        for code in self.codes:
+            counts[code] += 1
+        return {label: count for label, count in zip(self.labels, counts) if count}
+
+    def to_frame(self) -> Any:
+        """Convert the result to a pandas.DataFrame."""
+        try:
+            import pandas as pd
+        except ImportError as exc:
+            raise ImportError(
+                "pandas is required to produce DataFrames, install thoth-glyph[pandas] or use as_frame=False"
+            ) from exc
+
+        if self.empty:
+            return pd.DataFrame()
+
+        df = pd.DataFrame(self.messages, columns=["message"])
+        df["labels_predicted"] = pd.Categorical.from_codes(self.codes, self.labels).astype(str)
+        return df
+
+    def to_csv(self, path: str, sep: str = ",") -> None:
+        """Write the result to a CSV file laid out the same way pandas.DataFrame.to_csv does."""
+        with open(path, "w", newline="") as output_file:
+            writer = csv.writer(output_file, delimiter=sep, lineterminator="\n")
+            if self.empty:
+                writer.writerow([""])
+                return
+
+            writer.writerow(["", "message", "labels_predicted"])
+            writer.writerows((i, message, label) for i, (message, label) in enumerate(self))
+
+    def __str__(self) -> str:
+        """Format the result as a table, messages are not truncated."""
+        if self.empty:
+            return "Empty ClassificationResult"
+
+        index_width = len(str(len(self) - 1))
+        label_width = max(len("labels_predicted"), *(len(label) for label in self.labels))
+        lines = [f"{'':>{index_width}}  {'labels_predicted':<{label_width}}  message"]
+        lines.extend(
+            f"{i:>{index_width}}  {label:<{label_width}}  {message}" for i, (message, label) in enumerate(self)
+        )
+        return "\n".join(lines)
+
+    def __repr__(self) -> str:
+        """Get a short representation of the result."""
+        return f"<ClassificationResult of {len(self)} messages>"
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Rules putting messages containing known phrases under a fixed changelog heading."""
+
+import json
+import re
+from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+
+class PhraseRules:
+    """Map phrases to changelog headings, messages are matched against all the phrases in a single pass.
+
+    Phrases are matched case-insensitively anywhere in the message. All of them are compiled into one
+    regular expression, a message containing multiple phrases is put only under the heading of the phrase
+    found first in it.
+    """
+
+    def __init__(self, rules: Mapping[str, Union[str, Sequence[str]]]) -> None:
+        """Compile the given rules mapping headings to phrases."""
+        self.rules: Dict[str, List[str]] = {}
+        self._headings: Dict[str, str] = {}
+
+        for heading, phrases in rules.items():
+            if isinstance(phrases, str):
+                phrases = [phrases]
+
+            self.rules[heading] = list(phrases)
+            for phrase in phrases:
+                if not phrase:
+                    raise ValueError(f"Empty phrase configured for heading {heading!r}")
+                self._headings.setdefault(phrase.lower(), heading)
+
+        # Prefer longer phrases when several of them match at the same position. Each phrase is a group of its own,
+        # the heading is looked up by the index of the group matched as matched text does not always lowercase to
+        # the phrase (e.g. for U+0130 matched case-insensitively).
+        alternatives = sorted(self._headings, key=len, reverse=True)
+        self._group_headings = [self._headings[phrase] for phrase in alternatives]
+        self._pattern = (
+            re.compile("|".join(f"({re.escape(phrase)})" for phrase in alternatives), re.IGNORECASE)
+            if alternatives
+            else None
+        )
+
+    @classmethod
+    def from_file(cls, path: str) -> "PhraseRules":
+        """Load rules from a JSON file with an object mapping headings to a phrase or a list of phrases."""
+        with open(path) as rules_file:
+            rules = json.load(rules_file)
+
+        if not isinstance(rules, dict) or not all(isinstance(phrases, (str, list)) for phrases in rules.values()):
+            raise ValueError(f"Rules in {path!r} have to be an object mapping headings to lists of phrases")
+
+        return cls(rules)
+
+    def match(self, message: str) -> Optional[str]:
+        """Get the heading for the given message, None if it contains none of the phrases."""
+        if self._pattern is None:
+            return None
+
+        found = self._pattern.search(message)
+        return self._group_headings[found.lastindex - 1] if found and found.lastindex else None
+
+    def split(self, messages: List[str]) -> Tuple[Dict[str, List[str]], List[str]]:
+        """Split messages into the ones matched by the rules grouped by heading and the rest, keeping their order."""
+        matched: Dict[str, List[str]] = {heading: [] for heading in self.rules}
+        rest = []
+        for message in messages:
+            heading = self.match(message)
+            if heading is None:
+                rest.append(message)
+            else:
+                matched[heading].append(message)
+
+        return {heading: group for heading, group in matched.items() if group}, rest
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""A long-running HTTP server keeping the model resident and batching concurrent requests."""
+
+import json
+import logging
+import os
+import socketserver
+import stat
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Union
+
+from .batching import DEFAULT_MAX_BATCH_SIZE
+from .batching import DEFAULT_MAX_LATENCY
+from .batching import DEFAULT_MAX_QUEUE_SIZE
+from .batching import MicroBatcher
+from .dedup import DEFAULT_MEMO_SIZE
+from .dedup import LabelMemo
+from .dedup import get_label_memo
+from .dedup import set_label_memo
+from .constants import Format
+from .constants import MLModel
+from .exceptions import NoMessageEnteredException
+from .exceptions import QueueFullException
+from .exceptions import ThothGlyphException
+from .instrumentation import Instrumentation
+from .instrumentation import get_instrumentation
+from .instrumentation import set_instrumentation
+from .instrumentation import stage
+from .preprocess import prepare_message
+from .preprocess import prepare_messages
+from .registry import get_model_registry
+from .rules import PhraseRules
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_REQUEST_TIMEOUT = 30.0
+
+
+# Concurrent clients are expected, do not refuse connections when many of them connect at once.
+_LISTEN_BACKLOG = 1024
+
+
+class _TCPHTTPServer(ThreadingHTTPServer):
+    """An HTTP server listening on a TCP port."""
+
+    request_queue_size = _LISTEN_BACKLOG
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """An HTTP server listening on a Unix domain socket."""
+
+    daemon_threads = True
+    request_queue_size = _LISTEN_BACKLOG
+
+
+class _GlyphRequestHandler(BaseHTTPRequestHandler):
+    """Handle classification requests."""
+
+    server_version = "thoth-glyph"
+    batcher: MicroBatcher
+    rules: Optional[PhraseRules]
+    request_timeout: float
+
+    def address_string(self) -> str:
+        """Get the client address, clients connected over a Unix socket have none."""
+        return str(self.client_address[0]) if self.client_address else "unix"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Log requests using the module logger instead of stderr."""
+        _LOGGER.debug("%s - " + format, self.address_string(), *args)
+
+    def _send_text(self, status: int, content: str, content_type: str) -> None:
+        """Send a plain text response."""
+        body = content.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        """Send a JSON response."""
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _read_json(self) -> Dict[str, Any]:
+        """Read a JSON object sent in the request body."""
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(body, dict):
+            raise ValueError("Request body has to be a JSON object")
+        return body
+
+    def do_GET(self) -> None:  # noqa: N802
+        """Report health and statistics of the server."""
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            memo = get_label_memo()
+            self._send_json(
+                200,
+                {
+                    "batcher": self.batcher.stats(),
+                    "models": get_model_registry().stats(),
+                    "memo": memo.stats() if memo is not None else None,
+                },
+            )
+        elif self.path == "/metrics":
+            instrumentation = get_instrumentation()
+            metrics = instrumentation.to_prometheus() if instrumentation is not None else ""
+            self._send_text(200, metrics, "text/plain; version=0.0.4")
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint {self.path}"})
+
+    def do_POST(self) -> None:  # noqa: N802
+        """Classify messages or generate a changelog."""
+        handlers: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+            "/classify": self._classify,
+            "/classify-messages": self._classify_messages,
+            "/generate-log": self._generate_log,
+        }
+        handler = handlers.get(self.path)
+        if handler is None:
+            self._send_json(404, {"error": f"Unknown endpoint {self.path}"})
+            return
+
+        try:
+            self._send_json(200, handler(self._read_json()))
+        except QueueFullException as exc:
+            self._send_json(503, {"error": str(exc)}, headers={"Retry-After": "1"})
+        except FutureTimeoutError:
+            self._send_json(504, {"error": "Classification timed out"})
+        except (ValueError, TypeError, KeyError, NoMessageEnteredException) as exc:
+            self._send_json(400, {"error": str(exc) or exc.__class__.__name__})
+        except ThothGlyphException as exc:
+            self._send_json(500, {"error": str(exc) or exc.__class__.__name__})
+        except Exception as exc:
+            _LOGGER.exception("Failed to process a request to %s", self.path)
+            self._send_json(500, {"error": f"Internal server error: {exc.__class__.__name__}"})
+
+    def _classify(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Classify a single message, the same way classify_message does."""
+        message = body["message"]
+        if not isinstance(message, str) or message.strip() == "":
+            raise NoMessageEnteredException("No message to classify")
+
+        labels = self.batcher.classify([prepare_message(message.lower())], timeout=self.request_timeout)
+        return {"label": labels[0]}
+
+    def _classify_messages(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Classify multiple messages, the same way classify_messages does."""
+        messages = _read_messages(body)
+        labels = self.batcher.classify(prepare_messages(messages), self.request_timeout)
+        return {"labels": labels}
+
+    def _generate_log(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate changelog entries for the given messages, the same way generate_log does."""
+        from .lib import DEFAULT_RULES
+        from .lib import format_labeled
+
+        messages = _read_messages(body)
+        fmt = Format.by_name(body.get("format", Format.DEFAULT.name))
+        if not messages:
+            return {"changelog": []}
+
+        with stage("rules") as rules_stage:
+            rules_stage.measure(messages)
+            check_phrase_dict, rest = (self.rules if self.rules is not None else DEFAULT_RULES).split(messages)
+
+        labels = self.batcher.classify(prepare_messages(rest), self.request_timeout)
+        return {"changelog": format_labeled(rest, labels, check_phrase_dict, fmt)}
+
+
+def _read_messages(body: Dict[str, Any]) -> List[str]:
+    """Get messages sent in the request body, they have to be a list of strings."""
+    messages = body["messages"]
+    if not isinstance(messages, list) or not all(isinstance(message, str) for message in messages):
+        raise ValueError("Messages have to be a list of strings")
+    return messages
+
+
+def _remove_socket(path: str) -> None:
+    """Remove a Unix socket left at the given path, refuse to remove anything else."""
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+
+    if not stat.S_ISSOCK(mode):
+        raise FileExistsError(f"Cannot listen on {path!r}, the path exists and it is not a socket")
+
+    os.unlink(path)
+
+
+def serve(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: Optional[str] = None,
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+    max_latency: float = DEFAULT_MAX_LATENCY,
+    max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+    request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+    rules: Optional[PhraseRules] = None,
+    memo_size: int = DEFAULT_MEMO_SIZE,
+) -> None:
+    """Serve classification requests over HTTP on the given address or Unix socket until interrupted."""
+    from .lib import predict_labels
+
+    model = model or MLModel.DEFAULT
+    if get_instrumentation() is None:
+        set_instrumentation(Instrumentation())
+    if memo_size and get_label_memo() is None:
+        set_label_memo(LabelMemo(memo_size))
+    get_model_registry().warm_up(model, model_path)
+
+    batcher = MicroBatcher(
+        lambda messages: predict_labels(messages, model, model_path),
+        max_batch_size=max_batch_size,
+        max_latency=max_latency,
+        max_queue_size=max_queue_size,
+    )
+    handler = type(
+        "GlyphRequestHandler",
+        (_GlyphRequestHandler,),
+        {
+            "batcher": batcher,
+            "rules": rules,
+            "request_timeout": request_timeout,
+        },
+    )
+
+    server: Union[_TCPHTTPServer, _UnixHTTPServer]
+    if socket_path is not None:
+        _remove_socket(socket_path)
+        server = _UnixHTTPServer(socket_path, handler)
+        _LOGGER.info("Serving on unix socket %s", socket_path)
+    else:
+        server = _TCPHTTPServer((host, port), handler)
+        _LOGGER.info("Serving on http://%s:%d", host, port)
+
+    batcher.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        _LOGGER.info("Shutting down")
+    finally:
+        server.server_close()
+        batcher.stop()
+        if socket_path is not None:
+            _remove_socket(socket_path)
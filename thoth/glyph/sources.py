@@ -0,0 +1,592 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Sources of commits to be classified: pygit2 repositories, git log pipes and exported history files.
+
+History files are JSON Lines (optionally gzip compressed) written by export_history. Each line is either
+a reference, {"ref": "refs/tags/v1.0.0", "oid": ...}, or a commit, {"oid": ..., "parents": [...],
+"author": "Name <email>", "commit_time": ..., "message": ...}. References are stored first, commits follow
+newest first with children always before their parents, so that walks need a single sequential pass.
+"""
+
+import abc
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import subprocess
+import tempfile
+from collections import Counter
+from itertools import chain
+from itertools import islice
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from pygit2 import Commit
+from pygit2 import GitError
+from pygit2 import GIT_SORT_TIME
+from pygit2 import GIT_SORT_TOPOLOGICAL
+from pygit2 import Oid
+from pygit2 import Repository
+from pygit2 import discover_repository
+
+from .constants import CommitSourceType
+from .exceptions import CommitSourceException
+from .exceptions import RepositoryNotFoundException
+from .instrumentation import stage
+from .walker import CommitFilter
+from .walker import compile_paths
+from .walker import limit_time_range
+from .walker import split_path
+from .walker import touches_paths
+from .walker import walk_commits
+
+_LOGGER = logging.getLogger(__name__)
+
+# Reference walked when no end tag is given.
+DEFAULT_BRANCH = "refs/heads/master"
+
+# Format of commits printed by git log, fields are separated by the ASCII unit separator.
+_GIT_LOG_FORMAT = "%H%x1f%P%x1f%an <%ae>%x1f%ct%x1f%B"
+_READ_SIZE = 1 << 16
+_GZIP_MAGIC = b"\x1f\x8b"
+# Number of commits checked by one git diff-tree run.
+_DIFF_TREE_CHUNK_SIZE = 1024
+
+
+class SourceCommit(NamedTuple):
+    """A commit read from a commit source."""
+
+    oid: str
+    message: str
+    author: str
+    commit_time: int
+    parent_ids: Tuple[str, ...] = ()
+
+
+def _open_repository(path: str) -> Repository:
+    """Open the Git repository at the given path, a working tree (also a linked one), a bare repository or $GIT_DIR.
+
+    Parent directories are not searched, a subdirectory of a working tree is not taken for the repository.
+    """
+    path = os.path.abspath(path)
+    repo_path = discover_repository(path, False, os.path.dirname(path)) or os.environ.get("GIT_DIR")
+    if repo_path is None or not os.path.exists(repo_path):
+        raise RepositoryNotFoundException(f"No Git repository found in {path!r}")
+
+    with stage("open_repository"):
+        return Repository(repo_path)
+
+
+def peeled_references(repo: Repository, prefixes: Tuple[str, ...]) -> Dict[str, str]:
+    """Get references with the given prefixes mapped to commits they point to, other references are left out."""
+    refs = {}
+    for name in repo.references:
+        if name.startswith(prefixes):
+            try:
+                refs[name] = str(repo.references[name].peel(Commit).id)
+            except (GitError, ValueError):
+                _LOGGER.debug("Skipping reference %r not pointing to a commit", name)
+
+    return refs
+
+
+def filter_commits(commits: Iterable[SourceCommit], commit_filter: CommitFilter) -> Iterator[SourceCommit]:
+    """Skip merge commits and commits of other authors as requested by the filter."""
+    author = re.compile(commit_filter.author, re.IGNORECASE) if commit_filter.author else None
+    for commit in commits:
+        if commit_filter.no_merges and len(commit.parent_ids) > 1:
+            continue
+
+        if author is not None and not author.search(commit.author):
+            continue
+
+        yield commit
+
+
+class CommitSource(abc.ABC):
+    """A history commits are read from, subclasses implement the walks."""
+
+    @abc.abstractmethod
+    def commits_by_date(
+        self, start_time: int, end_time: int, commit_filter: Optional[CommitFilter] = None
+    ) -> Iterator[SourceCommit]:
+        """Walk commits reachable from HEAD in the given exclusive time range."""
+
+    @abc.abstractmethod
+    def commits_by_tag(
+        self, start_tag: str, end_tag: Optional[str] = None, commit_filter: Optional[CommitFilter] = None
+    ) -> Iterator[SourceCommit]:
+        """Walk commits reachable from end_tag (the default branch if not given) but not from start_tag."""
+
+    @abc.abstractmethod
+    def tags(self) -> Dict[str, str]:
+        """Get names of tags mapped to commits they point to, tags not pointing to commits are left out."""
+
+    @abc.abstractmethod
+    def resolve(self, revision: str) -> str:
+        """Get the commit the given revision (HEAD, a branch or a tag) points to."""
+
+    @abc.abstractmethod
+    def commits_reachable(self, tips: Iterable[str], hide: Iterable[str] = ()) -> Iterator[SourceCommit]:
+        """Walk commits reachable from tips but not from hide, children are always walked before their parents."""
+
+    def touching_paths(
+        self, commits: Iterable[SourceCommit], paths: Tuple[str, ...], first_parent: bool = False
+    ) -> Iterator[SourceCommit]:
+        """Keep commits which changed any of the given paths, relative to the root of the repository.
+
+        Merges have to differ from all their parents, from the first one only if first_parent is set.
+        """
+        raise CommitSourceException(f"Path filters are not supported by {type(self).__name__}")
+
+
+class RepositorySource(CommitSource):
+    """Commits walked in the object database of a repository using pygit2."""
+
+    def __init__(self, path: str) -> None:
+        """Open the repository containing the given directory."""
+        self.repo = _open_repository(path)
+
+    @staticmethod
+    def _to_source_commit(commit: Commit) -> SourceCommit:
+        """Convert a pygit2 commit."""
+        return SourceCommit(
+            str(commit.id),
+            commit.message,
+            f"{commit.author.name} <{commit.author.email}>",
+            commit.commit_time,
+            tuple(str(parent_id) for parent_id in commit.parent_ids),
+        )
+
+    def commits_by_date(
+        self, start_time: int, end_time: int, commit_filter: Optional[CommitFilter] = None
+    ) -> Iterator[SourceCommit]:
+        """Walk commits reachable from HEAD in the given exclusive time range."""
+        commits = walk_commits(
+            self.repo, self.repo.head.peel(Commit).id, since=start_time, until=end_time, commit_filter=commit_filter
+        )
+        return map(self._to_source_commit, commits)
+
+    def commits_by_tag(
+        self, start_tag: str, end_tag: Optional[str] = None, commit_filter: Optional[CommitFilter] = None
+    ) -> Iterator[SourceCommit]:
+        """Walk commits reachable from end_tag (the default branch if not given) but not from start_tag."""
+        start_commit = self.repo.revparse_single("refs/tags/" + start_tag)
+        end_commit = self.repo.revparse_single(DEFAULT_BRANCH if end_tag is None else "refs/tags/" + end_tag)
+        commits = walk_commits(
+            self.repo, end_commit.id, hide=start_commit.id, commit_filter=commit_filter, sort=GIT_SORT_TOPOLOGICAL
+        )
+        return map(self._to_source_commit, commits)
+
+    def tags(self) -> Dict[str, str]:
+        """Get names of tags mapped to commits they point to, tags not pointing to commits are left out."""
+        return {name[len("refs/tags/") :]: oid for name, oid in peeled_references(self.repo, ("refs/tags/",)).items()}
+
+    def resolve(self, revision: str) -> str:
+        """Get the commit the given revision (HEAD, a branch or a tag) points to."""
+        try:
+            return str(self.repo.revparse_single(revision).peel(Commit).id)
+        except (KeyError, GitError, ValueError) as exc:
+            raise CommitSourceException(f"Revision {revision!r} not found") from exc
+
+    def commits_reachable(self, tips: Iterable[str], hide: Iterable[str] = ()) -> Iterator[SourceCommit]:
+        """Walk commits reachable from tips but not from hide, children are always walked before their parents.
+
+        Commits to hide missing in the repository (e.g. pruned after a force-push) are ignored.
+        """
+        walker = self.repo.walk(None, GIT_SORT_TOPOLOGICAL | GIT_SORT_TIME)  # type: ignore[arg-type]
+        for tip in tips:
+            walker.push(Oid(hex=tip))
+        for oid in hide:
+            try:
+                walker.hide(Oid(hex=oid))
+            except (KeyError, GitError):
+                _LOGGER.debug("Commit %s to hide not found", oid)
+        return map(self._to_source_commit, walker)
+
+    def touching_paths(
+        self, commits: Iterable[SourceCommit], paths: Tuple[str, ...], first_parent: bool = False
+    ) -> Iterator[SourceCommit]:
+        """Keep commits which changed any of the given paths, trees are compared top-down without computing diffs."""
+        compiled = compile_paths(paths)
+        for commit in commits:
+            if touches_paths(self.repo[commit.oid].peel(Commit), compiled, first_parent):
+                yield commit
+
+
+class GitLogSource(CommitSource):
+    """Commits streamed from a git log subprocess, works for any layout git itself understands."""
+
+    def __init__(self, path: str, git: str = "git") -> None:
+        """Check the given directory is a Git repository, git is the git executable to run."""
+        self.path = path
+        self.git = git
+        # Stop git at the given directory the same way the pygit2 source does, parent directories are not searched.
+        self._env = dict(os.environ, GIT_CEILING_DIRECTORIES=os.path.dirname(os.path.abspath(path)))
+        try:
+            completed = subprocess.run(
+                [git, "-C", path, "rev-parse", "--git-dir"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                env=self._env,
+            )
+        except FileNotFoundError as exc:
+            raise CommitSourceException(f"Git executable {git!r} not found") from exc
+
+        if completed.returncode != 0:
+            raise RepositoryNotFoundException(f"No Git repository found in {path!r}")
+
+    @staticmethod
+    def _parse(record: bytes) -> SourceCommit:
+        """Parse a commit printed by git log."""
+        oid, parents, author, commit_time, message = record.decode("utf-8", "replace").split("\x1f", 4)
+        return SourceCommit(oid, message, author, int(commit_time), tuple(parents.split()))
+
+    def _log(self, revisions: List[str], commit_filter: CommitFilter) -> Iterator[SourceCommit]:
+        """Stream commits printed by git log for the given revisions, git is stopped once the walk is closed."""
+        command = [self.git, "-C", self.path, "-c", "log.showSignature=false", "log", "-z", "--no-color"]
+        command += ["--encoding=UTF-8", f"--format={_GIT_LOG_FORMAT}"]
+        if commit_filter.first_parent:
+            command.append("--first-parent")
+        if commit_filter.no_merges:
+            command.append("--no-merges")
+        if commit_filter.paths:
+            # Git prunes commits not changing the paths, merges are checked against all their parents afterwards.
+            command.append("--full-history")
+        command += [*revisions, "--", *self._pathspecs(commit_filter.paths)]
+
+        # Errors are kept in a file so that a chatty git cannot block on a full stderr pipe.
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr, env=self._env)
+            stdout = process.stdout
+            assert stdout is not None
+            try:
+                pending = b""
+                while True:
+                    block = stdout.read(_READ_SIZE)
+                    if not block:
+                        break
+                    records = (pending + block).split(b"\0")
+                    pending = records.pop()
+                    yield from map(self._parse, records)
+
+                if pending:
+                    yield self._parse(pending)
+
+                if process.wait() != 0:
+                    stderr.seek(0)
+                    raise CommitSourceException(f"git log failed: {stderr.read().decode('utf-8', 'replace').strip()}")
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                process.wait()
+                stdout.close()
+
+    @staticmethod
+    def _pathspecs(paths: Tuple[str, ...]) -> List[str]:
+        """Convert paths relative to the root of the repository to pathspecs, git is run in a subdirectory possibly."""
+        return [":(top,literal)" + "/".join(split_path(path)) for path in paths]
+
+    def _filter(self, commits: Iterable[SourceCommit], commit_filter: CommitFilter) -> Iterator[SourceCommit]:
+        """Apply filters not applied by git log."""
+        commits = filter_commits(commits, commit_filter)
+        if not commit_filter.paths:
+            return commits
+
+        return self.touching_paths(commits, commit_filter.paths, commit_filter.first_parent)
+
+    def commits_by_date(
+        self, start_time: int, end_time: int, commit_filter: Optional[CommitFilter] = None
+    ) -> Iterator[SourceCommit]:
+        """Walk commits reachable from HEAD in the given exclusive time range."""
+        commit_filter = commit_filter or CommitFilter()
+        commits = limit_time_range(self._log(["HEAD"], commit_filter), start_time, end_time)
+        return self._filter(commits, commit_filter)
+
+    def commits_by_tag(
+        self, start_tag: str, end_tag: Optional[str] = None, commit_filter: Optional[CommitFilter] = None
+    ) -> Iterator[SourceCommit]:
+        """Walk commits reachable from end_tag (the default branch if not given) but not from start_tag."""
+        commit_filter = commit_filter or CommitFilter()
+        end = DEFAULT_BRANCH if end_tag is None else "refs/tags/" + end_tag
+        commits = self._log(["--topo-order", end, "^refs/tags/" + start_tag], commit_filter)
+        return self._filter(commits, commit_filter)
+
+    def _git(self, *args: str, stdin: Optional[str] = None) -> str:
+        """Run a git command which prints little output, return its standard output."""
+        completed = subprocess.run(
+            [self.git, "-C", self.path, *args],
+            input=stdin.encode() if stdin is not None else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=self._env,
+        )
+        if completed.returncode != 0:
+            raise CommitSourceException(f"git {args[0]} failed: {completed.stderr.decode('utf-8', 'replace').strip()}")
+
+        return completed.stdout.decode("utf-8", "replace")
+
+    def tags(self) -> Dict[str, str]:
+        """Get names of tags mapped to commits they point to, tags not pointing to commits are left out."""
+        output = self._git(
+            "for-each-ref",
+            "--format=%(refname:strip=2)%09%(objecttype)%09%(objectname)%09%(*objecttype)%09%(*objectname)",
+            "refs/tags",
+        )
+        tags = {}
+        for line in output.splitlines():
+            name, object_type, oid, peeled_type, peeled_oid = line.split("\t")
+            if object_type == "commit":
+                tags[name] = oid
+            elif peeled_type == "commit":
+                tags[name] = peeled_oid
+
+        return tags
+
+    def resolve(self, revision: str) -> str:
+        """Get the commit the given revision (HEAD, a branch or a tag) points to."""
+        return self._git("rev-parse", "--verify", "--end-of-options", revision + "^{commit}").strip()
+
+    def commits_reachable(self, tips: Iterable[str], hide: Iterable[str] = ()) -> Iterator[SourceCommit]:
+        """Walk commits reachable from tips but not from hide, children are always walked before their parents.
+
+        Commits to hide missing in the repository (e.g. pruned after a force-push) are ignored.
+        """
+        tips = list(tips)
+        if not tips:
+            return iter(())
+
+        return self._log(["--topo-order", "--ignore-missing", *tips, "--not", *hide], CommitFilter())
+
+    def touching_paths(
+        self, commits: Iterable[SourceCommit], paths: Tuple[str, ...], first_parent: bool = False
+    ) -> Iterator[SourceCommit]:
+        """Keep commits which changed any of the given paths, git diff-tree compares each commit with its parents.
+
+        Commits are checked in chunks by one diff-tree run each, it prints a commit once for every parent the
+        commit differs from at the paths.
+        """
+        pathspecs = self._pathspecs(paths)
+        commits = iter(commits)
+        while True:
+            chunk = list(islice(commits, _DIFF_TREE_CHUNK_SIZE))
+            if not chunk:
+                break
+
+            parents = {commit.oid: commit.parent_ids[:1] if first_parent else commit.parent_ids for commit in chunk}
+            pairs = [f"{oid} {parent}" for oid, oid_parents in parents.items() for parent in oid_parents]
+            # Root commits are compared to an empty tree.
+            pairs.extend(oid for oid, oid_parents in parents.items() if not oid_parents)
+            output = self._git(
+                "diff-tree", "--stdin", "--root", "-r", "-s", "--", *pathspecs, stdin="\n".join(pairs) + "\n"
+            )
+            differs = Counter(output.split())
+            for commit in chunk:
+                if differs[commit.oid] == max(len(parents[commit.oid]), 1):
+                    yield commit
+
+
+class HistoryFileSource(CommitSource):
+    """Commits read sequentially from a history file written by export_history, no repository is needed."""
+
+    def __init__(self, path: str) -> None:
+        """Check the history file exists."""
+        if not os.path.isfile(path):
+            raise RepositoryNotFoundException(f"History file {path!r} not found")
+
+        self.path = path
+
+    @staticmethod
+    def _check_filter(commit_filter: CommitFilter) -> None:
+        """Check the filter can be applied to commits of a history file."""
+        if commit_filter.paths:
+            raise CommitSourceException("History files do not store trees, path filters cannot be applied")
+
+    def _records(self) -> Iterator[Dict[str, Any]]:
+        """Read records of the history file, gzip compressed files are recognized by their magic."""
+        with open(self.path, "rb") as raw:
+            compressed = raw.read(len(_GZIP_MAGIC)) == _GZIP_MAGIC
+            raw.seek(0)
+            stream = gzip.GzipFile(fileobj=raw) if compressed else raw
+            for line in io.TextIOWrapper(stream, encoding="utf-8"):
+                if line.strip():
+                    yield json.loads(line)
+
+    def _read(self) -> Tuple[Dict[str, str], Iterator[Dict[str, Any]]]:
+        """Read references stored at the beginning of the history file, return them with the commit records."""
+        records = self._records()
+        refs: Dict[str, str] = {}
+        for record in records:
+            if "ref" not in record:
+                return refs, chain([record], records)
+            refs[record["ref"]] = record["oid"]
+
+        return refs, iter(())
+
+    @staticmethod
+    def _resolve(refs: Dict[str, str], ref: str) -> str:
+        """Get the commit the given reference points to."""
+        try:
+            return refs[ref]
+        except KeyError as exc:
+            raise CommitSourceException(f"Reference {ref!r} not found in the history file") from exc
+
+    @staticmethod
+    def _to_source_commit(record: Dict[str, Any]) -> SourceCommit:
+        """Convert a commit record."""
+        return SourceCommit(
+            record["oid"], record["message"], record["author"], record["commit_time"], tuple(record["parents"])
+        )
+
+    @classmethod
+    def _walk(
+        cls,
+        records: Iterator[Dict[str, Any]],
+        tips: Iterable[str],
+        hide: Iterable[str] = (),
+        first_parent: bool = False,
+    ) -> Iterator[SourceCommit]:
+        """Yield commits reachable from tips but not from hide in a single pass over the commit records.
+
+        Children are stored before their parents, so reachability is known once a commit is read and only
+        the frontiers of the walk are kept in memory.
+        """
+        wanted = set(tips)
+        hidden = set(hide)
+        for record in records:
+            oid = record["oid"]
+            if oid in hidden:
+                hidden.discard(oid)
+                hidden.update(record["parents"])
+                wanted.discard(oid)
+                continue
+
+            if oid not in wanted:
+                continue
+
+            wanted.discard(oid)
+            wanted.update(record["parents"][:1] if first_parent else record["parents"])
+            yield cls._to_source_commit(record)
+            if not wanted:
+                break
+
+    def commits_by_date(
+        self, start_time: int, end_time: int, commit_filter: Optional[CommitFilter] = None
+    ) -> Iterator[SourceCommit]:
+        """Read commits reachable from HEAD in the given exclusive time range, all commits if HEAD is not stored."""
+        commit_filter = commit_filter or CommitFilter()
+        self._check_filter(commit_filter)
+        refs, records = self._read()
+        if "HEAD" in refs or commit_filter.first_parent:
+            commits = self._walk(records, [self._resolve(refs, "HEAD")], first_parent=commit_filter.first_parent)
+        else:
+            commits = map(self._to_source_commit, records)
+
+        return filter_commits(limit_time_range(commits, start_time, end_time), commit_filter)
+
+    def commits_by_tag(
+        self, start_tag: str, end_tag: Optional[str] = None, commit_filter: Optional[CommitFilter] = None
+    ) -> Iterator[SourceCommit]:
+        """Read commits reachable from end_tag (the default branch if not given) but not from start_tag."""
+        commit_filter = commit_filter or CommitFilter()
+        self._check_filter(commit_filter)
+        refs, records = self._read()
+        hide = self._resolve(refs, "refs/tags/" + start_tag)
+        tip = self._resolve(refs, DEFAULT_BRANCH if end_tag is None else "refs/tags/" + end_tag)
+        return filter_commits(self._walk(records, [tip], [hide], commit_filter.first_parent), commit_filter)
+
+    def tags(self) -> Dict[str, str]:
+        """Get names of tags mapped to commits they point to."""
+        refs, _ = self._read()
+        return {name[len("refs/tags/") :]: oid for name, oid in refs.items() if name.startswith("refs/tags/")}
+
+    def resolve(self, revision: str) -> str:
+        """Get the commit the given revision (HEAD, a branch or a tag) points to."""
+        refs, _ = self._read()
+        for ref in ("refs/heads/" + revision, "refs/tags/" + revision):
+            if ref in refs:
+                return refs[ref]
+
+        return self._resolve(refs, revision)
+
+    def commits_reachable(self, tips: Iterable[str], hide: Iterable[str] = ()) -> Iterator[SourceCommit]:
+        """Read commits reachable from tips but not from hide, children are always stored before their parents."""
+        _, records = self._read()
+        return self._walk(records, tips, hide)
+
+
+def open_source(path: str, source_type: Optional[CommitSourceType] = None) -> CommitSource:
+    """Open a commit source, history files are read by default if path is a file, repositories by pygit2 otherwise."""
+    if source_type is None:
+        source_type = CommitSourceType.HISTORY if os.path.isfile(path) else CommitSourceType.DEFAULT
+
+    if source_type == CommitSourceType.PYGIT2:
+        return RepositorySource(path)
+
+    if source_type == CommitSourceType.GIT:
+        return GitLogSource(path)
+
+    if source_type == CommitSourceType.HISTORY:
+        return HistoryFileSource(path)
+
+    raise ValueError(f"Unknown commit source: {source_type}")
+
+
+def export_history(path: str, output: str) -> int:
+    """Export HEAD, branches, tags and commits reachable from them to a history file, return number of commits.
+
+    The output is gzip compressed if its name ends with .gz.
+    """
+    repo = _open_repository(path)
+
+    refs = {}
+    if not repo.head_is_unborn:
+        refs["HEAD"] = str(repo.head.target)
+    refs.update(peeled_references(repo, ("refs/heads/", "refs/tags/")))
+
+    exported = 0
+    opener = gzip.open if output.endswith(".gz") else open
+    with opener(output, "wt", encoding="utf-8") as output_file, stage("export") as export:
+        for name, oid in refs.items():
+            output_file.write(json.dumps({"ref": name, "oid": oid}) + "\n")
+
+        walker = repo.walk(None, GIT_SORT_TOPOLOGICAL | GIT_SORT_TIME)  # type: ignore[arg-type]
+        for oid in set(refs.values()):
+            walker.push(oid)
+
+        for commit in map(RepositorySource._to_source_commit, walker):
+            record = {
+                "oid": commit.oid,
+                "parents": list(commit.parent_ids),
+                "author": commit.author,
+                "commit_time": commit.commit_time,
+                "message": commit.message,
+            }
+            output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            exported += 1
+        export.count = exported
+
+    return exported
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Keep records within a memory budget, records beyond it are spilled to sorted run files merged on read."""
+
+import heapq
+import json
+import logging
+import re
+import sys
+import tempfile
+from typing import Any
+from typing import Callable
+from typing import IO
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import TypeVar
+
+from .instrumentation import stage
+
+_LOGGER = logging.getLogger(__name__)
+_T = TypeVar("_T")
+
+DEFAULT_MAX_MEMORY = 256 * 1024 * 1024
+
+# Estimated number of bytes a record takes in memory on top of its message: the tuple, its integers and the list slot.
+_RECORD_OVERHEAD = 160
+# Maximum number of run files merged at once, runs of the same level are merged into one run of the next level.
+_MAX_FAN_IN = 64
+_SIZE_UNITS = {"": 0, "K": 1, "M": 2, "G": 3, "T": 4}
+
+Record = Tuple[Any, ...]
+
+
+def parse_size(size: str) -> int:
+    """Parse a number of bytes with an optional binary unit suffix, e.g. 512M or 2GiB."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)(?:I?B)?\s*", size, re.IGNORECASE)
+    if match is None:
+        raise ValueError(f"Invalid size {size!r}, expected a number of bytes optionally followed by K, M, G or T")
+
+    return int(float(match.group(1)) * 1024 ** _SIZE_UNITS[match.group(2).upper()])
+
+
+def message_size(message: str) -> int:
+    """Estimate memory taken by a record holding the given message."""
+    return sys.getsizeof(message) + _RECORD_OVERHEAD
+
+
+def chunks_within(
+    items: Iterable[_T], max_bytes: int, size: Callable[[_T], int], max_items: Optional[int] = None
+) -> Iterator[List[_T]]:
+    """Split items into lists taking at most max_bytes (and at least one item) each, optionally of max_items."""
+    chunk: List[_T] = []
+    used = 0
+    for item in items:
+        item_size = size(item)
+        if chunk and (used + item_size > max_bytes or len(chunk) == max_items):
+            yield chunk
+            chunk = []
+            used = 0
+        chunk.append(item)
+        used += item_size
+
+    if chunk:
+        yield chunk
+
+
+class SpillStore:
+    """Collect records to be read back sorted, records are spilled to temporary files once over the budget.
+
+    Records are tuples of JSON serializable values. Each spill writes the sorted in-memory records as one run
+    file, reading the store merges the runs with the records left in memory.
+    """
+
+    def __init__(self, max_memory: int = DEFAULT_MAX_MEMORY, directory: Optional[str] = None) -> None:
+        """Initialize the store, run files are created in the given directory (the temporary directory by default)."""
+        if max_memory < 1:
+            raise ValueError(f"Memory budget has to be a positive number, got {max_memory}")
+
+        self.max_memory = max_memory
+        self.directory = directory
+        self.spilled = 0
+        self._records: List[Record] = []
+        self._used = 0
+        # Run files by level, a level is merged into one run of the next level once it has _MAX_FAN_IN runs.
+        self._levels: List[List[IO[str]]] = []
+
+    def add(self, record: Record, size: int) -> None:
+        """Add a record taking the given number of bytes in memory."""
+        self._records.append(record)
+        self._used += size
+        if self._used >= self.max_memory:
+            self._spill()
+
+    def _write_run(self, records: Iterable[Record], level: int) -> int:
+        """Write sorted records to a new run file of the given level, return the number of records written."""
+        run = tempfile.TemporaryFile("w+", encoding="utf-8", dir=self.directory, prefix="glyph-spill-")
+        written = 0
+        for record in records:
+            run.write(json.dumps(record, ensure_ascii=False))
+            run.write("\n")
+            written += 1
+
+        while len(self._levels) <= level:
+            self._levels.append([])
+        self._levels[level].append(run)
+        return written
+
+    def _spill(self) -> None:
+        """Write records kept in memory to a run file, merge runs of full levels."""
+        with stage("spill") as spill:
+            self._records.sort()
+            spill.count = self._write_run(self._records, 0)
+
+        _LOGGER.debug("Spilled %d records to disk", spill.count)
+        self.spilled += spill.count
+        self._records = []
+        self._used = 0
+
+        level = 0
+        while level < len(self._levels) and len(self._levels[level]) >= _MAX_FAN_IN:
+            runs, self._levels[level] = self._levels[level], []
+            with stage("spill_merge") as merge:
+                merge.count = self._write_run(heapq.merge(*map(self._read_run, runs)), level + 1)
+            for run in runs:
+                run.close()
+            level += 1
+
+    @staticmethod
+    def _read_run(run: IO[str]) -> Iterator[Record]:
+        """Read records of a run file from its beginning."""
+        run.seek(0)
+        for line in run:
+            yield tuple(json.loads(line))
+
+    def __iter__(self) -> Iterator[Record]:
+        """Iterate over all the records in sorted order, records are read from run files as they are merged."""
+        self._records.sort()
+        runs = [run for level in self._levels for run in level]
+        return heapq.merge(*map(self._read_run, runs), iter(self._records))
+
+    def close(self) -> None:
+        """Remove the run files and the records kept in memory."""
+        for level in self._levels:
+            for run in level:
+                run.close()
+        self._levels = []
+        self._records = []
+        self._used = 0
+
+    def __enter__(self) -> "SpillStore":
+        """Use the store as a context manager."""
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        """Remove the run files."""
+        self.close()
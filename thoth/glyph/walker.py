@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Walk commit history with filters applied inside the walk."""
+
+import logging
+import re
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+from pygit2 import Commit
+from pygit2 import GIT_SORT_TIME
+from pygit2 import Object
+from pygit2 import Oid
+from pygit2 import Repository
+from pygit2 import Tree
+
+_LOGGER = logging.getLogger(__name__)
+
+# Number of consecutive commits older than the requested time range seen before the walk is stopped. Commits
+# with a skewed clock (e.g. in merged branches) can be older than their parents, a single old commit thus
+# does not mean the rest of the history is out of the range. Git uses the same heuristic.
+DEFAULT_SLOP = 5
+
+
+class CommitFilter(NamedTuple):
+    """Filters applied to commits while walking the history."""
+
+    first_parent: bool = False
+    no_merges: bool = False
+    author: Optional[str] = None
+    paths: Tuple[str, ...] = ()
+
+
+def split_path(path: str) -> Tuple[str, ...]:
+    """Split a path relative to the repository root to its components, the root itself has none."""
+    return tuple(component for component in path.split("/") if component not in ("", "."))
+
+
+def compile_paths(paths: Iterable[str]) -> Dict[str, Any]:
+    """Build a tree of components of the given paths, an empty tree stands for everything under its path."""
+    root: Dict[str, Any] = {}
+    for path in paths:
+        components = split_path(path)
+        if not components:
+            return {}
+
+        node = root
+        for component in components:
+            if component in node and not node[component]:
+                # A shorter path covers this one already.
+                break
+            node = node.setdefault(component, {})
+        else:
+            node.clear()
+
+    return root
+
+
+def _entry(obj: Optional[Object], name: str) -> Optional[Object]:
+    """Get an entry of a tree, None if obj is not a tree or it has no such entry."""
+    if not isinstance(obj, Tree) or name not in obj:
+        return None
+
+    return obj[name]
+
+
+def _paths_differ(old: Optional[Object], new: Optional[Object], paths: Dict[str, Any]) -> bool:
+    """Compare trees (or blobs) top-down at the given paths, subtrees with the same oid are not descended into."""
+    if (old.id if old is not None else None) == (new.id if new is not None else None):
+        return False
+
+    if not paths:
+        return True
+
+    return any(_paths_differ(_entry(old, name), _entry(new, name), subpaths) for name, subpaths in paths.items())
+
+
+def touches_paths(commit: Commit, paths: Dict[str, Any], first_parent: bool = False) -> bool:
+    """Check whether the commit changed any of the paths compiled by compile_paths.
+
+    A merge commit is considered unchanged if the paths are the same as in any of its parents, the change was
+    made in that parent's history. Merges are compared to their first parent only in first parent walks, where
+    they stand for the whole merged branch. Root commits are compared to an empty tree.
+    """
+    if not commit.parent_ids:
+        return _paths_differ(None, commit.tree, paths)
+
+    tree = commit.tree
+    parents = commit.parents[:1] if first_parent else commit.parents
+    return all(_paths_differ(parent.tree, tree, paths) for parent in parents)
+
+
+def walk_commits(
+    repo: Repository,
+    tip: Oid,
+    hide: Optional[Oid] = None,
+    since: Optional[int] = None,
+    until: Optional[int] = None,
+    commit_filter: Optional[CommitFilter] = None,
+    sort: int = GIT_SORT_TIME,
+    slop: int = DEFAULT_SLOP,
+) -> Iterator[Commit]:
+    """Walk commits reachable from tip, stop as soon as the walk gets past the given time range.
+
+    The time range is exclusive on both ends, commits are sorted by commit time by default so that
+    the walk can terminate early instead of visiting the whole history. Commits not changing paths of the
+    filter are skipped before they are converted or classified.
+    """
+    commit_filter = commit_filter or CommitFilter()
+    author = re.compile(commit_filter.author, re.IGNORECASE) if commit_filter.author else None
+    paths = compile_paths(commit_filter.paths) if commit_filter.paths else None
+
+    # The sort constants are typed as int by pygit2 while walk() expects its SortMode flags, they are the same values.
+    walker = repo.walk(tip, sort)  # type: ignore[arg-type]
+    if hide is not None:
+        walker.hide(hide)
+    if commit_filter.first_parent:
+        walker.simplify_first_parent()
+
+    for commit in limit_time_range(walker, since, until, slop):
+        if commit_filter.no_merges and len(commit.parent_ids) > 1:
+            continue
+
+        if author is not None and not author.search(f"{commit.author.name} <{commit.author.email}>"):
+            continue
+
+        if paths is not None and not touches_paths(commit, paths, commit_filter.first_parent):
+            continue
+
+        yield commit
+
+
+def limit_time_range(
+    commits: Iterable[Any], since: Optional[int] = None, until: Optional[int] = None, slop: int = DEFAULT_SLOP
+) -> Iterator[Any]:
+    """Yield commits in the given exclusive time range, stop as soon as commits sorted by time get past its start.
+
+    Commits are pygit2 commits or other objects with commit_time (e.g. SourceCommit).
+    """
+    visited = 0
+    out_of_range = 0
+    for commit in commits:
+        visited += 1
+
+        if since is not None and commit.commit_time <= since:
+            out_of_range += 1
+            if out_of_range >= slop:
+                _LOGGER.debug("Walk terminated early after visiting %d commits", visited)
+                break
+            continue
+
+        out_of_range = 0
+
+        if until is not None and commit.commit_time >= until:
+            continue
+
+        yield commit
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Watch references of a repository and classify commits which become reachable as soon as references move.
+
+Changes of loose references and packed-refs are detected by inotify on Linux, references are polled elsewhere
+(and for repositories storing references in a reftable).
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import TYPE_CHECKING
+from typing import Union
+
+from .cache import LabelCache
+from .constants import MLModel
+from .instrumentation import stage
+from .preprocess import prepare_message
+
+if TYPE_CHECKING:
+    from .lib import ClassifiedCommit
+    from .walker import CommitFilter
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_WATCH_REFS = ("refs/heads/",)
+DEFAULT_POLL_INTERVAL = 1.0
+
+# Time to wait for more events once references started to change, so that e.g. a push updating several branches
+# is walked once.
+_SETTLE_TIME = 0.05
+# Longest time to block waiting for events, a requested stop is noticed within it.
+_STOP_CHECK_INTERVAL = 0.5
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+_EVENT = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+Callback = Callable[[List["ClassifiedCommit"]], None]
+
+
+class _Inotify:
+    """A minimal inotify binding using ctypes, events are reported as (directory, mask, name) triples."""
+
+    def __init__(self) -> None:
+        """Create the inotify instance, raise OSError (or AttributeError off Linux) if inotify is not available."""
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._directories: Dict[int, str] = {}
+
+    def add_watch(self, directory: str, mask: int = _WATCH_MASK) -> None:
+        """Watch entries of the given directory."""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), directory)
+        self._directories[wd] = directory
+
+    def read(self, timeout: float) -> List[Tuple[str, int, str]]:
+        """Read events waiting up to timeout seconds for the first one."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+
+        try:
+            data = os.read(self.fd, _READ_SIZE)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0").decode("utf-8", "surrogateescape")
+            offset += length
+            events.append((self._directories.get(wd, ""), mask, name))
+
+        return events
+
+    def close(self) -> None:
+        """Close the inotify instance, dropping all its watches."""
+        os.close(self.fd)
+
+
+class _PollingNotifier:
+    """Report a possible change of references every poll interval."""
+
+    def __init__(self, poll_interval: float) -> None:
+        """Initialize the notifier."""
+        self.poll_interval = poll_interval
+
+    def wait(self, stop: threading.Event) -> bool:
+        """Wait for the next poll, return False if stopped in the meantime."""
+        return not stop.wait(self.poll_interval)
+
+    def close(self) -> None:
+        """Nothing to release."""
+
+
+class _InotifyNotifier:
+    """Report changes of loose references and packed-refs of a repository using inotify."""
+
+    def __init__(self, git_dir: str) -> None:
+        """Watch the references directory tree and the repository directory holding packed-refs."""
+        self.git_dir = git_dir
+        self._inotify = _Inotify()
+        try:
+            self._inotify.add_watch(git_dir)
+            self._watch_tree(os.path.join(git_dir, "refs"))
+        except OSError:
+            self._inotify.close()
+            raise
+
+    def _watch_tree(self, directory: str) -> None:
+        """Watch the given directory and all its subdirectories."""
+        for root, _, _ in os.walk(directory):
+            self._inotify.add_watch(root)
+
+    def _watch_new_tree(self, directory: str) -> None:
+        """Watch a newly created directory, it may be removed again in the meantime (e.g. by pack-refs)."""
+        try:
+            self._watch_tree(directory)
+        except FileNotFoundError:
+            _LOGGER.debug("Directory %s removed before it was watched", directory)
+
+    def _relevant(self, events: List[Tuple[str, int, str]]) -> bool:
+        """Check whether the given events may have moved references, watch newly created reference directories."""
+        relevant = False
+        for directory, mask, name in events:
+            if mask & _IN_Q_OVERFLOW:
+                relevant = True
+            elif directory == self.git_dir:
+                # Other files of the repository directory (index, FETCH_HEAD, ...) do not hold watched references.
+                relevant = relevant or name == "packed-refs"
+            elif mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO):
+                    # References may have been written into the directory before it was watched.
+                    self._watch_new_tree(os.path.join(directory, name))
+                    relevant = True
+            elif not name.endswith(".lock"):
+                relevant = True
+
+        return relevant
+
+    def wait(self, stop: threading.Event) -> bool:
+        """Wait for references to change, return False if stopped in the meantime."""
+        while not stop.is_set():
+            if self._relevant(self._inotify.read(_STOP_CHECK_INTERVAL)):
+                while True:
+                    events = self._inotify.read(_SETTLE_TIME)
+                    if not events:
+                        return True
+                    self._relevant(events)
+
+        return False
+
+    def close(self) -> None:
+        """Stop watching."""
+        self._inotify.close()
+
+
+def _common_dir(git_dir: str) -> str:
+    """Get the directory with references shared by all worktrees of a repository."""
+    commondir_file = os.path.join(git_dir, "commondir")
+    if not os.path.isfile(commondir_file):
+        return git_dir
+
+    with open(commondir_file) as commondir:
+        return os.path.normpath(os.path.join(git_dir, commondir.read().strip()))
+
+
+def _open_notifier(git_dir: str, poll_interval: float, use_inotify: bool) -> Union[_InotifyNotifier, _PollingNotifier]:
+    """Get the notifier of reference changes, inotify if it is available and references are stored in files."""
+    if use_inotify and not os.path.isdir(os.path.join(git_dir, "reftable")):
+        try:
+            return _InotifyNotifier(git_dir)
+        except (OSError, AttributeError) as exc:
+            _LOGGER.warning("Cannot watch references using inotify, polling them instead: %s", exc)
+
+    return _PollingNotifier(poll_interval)
+
+
+def watch_repository(
+    path: str,
+    callback: Callback,
+    model: Optional[MLModel] = None,
+    model_path: Optional[str] = None,
+    cache: Optional[LabelCache] = None,
+    commit_filter: Optional["CommitFilter"] = None,
+    refs: Tuple[str, ...] = DEFAULT_WATCH_REFS,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    use_inotify: bool = True,
+    stop: Optional[threading.Event] = None,
+    workers: int = 1,
+) -> None:
+    """Classify commits which become reachable from references with the given prefixes until stop is set.
+
+    Commits reachable when the watch starts are not classified. Each time references move, commits reachable from
+    the new targets but not from any of the previous targets are classified and passed to the callback in one
+    list, parents before their children. The repository and the model are kept open for the whole watch.
+    """
+    # Imported here as pygit2 and models are expensive to import, the CLI imports this module on start.
+    from .lib import ClassifiedCommit
+    from .lib import label_commits
+    from .lib import warm_up
+    from .parallel import resolve_workers
+    from .parallel import start_workers
+    from .sources import RepositorySource
+    from .sources import filter_commits
+    from .sources import peeled_references
+    from .walker import CommitFilter
+
+    commit_filter = commit_filter or CommitFilter()
+    if commit_filter.first_parent:
+        raise ValueError("Newly reachable commits are walked from all the moved references, not first parents")
+
+    stop = stop or threading.Event()
+    model = model or MLModel.DEFAULT
+    warm_up(model, model_path)
+    start_workers(resolve_workers(workers))
+
+    source = RepositorySource(path)
+    git_dir = _common_dir(source.repo.path)
+    tips = peeled_references(source.repo, refs)
+    _LOGGER.info("Watching %d references of %s", len(tips), git_dir)
+
+    notifier = _open_notifier(git_dir, poll_interval, use_inotify)
+    try:
+        while notifier.wait(stop):
+            current = peeled_references(source.repo, refs)
+            if current == tips:
+                continue
+
+            moved = set(current.values()) - set(tips.values())
+            with stage("walk") as walk:
+                reachable = filter_commits(source.commits_reachable(moved, tips.values()), commit_filter)
+                if commit_filter.paths:
+                    reachable = source.touching_paths(reachable, commit_filter.paths)
+                walked = list(reachable)
+                walk.count = len(walked)
+            tips = current
+            if not walked:
+                continue
+
+            walked.reverse()
+            chunk = [(commit.oid, prepare_message(commit.message.lower())) for commit in walked]
+            labels = label_commits(chunk, model, model_path, cache, workers)
+            _LOGGER.debug("%d new commits classified", len(chunk))
+            callback(
+                [
+                    ClassifiedCommit(oid, message, label, commit.author, commit.commit_time)
+                    for commit, (oid, message), label in zip(walked, chunk, labels)
+                ]
+            )
+    finally:
+        notifier.close()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# thoth-glyph
+# Copyright(C) 2020 Red Hat, Inc.
+#
+# This program is free software: you can redistribute it and / or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Write classified commits incrementally, chunk by chunk, as JSON Lines, CSV, Parquet or Arrow IPC stream.
+
+Parquet and Arrow writers require pyarrow, which is an optional dependency installed with the parquet extra.
+"""
+
+import abc
+import csv
+import datetime
+import io
+import json
+from itertools import islice
+from typing import Any
+from typing import BinaryIO
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Sequence
+from typing import TYPE_CHECKING
+from typing import Type
+
+from .constants import OutputFormat
+from .instrumentation import stage
+
+if TYPE_CHECKING:
+    from .lib import ClassifiedCommit
+
+# Columns written for each classified commit, in this order.
+FIELDS = ("oid", "author", "commit_time", "label", "message")
+
+
+def _format_time(timestamp: int) -> str:
+    """Format the commit time as an ISO 8601 timestamp in UTC."""
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).isoformat()
+
+
+class ClassificationWriter(abc.ABC):
+    """Write classified commits to a binary stream, subclasses implement the format."""
+
+    # Number of commits written at once, e.g. the size of Parquet row groups.
+    chunk_size = 1000
+
+    def __init__(self, stream: BinaryIO) -> None:
+        """Initialize the writer, the stream is not closed by the writer."""
+        self.stream = stream
+        self.written = 0
+
+    def write(self, commits: Sequence["ClassifiedCommit"]) -> None:
+        """Write a chunk of classified commits."""
+        with stage("write") as write:
+            self._write(commits)
+            write.count = len(commits)
+        self.written += len(commits)
+
+    @abc.abstractmethod
+    def _write(self, commits: Sequence["ClassifiedCommit"]) -> None:
+        """Write a chunk of classified commits in the format of the writer."""
+
+    def close(self) -> None:
+        """Finish the output and flush the stream."""
+        self.stream.flush()
+
+    def __enter__(self) -> "ClassificationWriter":
+        """Use the writer as a context manager."""
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        """Finish the output."""
+        self.close()
+
+
+class JsonLinesWriter(ClassificationWriter):
+    """Write one JSON object per commit and line."""
+
+    def _write(self, commits: Sequence["ClassifiedCommit"]) -> None:
+        """Write a chunk of classified commits."""
+        lines = (
+            json.dumps(
+                {
+                    "oid": commit.oid,
+                    "author": commit.author,
+                    "commit_time": _format_time(commit.commit_time),
+                    "label": commit.label,
+                    "message": commit.message,
+                },
+                ensure_ascii=False,
+            )
+            + "\n"
+            for commit in commits
+        )
+        self.stream.write("".join(lines).encode("utf-8"))
+        self.stream.flush()
+
+
+class CsvWriter(ClassificationWriter):
+    """Write commits as CSV rows preceded by a header row."""
+
+    def __init__(self, stream: BinaryIO, delimiter: str = ",") -> None:
+        """Initialize the writer and write the header row."""
+        super().__init__(stream)
+        self._text = io.TextIOWrapper(stream, encoding="utf-8", newline="", write_through=True)
+        self._writer = csv.writer(self._text, delimiter=delimiter, lineterminator="\n")
+        self._writer.writerow(FIELDS)
+
+    def _write(self, commits: Sequence["ClassifiedCommit"]) -> None:
+        """Write a chunk of classified commits."""
+        self._writer.writerows(
+            (commit.oid, commit.author, _format_time(commit.commit_time), commit.label, commit.message)
+            for commit in commits
+        )
+        self._text.flush()
+
+    def close(self) -> None:
+        """Flush the output, the stream is left open."""
+        self._text.flush()
+        self._text.detach()
+        super().close()
+
+
+def _import_pyarrow() -> Any:
+    """Import pyarrow, raise an ImportError suggesting the extra to install if it is not available."""
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise ImportError("Writing Parquet or Arrow requires pyarrow, install thoth-glyph[parquet]") from exc
+
+    return pyarrow
+
+
+class _ArrowBatchWriter(ClassificationWriter):
+    """Convert chunks of commits to Arrow record batches, subclasses write them."""
+
+    def __init__(self, stream: BinaryIO) -> None:
+        """Initialize the writer."""
+        super().__init__(stream)
+        self._pa = _import_pyarrow()
+        self.schema = self._pa.schema(
+            [
+                ("oid", self._pa.string()),
+                ("author", self._pa.string()),
+                ("commit_time", self._pa.timestamp("s", tz="UTC")),
+                ("label", self._pa.string()),
+                ("message", self._pa.string()),
+            ]
+        )
+
+    def _batch(self, commits: Sequence["ClassifiedCommit"]) -> Any:
+        """Convert the commits to a record batch."""
+        columns: List[List[Any]] = [[getattr(commit, field) for commit in commits] for field in FIELDS]
+        return self._pa.record_batch(
+            [self._pa.array(column, type=field.type) for column, field in zip(columns, self.schema)],
+            schema=self.schema,
+        )
+
+
+class ParquetWriter(_ArrowBatchWriter):
+    """Write commits to a Parquet file, each chunk is one row group."""
+
+    chunk_size = 100_000
+
+    def __init__(self, stream: BinaryIO) -> None:
+        """Initialize the writer."""
+        super().__init__(stream)
+        import pyarrow.parquet
+
+        self._writer = pyarrow.parquet.ParquetWriter(stream, self.schema)
+
+    def _write(self, commits: Sequence["ClassifiedCommit"]) -> None:
+        """Write a chunk of classified commits."""
+        self._writer.write_batch(self._batch(commits))
+
+    def close(self) -> None:
+        """Write the Parquet footer."""
+        self._writer.close()
+        super().close()
+
+
+class ArrowWriter(_ArrowBatchWriter):
+    """Write commits in the Arrow IPC streaming format, each chunk is one record batch."""
+
+    def __init__(self, stream: BinaryIO) -> None:
+        """Initialize the writer."""
+        super().__init__(stream)
+        self._writer = self._pa.ipc.new_stream(stream, self.schema)
+
+    def _write(self, commits: Sequence["ClassifiedCommit"]) -> None:
+        """Write a chunk of classified commits."""
+        self._writer.write_batch(self._batch(commits))
+
+    def close(self) -> None:
+        """Write the end of the stream."""
+        self._writer.close()
+        super().close()
+
+
+_WRITERS: Dict[OutputFormat, Type[ClassificationWriter]] = {
+    OutputFormat.JSONL: JsonLinesWriter,
+    OutputFormat.CSV: CsvWriter,
+    OutputFormat.PARQUET: ParquetWriter,
+    OutputFormat.ARROW: ArrowWriter,
+}
+
+
+def open_writer(output_format: OutputFormat, stream: BinaryIO) -> ClassificationWriter:
+    """Get a writer of the given format writing to the given binary stream."""
+    return _WRITERS[output_format](stream)
+
+
+def _chunks(commits: Iterable["ClassifiedCommit"], chunk_size: int) -> Iterator[List["ClassifiedCommit"]]:
+    """Split commits into lists of the given size."""
+    commits = iter(commits)
+    while True:
+        chunk = list(islice(commits, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def write_classified(commits: Iterable["ClassifiedCommit"], output_format: OutputFormat, stream: BinaryIO) -> int:
+    """Write classified commits to the stream as they are produced, return the number of commits written."""
+    with open_writer(output_format, stream) as writer:
+        for chunk in _chunks(commits, writer.chunk_size):
+            writer.write(chunk)
+
+    return writer.written